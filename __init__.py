@@ -29,6 +29,7 @@ try:
     from .nodes.two_round_vlm import TwoRoundVLMPrompter, VLMStyleRewriter, DualProviderConfig
     from .nodes.audio_utils import LoadAudio
     from .nodes.asr_prompter import ShrugASRNode
+    from .nodes.endpoint_status import ShrugEndpointStatus
 
     # Populate mappings within the try block
     NODE_CLASS_MAPPINGS.update({
@@ -44,6 +45,7 @@ try:
         "AccumulationNodeCompat": AccumulationNodeCompat, "AdvancedVLMSampler": AdvancedVLMSampler, "RemoteTextEncoder": RemoteTextEncoder,
         "SeedPromptGenerator": SeedPromptGenerator, "TwoRoundVLMPrompter": TwoRoundVLMPrompter, "VLMStyleRewriter": VLMStyleRewriter,
         "DualProviderConfig": DualProviderConfig, "LoadAudio": LoadAudio, "ShrugASRNode": ShrugASRNode,
+        "ShrugEndpointStatus": ShrugEndpointStatus,
     })
 
     NODE_DISPLAY_NAME_MAPPINGS.update({
@@ -61,6 +63,7 @@ try:
         "AdvancedVLMSampler": "Advanced VLM Sampler", "RemoteTextEncoder": "Remote Text Encoder", "SeedPromptGenerator": "Seed Prompt Generator",
         "TwoRoundVLMPrompter": "Two-Round VLM Prompter", "VLMStyleRewriter": "VLM Style Rewriter", "DualProviderConfig": "Dual Provider Config",
         "LoadAudio": "Load Audio File", "ShrugASRNode": "Shrug Speech-to-Text (ASR)",
+        "ShrugEndpointStatus": "Endpoint Status",
     })
 
 except ImportError as e:
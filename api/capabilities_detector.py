@@ -1,60 +1,193 @@
 """Server capability detection for optimal performance"""
-import requests
+import os
+import threading
+import time
 import json
 from typing import Dict, Optional
 
+try:
+    from api.session_pool import SessionPool
+except ImportError:
+    from .session_pool import SessionPool
+
+try:
+    from response_cache import _default_cache_dir
+except ImportError:
+    from ..response_cache import _default_cache_dir
+
 class CapabilityDetector:
-    """Detects server capabilities and optimizations"""
-    
-    _cache = {}  # Cache capabilities by base_url
-    
+    """
+    Detects server capabilities and optimizations.
+
+    Results are cached per base_url: successful probes for positive_ttl seconds,
+    failed probes for negative_ttl seconds. A failed re-probe of a server with known
+    capabilities keeps them and only re-checks sooner, so one slow probe doesn't
+    switch the uploader back to base64. Only the first contact with a server
+    probes synchronously; once an entry expires the stale value keeps being served
+    while a background thread re-probes, so the request path never waits.
+
+    Successful results are also saved to capabilities.json in the cache directory
+    and loaded at import as already-expired entries: the first request after a
+    restart uses them immediately and triggers a background revalidation
+    (conditional on the server's ETag when it sent one).
+    """
+
+    _cache = {}  # base_url -> (capabilities or None, expires_at)
+    _snapshot = {}  # base_url -> {"capabilities", "etag", "version"} of the last good probe
+    _refreshing = set()
+    _lock = threading.Lock()
+
+    positive_ttl = float(os.environ.get("SHRUG_CAPS_TTL", "600"))
+    negative_ttl = float(os.environ.get("SHRUG_CAPS_NEGATIVE_TTL", "30"))
+
     @classmethod
     def get_capabilities(cls, base_url: str) -> Optional[Dict]:
         """Get and cache server capabilities"""
-        if base_url in cls._cache:
-            return cls._cache[base_url]
-        
+        entry = cls._cache.get(base_url)
+        if entry is None:
+            return cls._probe(base_url)
+
+        capabilities, expires_at = entry
+        if time.monotonic() >= expires_at:
+            cls._refresh_in_background(base_url)
+        return capabilities
+
+    @classmethod
+    def invalidate(cls, base_url: Optional[str] = None):
+        """Forget cached capabilities for one server (or all), so the next request re-probes"""
+        with cls._lock:
+            if base_url is None:
+                cls._cache.clear()
+            else:
+                cls._cache.pop(base_url, None)
+
+    @classmethod
+    def _refresh_in_background(cls, base_url: str):
+        with cls._lock:
+            if base_url in cls._refreshing:
+                return
+            cls._refreshing.add(base_url)
+
+        def refresh():
+            try:
+                cls._probe(base_url)
+            finally:
+                with cls._lock:
+                    cls._refreshing.discard(base_url)
+
+        threading.Thread(target=refresh, name="shrug-caps-refresh", daemon=True).start()
+
+    @classmethod
+    def _probe(cls, base_url: str) -> Optional[Dict]:
+        previous = cls._cache.get(base_url, (None, 0))[0]
+        known = cls._snapshot.get(base_url)
+        headers = {"If-None-Match": known["etag"]} if known and known.get("etag") else {}
+        capabilities, entry, failed = None, known, False
         try:
-            response = requests.get(f"{base_url}/v1/capabilities", timeout=2)
-            if response.status_code == 200:
+            response = SessionPool.get_session(base_url).get(f"{base_url}/v1/capabilities", headers=headers, timeout=2)
+            failed = response.status_code >= 500
+            if response.status_code == 304:
+                capabilities = known["capabilities"]
+            elif response.status_code == 200:
                 capabilities = response.json()
-                cls._cache[base_url] = capabilities
-                
-                # Log detected optimizations
-                print(f"[Shrug-Prompter] Server capabilities detected for {base_url}:")
-                opts = capabilities.get("optimizations", {})
-                if opts.get("json", {}).get("orjson_available"):
-                    print("  ✓ Fast JSON (3-10x speedup)")
-                if opts.get("image", {}).get("turbojpeg_available"):
-                    print("  ✓ TurboJPEG (4-10x faster JPEG)")
-                if opts.get("image", {}).get("xxhash_available"):
-                    print("  ✓ xxHash (50x faster hashing)")
-                
-                # Check multipart endpoint
-                if capabilities.get("endpoints", {}).get("fast_vision", {}).get("available"):
-                    print("  ✓ Multipart endpoint (57ms faster per image)")
-                
-                return capabilities
+                entry = {
+                    "capabilities": capabilities,
+                    "etag": response.headers.get("ETag"),
+                    "version": capabilities.get("version") or capabilities.get("server_version"),
+                }
         except Exception as e:
-            print(f"[Shrug-Prompter] Could not detect server capabilities: {e}")
-        
-        cls._cache[base_url] = None
-        return None
-    
+            failed = True
+            if previous is not None or base_url not in cls._cache:
+                print(f"[Shrug-Prompter] Could not detect server capabilities: {e}")
+
+        ttl = cls.positive_ttl if capabilities is not None else cls.negative_ttl
+        if failed and previous is not None:
+            capabilities = previous  # Transient failure: keep what we knew, re-check after negative_ttl
+        with cls._lock:
+            cls._cache[base_url] = (capabilities, time.monotonic() + ttl)
+            changed = entry != known
+            if changed:
+                cls._snapshot[base_url] = entry
+
+        if capabilities is not None and capabilities != previous:
+            cls._log_capabilities(base_url, capabilities)
+        if changed:
+            cls.save_snapshot()
+        return capabilities
+
+    # Persisted snapshot
+
+    @staticmethod
+    def _snapshot_path() -> str:
+        return os.path.join(_default_cache_dir(), "capabilities.json")
+
+    @classmethod
+    def load_snapshot(cls, path: Optional[str] = None):
+        """Seed the cache from the last saved snapshot; entries start expired so they get revalidated"""
+        path = path or cls._snapshot_path()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"[Shrug-Prompter] Ignoring unreadable capability snapshot {path}: {e}")
+            return
+
+        with cls._lock:
+            for base_url, entry in snapshot.get("servers", {}).items():
+                if base_url in cls._cache or not isinstance(entry.get("capabilities"), dict):
+                    continue
+                cls._cache[base_url] = (entry["capabilities"], 0.0)
+                cls._snapshot[base_url] = {key: entry.get(key) for key in ("capabilities", "etag", "version")}
+
+    @classmethod
+    def save_snapshot(cls, path: Optional[str] = None):
+        """Write every server's last good capabilities to disk (atomically)"""
+        path = path or cls._snapshot_path()
+        with cls._lock:
+            servers = {base_url: dict(entry, saved_at=time.time()) for base_url, entry in cls._snapshot.items()}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"servers": servers}, f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[Shrug-Prompter] Could not save capability snapshot: {e}")
+
+    @staticmethod
+    def _log_capabilities(base_url: str, capabilities: Dict):
+        print(f"[Shrug-Prompter] Server capabilities detected for {base_url}:")
+        opts = capabilities.get("optimizations", {})
+        if opts.get("json", {}).get("orjson_available"):
+            print("  ✓ Fast JSON (3-10x speedup)")
+        if opts.get("image", {}).get("turbojpeg_available"):
+            print("  ✓ TurboJPEG (4-10x faster JPEG)")
+        if opts.get("image", {}).get("xxhash_available"):
+            print("  ✓ xxHash (50x faster hashing)")
+
+        # Check multipart endpoint
+        if capabilities.get("endpoints", {}).get("fast_vision", {}).get("available"):
+            print("  ✓ Multipart endpoint (57ms faster per image)")
+
     @classmethod
     def should_use_multipart(cls, base_url: str) -> bool:
         """Check if multipart endpoint should be used"""
         caps = cls.get_capabilities(base_url)
         if not caps:
             return False
-        
+
         return caps.get("recommendations", {}).get("vision_models", {}).get("use_multipart", False)
-    
+
     @classmethod
     def get_optimal_batch_size(cls, base_url: str) -> int:
         """Get recommended batch size"""
         caps = cls.get_capabilities(base_url)
         if not caps:
             return 4  # Default
-        
-        return caps.get("recommendations", {}).get("batch_size", {}).get("optimal", 4)
\ No newline at end of file
+
+        return caps.get("recommendations", {}).get("batch_size", {}).get("optimal", 4)
+
+
+CapabilityDetector.load_snapshot()
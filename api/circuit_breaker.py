@@ -0,0 +1,180 @@
+"""Per-server circuit breakers, so requests to a dead server fail fast"""
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+try:
+    from api.session_pool import SessionPool
+except ImportError:
+    from .session_pool import SessionPool
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_server_failure(response) -> bool:
+    """Connection errors, timeouts and 5xx mean the server is unhealthy; 4xx/429 don't"""
+    error = response.get("error") if isinstance(response, dict) else None
+    if not error or error.get("type") != "request_error":
+        return False
+    status = error.get("status_code")
+    if status is not None:
+        return status >= 500
+    return error.get("reason") in ("connection", "timeout")
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one server (scheme://host:port).
+
+    closed:    requests flow normally; failure_threshold consecutive server
+               failures open the circuit.
+    open:      requests fail immediately with a circuit_open error instead of
+               waiting for a connect/read timeout.
+    half_open: once reset_timeout has passed, the next caller sends a cheap probe
+               (GET /v1/models). Any HTTP answer closes the circuit; no answer
+               re-opens it for another reset_timeout.
+
+    Use CircuitBreaker.get(base_url) for the shared breaker of a server.
+    """
+
+    failure_threshold = int(os.environ.get("SHRUG_BREAKER_FAILURES", "5"))
+    reset_timeout = float(os.environ.get("SHRUG_BREAKER_RESET", "30"))
+    probe_timeout = float(os.environ.get("SHRUG_BREAKER_PROBE_TIMEOUT", "5"))
+    enabled = os.environ.get("SHRUG_BREAKER", "true").lower() in ("1", "true", "yes")
+
+    _breakers: Dict[str, "CircuitBreaker"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, key: str, probe: Optional[Callable[[str], bool]] = None):
+        self.key = key
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.last_error = None
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+        self._probe = probe or self._default_probe
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, base_url: str) -> "CircuitBreaker":
+        key = SessionPool._key(base_url)
+        with cls._registry_lock:
+            breaker = cls._breakers.get(key)
+            if breaker is None:
+                breaker = cls._breakers[key] = cls(key)
+            return breaker
+
+    @classmethod
+    def all_states(cls) -> List[Dict]:
+        """Snapshot of every known server's breaker, for dashboards"""
+        with cls._registry_lock:
+            breakers = list(cls._breakers.values())
+        return [b.snapshot() for b in breakers]
+
+    @classmethod
+    def reset(cls, base_url: Optional[str] = None):
+        """Forget breaker state for one server, or for all of them"""
+        with cls._registry_lock:
+            if base_url is None:
+                cls._breakers.clear()
+            else:
+                cls._breakers.pop(SessionPool._key(base_url), None)
+
+    def _default_probe(self, key: str) -> bool:
+        try:
+            SessionPool.get_session(key).get(f"{key}/v1/models", timeout=self.probe_timeout)
+            return True  # Any HTTP response means the server is reachable
+        except Exception:
+            return False
+
+    def allow(self) -> bool:
+        """True if a request may be sent now; runs the recovery probe when it is due"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            if self._probing:
+                # Another caller is already checking whether the server is back
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probing = True
+
+        healthy = False
+        try:
+            healthy = self._probe(self.key)
+        finally:
+            with self._lock:
+                self._probing = False
+                if healthy:
+                    print(f"[Shrug-Prompter] {self.key} is reachable again, closing circuit")
+                    self.state = CLOSED
+                    self.consecutive_failures = 0
+                else:
+                    self.state = OPEN
+                    self.opened_at = time.monotonic()
+                    self.rejected += 1
+        return healthy
+
+    def record(self, response):
+        """Update state from a response or error dict"""
+        if is_server_failure(response):
+            self.record_failure(response["error"].get("message"))
+        elif not (isinstance(response, dict) and response.get("error", {}).get("type") == "circuit_open"):
+            self.record_success()
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self.state = CLOSED
+
+    def record_failure(self, message: Optional[str] = None):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = message
+            if self.state != OPEN and (self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                print(f"[Shrug-Prompter] {self.key} failed {self.consecutive_failures} times in a row, "
+                      f"failing fast for {self.reset_timeout:.0f}s")
+
+    def open_error(self) -> Dict:
+        """Error dict returned instead of sending while the circuit is open"""
+        retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return {
+            "error": {
+                "message": f"Circuit open for {self.key} after repeated failures; next check in {retry_in:.0f}s"
+                           + (f" (last error: {self.last_error})" if self.last_error else ""),
+                "type": "circuit_open",
+                "reason": "circuit_open",
+            }
+        }
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)) if self.state == OPEN else 0.0
+            return {
+                "server": self.key,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "successes": self.successes,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+                "retry_in": round(retry_in, 1),
+                "last_error": self.last_error,
+            }
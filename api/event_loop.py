@@ -0,0 +1,56 @@
+"""Private asyncio event loop on a daemon thread, so sync nodes can run async code"""
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+
+class BackgroundLoop:
+    """
+    A single event loop running on its own thread for the whole process.
+
+    ComfyUI nodes execute synchronously, and ComfyUI's server owns the main
+    event loop, so async work is submitted here instead of calling
+    asyncio.run() (which fails inside a running loop) or touching ComfyUI's loop.
+    """
+
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _thread: Optional[threading.Thread] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_loop(cls) -> asyncio.AbstractEventLoop:
+        """Start the loop thread on first use"""
+        with cls._lock:
+            if cls._loop is None or cls._loop.is_closed() or not cls._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                cls._thread = threading.Thread(target=run, name="shrug-async-loop", daemon=True)
+                cls._thread.start()
+                ready.wait()
+                cls._loop = loop
+            return cls._loop
+
+    @classmethod
+    def run(cls, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the background loop and block until it finishes"""
+        loop = cls.get_loop()
+        if threading.current_thread() is cls._thread:
+            raise RuntimeError("BackgroundLoop.run() called from the loop thread; await the coroutine instead")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    @classmethod
+    def stop(cls):
+        """Stop the loop thread (a new one starts on the next run())"""
+        with cls._lock:
+            loop, thread = cls._loop, cls._thread
+            cls._loop = cls._thread = None
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            loop.close()
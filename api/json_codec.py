@@ -0,0 +1,89 @@
+"""
+JSON encoding with the fastest available backend.
+
+Uses orjson, else msgspec, else the standard library; SHRUG_JSON=orjson|msgspec|json
+forces one. Every backend produces compact UTF-8, so request bodies and cache keys
+look the same whichever one is installed.
+"""
+import json
+import os
+from typing import Any, Union
+
+try:
+    import orjson  # Optional, several times faster on large base64 payloads
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec  # Optional, similar speed to orjson
+except ImportError:
+    msgspec = None
+
+
+def _pick_backend() -> str:
+    available = {"orjson": orjson is not None, "msgspec": msgspec is not None, "json": True}
+    requested = os.environ.get("SHRUG_JSON", "").lower()
+    if requested:
+        if available.get(requested):
+            return requested
+        print(f"[Shrug-Prompter] SHRUG_JSON={requested} is not available, using the fastest installed JSON backend")
+    return next(name for name in ("orjson", "msgspec", "json") if available[name])
+
+
+BACKEND = _pick_backend()
+
+if BACKEND == "orjson":
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+    _ORJSON_CANONICAL = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+elif BACKEND == "msgspec":
+    _msgspec_encoder = msgspec.json.Encoder()
+    _msgspec_canonical = msgspec.json.Encoder(enc_hook=str, order="sorted")
+    _msgspec_decoder = msgspec.json.Decoder()
+
+
+def _stdlib_dumps(obj: Any, sort_keys: bool = False, default=None) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False,
+                      sort_keys=sort_keys, default=default).encode("utf-8")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    try:
+        if BACKEND == "orjson":
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+        if BACKEND == "msgspec":
+            return _msgspec_encoder.encode(obj)
+    except TypeError:
+        pass  # Something the fast encoder rejects (e.g. a >64-bit int); the stdlib may still cope
+    return _stdlib_dumps(obj)
+
+
+def dumps_str(obj: Any) -> str:
+    """dumps() as a str, for APIs that want text"""
+    return dumps(obj).decode("utf-8")
+
+
+def canonical_dumps(obj: Any) -> bytes:
+    """Sorted-key JSON with unknown types as str(), for hashing into cache keys"""
+    try:
+        if BACKEND == "orjson":
+            return orjson.dumps(obj, option=_ORJSON_CANONICAL, default=str)
+        if BACKEND == "msgspec":
+            return _msgspec_canonical.encode(obj)
+    except TypeError:
+        pass
+    return _stdlib_dumps(obj, sort_keys=True, default=str)
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Parse JSON from bytes or str; raises ValueError on invalid input"""
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    if BACKEND == "msgspec":
+        try:
+            return _msgspec_decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    return json.loads(data)
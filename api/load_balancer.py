@@ -0,0 +1,200 @@
+"""Client-side load balancing across several identical inference servers"""
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Union
+
+STRATEGIES = ["least_outstanding", "round_robin", "latency_ewma"]
+
+
+class _Endpoint:
+    __slots__ = ("url", "outstanding", "requests", "failures", "consecutive_failures",
+                 "ewma_latency", "ejected_until")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ewma_latency: Optional[float] = None
+        self.ejected_until = 0.0
+
+
+class EndpointPool:
+    """
+    Spreads requests over a set of base URLs serving the same model.
+
+    Strategies:
+        least_outstanding: endpoint with the fewest requests in flight
+        round_robin:       rotate through endpoints in order
+        latency_ewma:      lowest smoothed latency, weighted by requests in flight
+
+    max_per_endpoint caps requests in flight per endpoint (0 = unlimited); callers
+    wait for a free slot. An endpoint that fails eject_after times in a row is
+    skipped for eject_seconds, then gets traffic again. If every endpoint is
+    ejected, the one whose ejection ends first is used rather than failing.
+    """
+
+    _registry: Dict[tuple, "EndpointPool"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, urls: Sequence[str], strategy: str = "least_outstanding", max_per_endpoint: int = 0,
+                 eject_after: int = 3, eject_seconds: float = 30.0, ewma_alpha: float = 0.3):
+        if not urls:
+            raise ValueError("EndpointPool needs at least one base URL")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown load balancing strategy '{strategy}', expected one of {STRATEGIES}")
+        self.strategy = strategy
+        self.max_per_endpoint = max(0, int(max_per_endpoint))
+        self.eject_after = max(1, int(eject_after))
+        self.eject_seconds = float(eject_seconds)
+        self.ewma_alpha = float(ewma_alpha)
+        self._endpoints = [_Endpoint(url.rstrip("/")) for url in urls]
+        self._by_url = {ep.url: ep for ep in self._endpoints}
+        self._rotation = itertools.count()
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config: Union["EndpointPool", Dict]) -> "EndpointPool":
+        """
+        Shared pool for an endpoint_pool config dict ({"urls": [...], "strategy": ...,
+        "max_per_endpoint": ...}), so every node using the same servers shares its
+        in-flight counts, latencies and ejections.
+        """
+        if isinstance(config, EndpointPool):
+            return config
+        urls = tuple(url.rstrip("/") for url in config["urls"])
+        strategy = config.get("strategy", "least_outstanding")
+        max_per_endpoint = int(config.get("max_per_endpoint", 0))
+        key = (urls, strategy, max_per_endpoint)
+        with cls._registry_lock:
+            pool = cls._registry.get(key)
+            if pool is None:
+                pool = cls._registry[key] = cls(urls, strategy=strategy, max_per_endpoint=max_per_endpoint)
+            return pool
+
+    @classmethod
+    def all_pools(cls) -> List["EndpointPool"]:
+        """Every shared pool created through from_config"""
+        with cls._registry_lock:
+            return list(cls._registry.values())
+
+    @property
+    def urls(self) -> List[str]:
+        return [ep.url for ep in self._endpoints]
+
+    def _pick(self, now: float) -> Optional[_Endpoint]:
+        # Called with the condition lock held
+        candidates = [ep for ep in self._endpoints
+                      if not self.max_per_endpoint or ep.outstanding < self.max_per_endpoint]
+        if not candidates:
+            return None
+        healthy = [ep for ep in candidates if ep.ejected_until <= now]
+        if not healthy:
+            if any(ep.ejected_until <= now for ep in self._endpoints):
+                return None  # A healthy endpoint is just at its cap; wait for it
+            return min(candidates, key=lambda ep: ep.ejected_until)
+
+        start = next(self._rotation)
+        if self.strategy == "round_robin":
+            return healthy[start % len(healthy)]
+        # Rotate before min() so ties are spread out instead of always hitting the first URL
+        rotated = healthy[start % len(healthy):] + healthy[:start % len(healthy)]
+        if self.strategy == "latency_ewma":
+            # Unmeasured endpoints score 0 so each one gets probed
+            return min(rotated, key=lambda ep: (ep.ewma_latency or 0.0) * (ep.outstanding + 1))
+        return min(rotated, key=lambda ep: ep.outstanding)
+
+    def try_acquire(self) -> Optional[str]:
+        """Reserve an endpoint without waiting; None if all are at their cap"""
+        with self._cond:
+            ep = self._pick(time.monotonic())
+            if ep is None:
+                return None
+            ep.outstanding += 1
+            ep.requests += 1
+            return ep.url
+
+    def acquire(self, timeout: Optional[float] = None) -> str:
+        """Reserve an endpoint, waiting for a free slot if every endpoint is at its cap"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                ep = self._pick(time.monotonic())
+                if ep is not None:
+                    ep.outstanding += 1
+                    ep.requests += 1
+                    return ep.url
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No endpoint slot became free in time")
+                # Wake up periodically too, in case an ejection expires
+                self._cond.wait(timeout=min(1.0, remaining) if remaining is not None else 1.0)
+
+    def release(self, url: str, success: bool = True, latency: Optional[float] = None):
+        """Return an endpoint slot and record the outcome"""
+        with self._cond:
+            ep = self._by_url.get(url.rstrip("/"))
+            if ep is None:
+                return
+            ep.outstanding = max(0, ep.outstanding - 1)
+            if success:
+                ep.consecutive_failures = 0
+                if latency is not None:
+                    ep.ewma_latency = latency if ep.ewma_latency is None else (
+                        self.ewma_alpha * latency + (1 - self.ewma_alpha) * ep.ewma_latency)
+            else:
+                ep.failures += 1
+                ep.consecutive_failures += 1
+                if ep.consecutive_failures >= self.eject_after:
+                    ep.ejected_until = time.monotonic() + self.eject_seconds
+                    ep.consecutive_failures = 0
+                    print(f"[Shrug-Prompter] Ejecting endpoint {ep.url} for {self.eject_seconds:.0f}s after repeated failures")
+            self._cond.notify_all()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        """
+        with pool.lease() as lease: ... lease["url"] ...; set lease["success"] = False on failure.
+        Latency is measured around the block.
+        """
+        lease = {"url": self.acquire(timeout), "success": True}
+        start = time.perf_counter()
+        try:
+            yield lease
+        except BaseException:
+            lease["success"] = False
+            raise
+        finally:
+            self.release(lease["url"], lease["success"], time.perf_counter() - start)
+
+    def stats(self) -> List[Dict]:
+        """Per-endpoint counters for debugging"""
+        now = time.monotonic()
+        with self._cond:
+            return [
+                {
+                    "url": ep.url,
+                    "outstanding": ep.outstanding,
+                    "requests": ep.requests,
+                    "failures": ep.failures,
+                    "ewma_latency": round(ep.ewma_latency, 3) if ep.ewma_latency is not None else None,
+                    "ejected_for": round(ep.ejected_until - now, 1) if ep.ejected_until > now else 0,
+                }
+                for ep in self._endpoints
+            ]
+
+    def __repr__(self):
+        return f"EndpointPool({self.urls!r}, strategy={self.strategy!r}, max_per_endpoint={self.max_per_endpoint})"
+
+
+def parse_base_urls(value: str) -> List[str]:
+    """Split a comma/newline separated list of base URLs, adding http:// where missing"""
+    urls = []
+    for part in value.replace("\n", ",").split(","):
+        part = part.strip().rstrip("/")
+        if part:
+            urls.append(part if part.startswith(("http://", "https://")) else f"http://{part}")
+    return urls
@@ -0,0 +1,135 @@
+"""Streaming multipart/form-data encoder for image uploads"""
+import os
+import time
+import uuid
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Largest slice handed to the socket at once (chunked transfer frames each one)
+CHUNK_SIZE = int(os.environ.get("SHRUG_UPLOAD_CHUNK_KB", "256")) * 1024
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def guess_image_type(data) -> Tuple[str, str]:
+    """(extension, MIME type) from the first bytes of an encoded image; JPEG if unknown"""
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        return "jpg", "image/jpeg"
+    head = bytes(memoryview(data)[:12])
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png", "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp", "image/webp"
+    return "jpg", "image/jpeg"
+
+
+class MultipartEncoder:
+    """
+    Iterable multipart/form-data body.
+
+    Image parts are sent as memoryview slices of the caller's buffers (or as the
+    chunks of a generator), so the body is never assembled into one buffer: at most
+    one CHUNK_SIZE slice is in flight besides the images themselves. Pass the
+    encoder as `data=` to requests (or wrap it for aiohttp) and the body goes out
+    with chunked transfer encoding.
+
+    fields: (name, value) pairs of small text fields
+    files:  (name, filename, content_type, data) where data is bytes-like or an
+            iterable of bytes-like chunks
+    """
+
+    def __init__(self, fields: Sequence[Tuple[str, str]], files: Sequence[Tuple[str, str, str, object]],
+                 boundary: Optional[str] = None, chunk_size: int = CHUNK_SIZE):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.fields = list(fields)
+        self.files = list(files)
+        self.chunk_size = max(1024, int(chunk_size))
+        self.bytes_sent = 0
+        self.started = None
+        self.finished = None
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def _field_header(self, name: str, filename: Optional[str] = None, content_type: Optional[str] = None) -> bytes:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        header = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+        if content_type:
+            header += f"Content-Type: {content_type}\r\n"
+        return (header + "\r\n").encode("utf-8")
+
+    def _parts(self) -> Iterator[BytesLike]:
+        # Text fields are tiny; send them as one block
+        text = bytearray()
+        for name, value in self.fields:
+            text += self._field_header(name)
+            text += str(value).encode("utf-8")
+            text += b"\r\n"
+        if text:
+            yield bytes(text)
+
+        for name, filename, content_type, data in self.files:
+            yield self._field_header(name, filename, content_type)
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                view = memoryview(data).cast("B")
+                for offset in range(0, len(view), self.chunk_size):
+                    yield view[offset:offset + self.chunk_size]
+            else:
+                for chunk in data:
+                    yield chunk
+            yield b"\r\n"
+
+        yield f"--{self.boundary}--\r\n".encode("utf-8")
+
+    def __iter__(self) -> Iterator[BytesLike]:
+        self.bytes_sent = 0
+        self.started = time.perf_counter()
+        self.finished = None
+        for chunk in self._parts():
+            if len(chunk):
+                yield chunk
+                # The consumer asks for the next chunk once this one is written
+                self.bytes_sent += len(chunk)
+        self.finished = time.perf_counter()
+
+    async def async_chunks(self):
+        """Async iterator over the body, for aiohttp's data= argument"""
+        for chunk in self:
+            yield chunk
+
+    def upload_stats(self) -> Dict:
+        """Bytes sent and throughput of the last upload"""
+        if self.started is None:
+            return {"bytes": 0, "seconds": 0.0, "mb_per_s": 0.0}
+        seconds = (self.finished or time.perf_counter()) - self.started
+        return {
+            "bytes": self.bytes_sent,
+            "seconds": round(seconds, 4),
+            "mb_per_s": round(self.bytes_sent / seconds / (1024 * 1024), 2) if seconds > 0 else 0.0,
+        }
+
+
+def build_image_form(llm_model: str, messages_json: str, max_tokens, temperature, top_p,
+                     raw_images: Iterable, extra: Dict) -> MultipartEncoder:
+    """Multipart body for /v1/chat/completions/multipart"""
+    fields: List[Tuple[str, str]] = [
+        ("model", llm_model),
+        ("messages", messages_json),
+        ("max_tokens", str(max_tokens)),
+        ("temperature", str(temperature)),
+        ("top_p", str(top_p)),
+        ("stream", "false"),
+    ]
+    for key, value in extra.items():
+        if key == "preserve_alpha":
+            fields.append((key, "true" if value else "false"))
+        else:
+            fields.append((key, str(value)))
+
+    files = []
+    for i, img in enumerate(raw_images):
+        extension, mime = guess_image_type(img)
+        files.append(("images", f"image_{i}.{extension}", mime, img))
+    return MultipartEncoder(fields, files)
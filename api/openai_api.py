@@ -1,8 +1,9 @@
 # Simple synchronous OpenAI API implementation for ComfyUI
 import requests
-import json
+from urllib3.exceptions import ReadTimeoutError
 import os
 import sys
+import time
 from typing import Optional, Dict, List, Union
 
 # Import capability detector
@@ -15,8 +16,29 @@ try:
 except ImportError:
     CapabilityDetector = None
 
+from api.session_pool import SessionPool
+from api.circuit_breaker import CircuitBreaker
+from api.sse import iter_sse_data, parse_chat_chunk
+from api.multipart import build_image_form
+from api.json_codec import dumps, dumps_str, loads
+from instrumentation import record_request
+
 
 def send_request_openai(messages, api_key, base_url, llm_model, max_tokens, temperature, top_p, **kwargs):
+    """
+    Send a request through the server's circuit breaker: while the server is
+    known to be down this returns a circuit_open error immediately. See
+    _send_request_openai for arguments and return value.
+    """
+    breaker = CircuitBreaker.get(base_url)
+    if not breaker.allow():
+        return breaker.open_error()
+    response = _send_request_openai(messages, api_key, base_url, llm_model, max_tokens, temperature, top_p, **kwargs)
+    breaker.record(response)
+    return response
+
+
+def _send_request_openai(messages, api_key, base_url, llm_model, max_tokens, temperature, top_p, **kwargs):
     """
     Send a synchronous request to an OpenAI-compatible API.
 
@@ -28,11 +50,19 @@ def send_request_openai(messages, api_key, base_url, llm_model, max_tokens, temp
         max_tokens: Maximum tokens to generate
         temperature: Temperature for sampling
         top_p: Top-p for sampling
-        **kwargs: Additional parameters
+        **kwargs: Additional parameters. With stream=True the response is read as
+            server-sent events; stop_condition (callable on each text delta, True
+            to stop) and on_delta (callback per delta) apply to streamed requests.
 
     Returns:
-        Dict with API response or error
+        Dict with API response or error. Streamed responses are assembled into the
+        same chat.completion shape, plus a "streaming" dict with timing.
     """
+    # Streaming options; stop_condition and on_delta are client-side only
+    stream = bool(kwargs.pop('stream', False))
+    stop_condition = kwargs.pop('stop_condition', None)
+    on_delta = kwargs.pop('on_delta', None)
+
     try:
         # Prepare the request
         url = f"{base_url.rstrip('/')}/v1/chat/completions"
@@ -52,7 +82,7 @@ def send_request_openai(messages, api_key, base_url, llm_model, max_tokens, temp
             "max_tokens": max_tokens,
             "temperature": temperature,
             "top_p": top_p,
-            "stream": False
+            "stream": stream
         }
 
         # Add any extra parameters, but skip None values
@@ -80,29 +110,51 @@ def send_request_openai(messages, api_key, base_url, llm_model, max_tokens, temp
                     max_tokens, temperature, top_p, **kwargs_without_raw
                 )
 
+        if stream:
+            return _send_streaming_request(url, headers, body, base_url, kwargs.get('timeout', 300), stop_condition, on_delta)
+
+        t0 = time.perf_counter()
+        payload = dumps(body)
+        t1 = time.perf_counter()
+
         # Make standard request
         # Default to 300 seconds (5 minutes) for vision models which can be slow
-        response = requests.post(
+        response = SessionPool.get_session(base_url).post(
             url,
             headers=headers,
-            json=body,
+            data=payload,
             timeout=kwargs.get('timeout', 300)
         )
+        t2 = time.perf_counter()
 
         # Check for errors
         response.raise_for_status()
 
         # Return the JSON response
-        return response.json()
+        result = loads(response.content)
+        record_request(serialize=t1 - t0, ttfb=response.elapsed.total_seconds(), network=t2 - t1,
+                       parse=time.perf_counter() - t2, payload_bytes=len(payload))
+        return result
 
     except requests.exceptions.RequestException as e:
         # Return error in OpenAI format
-        return {
-            "error": {
-                "message": str(e),
-                "type": "request_error"
-            }
+        error = {
+            "message": str(e),
+            "type": "request_error"
         }
+        # Details for retry and load balancing decisions
+        if getattr(e, "response", None) is not None:
+            error["reason"] = "http"
+            error["status_code"] = e.response.status_code
+            if e.response.headers.get("Retry-After"):
+                error["retry_after"] = e.response.headers["Retry-After"]
+        elif isinstance(e, requests.exceptions.ReadTimeout) or (e.args and isinstance(e.args[0], ReadTimeoutError)):
+            error["reason"] = "timeout"  # requests reports a body read that timed out as a ConnectionError
+        elif isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout)):
+            error["reason"] = "connection"
+        elif isinstance(e, requests.exceptions.Timeout):
+            error["reason"] = "timeout"
+        return {"error": error}
     except Exception as e:
         return {
             "error": {
@@ -112,6 +164,86 @@ def send_request_openai(messages, api_key, base_url, llm_model, max_tokens, temp
         }
 
 
+def _send_streaming_request(url, headers, body, base_url, timeout, stop_condition=None, on_delta=None):
+    """
+    Send a stream=True request and assemble the SSE deltas into a chat.completion dict.
+
+    Records time to first token. When stop_condition returns True the connection
+    is closed right away, so the server stops generating instead of running on to
+    max_tokens; finish_reason is then "stop_condition".
+    """
+    payload = dumps(body)
+    start = time.perf_counter()
+    response = SessionPool.get_session(base_url).post(url, headers=headers, data=payload, timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+
+        # Servers without streaming support just answer with a normal JSON body
+        if "text/event-stream" not in response.headers.get("Content-Type", ""):
+            return loads(response.content)
+
+        parts = []
+        first_token_at = None
+        finish_reason = None
+        stopped_early = False
+        usage = None
+        meta = {}
+        chunks = 0
+
+        for data in iter_sse_data(response.iter_content(chunk_size=None)):
+            chunk = parse_chat_chunk(data)
+            if chunk is None:
+                continue
+            if "error" in chunk:
+                return {"error": chunk["error"]}
+            chunks += 1
+            usage = chunk.get("usage") or usage
+            if not meta:
+                meta = {k: chunk[k] for k in ("id", "model", "created") if k in chunk}
+
+            for choice in chunk.get("choices") or []:
+                if choice.get("index", 0) != 0:
+                    continue
+                finish_reason = choice.get("finish_reason") or finish_reason
+                text = (choice.get("delta") or {}).get("content") or ""
+                if not text:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(text)
+                if on_delta:
+                    on_delta(text)
+                if stop_condition and stop_condition(text):
+                    stopped_early = True
+
+            if stopped_early:
+                break
+    finally:
+        # Closing mid-stream drops the connection, which aborts generation server-side
+        response.close()
+
+    total_time = time.perf_counter() - start
+    record_request(ttfb=response.elapsed.total_seconds(), network=total_time, payload_bytes=len(payload))
+    result = {
+        **meta,
+        "object": "chat.completion",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(parts)},
+            "finish_reason": "stop_condition" if stopped_early else finish_reason,
+        }],
+        "streaming": {
+            "time_to_first_token": round(first_token_at - start, 4) if first_token_at else None,
+            "total_time": round(total_time, 4),
+            "chunks": chunks,
+            "stopped_early": stopped_early,
+        },
+    }
+    if usage:
+        result["usage"] = usage
+    return result
+
+
 def _send_multipart_request(messages, raw_images, api_key, base_url, llm_model, max_tokens, temperature, top_p, **kwargs):
     """
     Send request using multipart endpoint for faster processing per image.
@@ -120,7 +252,6 @@ def _send_multipart_request(messages, raw_images, api_key, base_url, llm_model,
     try:
         url = f"{base_url.rstrip('/')}/v1/chat/completions/multipart"
 
-        # Prepare headers (no Content-Type, requests will set it with boundary)
         headers = {}
         if api_key and api_key != "not-required-for-local":
             headers["Authorization"] = f"Bearer {api_key}"
@@ -149,50 +280,46 @@ def _send_multipart_request(messages, raw_images, api_key, base_url, llm_model,
             else:
                 messages_with_placeholders.append(msg)
 
-        # Prepare multipart data
-        data = {
-            'model': llm_model,
-            'messages': json.dumps(messages_with_placeholders),
-            'max_tokens': str(max_tokens),
-            'temperature': str(temperature),
-            'top_p': str(top_p),
-            'stream': 'false'
-        }
+        # Extra parameters including resize options
+        extra = {key: value for key, value in kwargs.items()
+                 if key not in ['raw_images', 'timeout'] and value is not None}
 
-        # Add extra parameters including resize options
-        resize_params = ['resize_max', 'resize_width', 'resize_height', 'image_quality', 'preserve_alpha']
-        for key, value in kwargs.items():
-            if key not in ['raw_images', 'timeout'] and value is not None:
-                # Handle boolean preserve_alpha specially
-                if key == 'preserve_alpha':
-                    data[key] = 'true' if value else 'false'
-                else:
-                    data[key] = str(value)
-
-        # Add image files
-        files = []
-        for i, img_bytes in enumerate(raw_images[:image_count]):
-            files.append(('images', (f'image_{i}.jpg', img_bytes, 'image/jpeg')))
+        # Images are streamed from their own buffers with chunked transfer, never copied into one body
+        t0 = time.perf_counter()
+        encoder = build_image_form(llm_model, dumps_str(messages_with_placeholders), max_tokens,
+                                   temperature, top_p, raw_images[:image_count], extra)
+        headers["Content-Type"] = encoder.content_type
+        t1 = time.perf_counter()
 
         # Make request
-        response = requests.post(
+        response = SessionPool.get_session(base_url).post(
             url,
             headers=headers,
-            data=data,
-            files=files,
+            data=encoder,
             timeout=kwargs.get('timeout', 300)
         )
+        t2 = time.perf_counter()
 
         response.raise_for_status()
-        return response.json()
+        result = loads(response.content)
+        upload = encoder.upload_stats()
+        record_request(serialize=t1 - t0, ttfb=response.elapsed.total_seconds(), network=t2 - t1,
+                       parse=time.perf_counter() - t2, upload=upload["seconds"], payload_bytes=upload["bytes"])
+        if isinstance(result, dict):
+            result["upload"] = upload
+        return result
 
     except Exception as e:
         # Fallback to standard endpoint on error
         print(f"[Shrug-Prompter] Multipart request failed, falling back to standard: {e}")
+        status = getattr(getattr(e, 'response', None), 'status_code', None)
+        if status in (404, 405) and CapabilityDetector:
+            # Endpoint is gone (e.g. server replaced); re-probe instead of trusting stale capabilities
+            CapabilityDetector.invalidate(base_url)
         # Remove raw_images from kwargs to use standard base64 method
         kwargs_copy = kwargs.copy()
         kwargs_copy.pop('raw_images', None)
-        return send_request_openai(
+        return _send_request_openai(
             messages, api_key, base_url, llm_model,
             max_tokens, temperature, top_p, **kwargs_copy
         )
@@ -0,0 +1,196 @@
+# Asyncio OpenAI API implementation, for nodes that fan out many requests
+import asyncio
+import os
+import sys
+import time
+import weakref
+from typing import Dict
+
+import aiohttp
+
+# Import capability detector
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+try:
+    from api.capabilities_detector import CapabilityDetector
+except ImportError:
+    CapabilityDetector = None
+
+from api.session_pool import SessionPool
+from api.circuit_breaker import CircuitBreaker, CLOSED
+from api.multipart import build_image_form
+from api.json_codec import dumps, dumps_str, loads
+from instrumentation import record_request
+
+# Total connections per event loop, and per server. Async requests are cheap, so
+# these are much higher than the thread-based SessionPool limits.
+ASYNC_LIMIT = int(os.environ.get("SHRUG_ASYNC_LIMIT", "256"))
+ASYNC_LIMIT_PER_HOST = int(os.environ.get("SHRUG_ASYNC_LIMIT_PER_HOST", "64"))
+
+# aiohttp sessions are bound to the loop they were created on: loop -> {host: session}
+_loop_sessions = weakref.WeakKeyDictionary()
+
+# Keys that control the client and must not be sent in the request body
+# (streaming is only implemented by the sync client)
+_CLIENT_ONLY_KEYS = ("timeout", "raw_images", "stop_condition", "on_delta")
+
+
+def _get_session(base_url: str) -> aiohttp.ClientSession:
+    """Keep-alive session for a server on the running event loop"""
+    loop = asyncio.get_running_loop()
+    sessions = _loop_sessions.setdefault(loop, {})
+    key = SessionPool._key(base_url)
+    session = sessions.get(key)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=ASYNC_LIMIT, limit_per_host=ASYNC_LIMIT_PER_HOST)
+        session = aiohttp.ClientSession(connector=connector, headers={"Connection": "keep-alive"})
+        sessions[key] = session
+    return session
+
+
+async def close_sessions():
+    """Close the sessions owned by the running event loop"""
+    sessions = _loop_sessions.pop(asyncio.get_running_loop(), {})
+    for session in sessions.values():
+        await session.close()
+
+
+def _auth_headers(api_key) -> Dict:
+    if api_key and api_key != "not-required-for-local":
+        return {"Authorization": f"Bearer {api_key}"}
+    return {}
+
+
+async def send_request_openai_async(messages, api_key, base_url, llm_model, max_tokens, temperature, top_p, **kwargs):
+    """Async send through the server's circuit breaker (see send_request_openai)"""
+    breaker = CircuitBreaker.get(base_url)
+    if breaker.state != CLOSED:
+        # allow() may run a blocking recovery probe
+        allowed = await asyncio.get_running_loop().run_in_executor(None, breaker.allow)
+        if not allowed:
+            return breaker.open_error()
+    response = await _send_request_openai_async(messages, api_key, base_url, llm_model, max_tokens, temperature, top_p, **kwargs)
+    breaker.record(response)
+    return response
+
+
+async def _send_request_openai_async(messages, api_key, base_url, llm_model, max_tokens, temperature, top_p, **kwargs):
+    """
+    Send a request to an OpenAI-compatible API without blocking the event loop.
+
+    Takes the same arguments and returns the same response/error dicts as
+    send_request_openai, including the multipart path for raw images.
+    """
+    try:
+        url = f"{base_url.rstrip('/')}/v1/chat/completions"
+        headers = {"Content-Type": "application/json", **_auth_headers(api_key)}
+
+        body = {
+            "model": llm_model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            "stream": False
+        }
+        for key, value in kwargs.items():
+            if key not in body and key not in _CLIENT_ONLY_KEYS and value is not None:
+                body[key] = value
+
+        raw_images = kwargs.get('raw_images', [])
+        if raw_images and CapabilityDetector:
+            # The detector may probe the server on first use; keep that off the loop
+            loop = asyncio.get_running_loop()
+            if await loop.run_in_executor(None, CapabilityDetector.should_use_multipart, base_url):
+                kwargs_without_raw = {k: v for k, v in kwargs.items() if k != 'raw_images'}
+                return await _send_multipart_request_async(
+                    messages, raw_images, api_key, base_url, llm_model,
+                    max_tokens, temperature, top_p, **kwargs_without_raw
+                )
+
+        t0 = time.perf_counter()
+        payload = dumps(body)
+        t1 = time.perf_counter()
+        timeout = aiohttp.ClientTimeout(total=kwargs.get('timeout', 300))
+        async with _get_session(base_url).post(url, headers=headers, data=payload, timeout=timeout) as response:
+            ttfb = time.perf_counter() - t1
+            response.raise_for_status()
+            content = await response.read()
+        t2 = time.perf_counter()
+        result = loads(content)
+        record_request(serialize=t1 - t0, ttfb=ttfb, network=t2 - t1, parse=time.perf_counter() - t2,
+                       payload_bytes=len(payload))
+        return result
+
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        error = {
+            "message": str(e) or type(e).__name__,
+            "type": "request_error"
+        }
+        # Details for retry and load balancing decisions
+        if isinstance(e, aiohttp.ClientResponseError):
+            error["reason"] = "http"
+            error["status_code"] = e.status
+            if e.headers and e.headers.get("Retry-After"):
+                error["retry_after"] = e.headers["Retry-After"]
+        elif isinstance(e, getattr(aiohttp, "ConnectionTimeoutError", ())):
+            error["reason"] = "connection"  # Never reached the server, safe to retry
+        elif isinstance(e, asyncio.TimeoutError):
+            error["reason"] = "timeout"
+        elif isinstance(e, aiohttp.ClientConnectionError):
+            error["reason"] = "connection"
+        return {"error": error}
+    except Exception as e:
+        return {
+            "error": {
+                "message": str(e),
+                "type": "unknown_error"
+            }
+        }
+
+
+async def _send_multipart_request_async(messages, raw_images, api_key, base_url, llm_model, max_tokens, temperature, top_p, **kwargs):
+    """Async version of the multipart upload; falls back to the JSON endpoint on error"""
+    try:
+        url = f"{base_url.rstrip('/')}/v1/chat/completions/multipart"
+
+        # Replace image entries with __RAW_IMAGE__ placeholders
+        messages_with_placeholders = []
+        image_count = 0
+        for msg in messages:
+            if isinstance(msg.get("content"), list):
+                new_content = []
+                for item in msg["content"]:
+                    if item.get("type") == "image_url":
+                        new_content.append({"type": "image_url", "image_url": {"url": "__RAW_IMAGE__"}})
+                        image_count += 1
+                    else:
+                        new_content.append(item)
+                messages_with_placeholders.append({"role": msg["role"], "content": new_content})
+            else:
+                messages_with_placeholders.append(msg)
+
+        extra = {key: value for key, value in kwargs.items()
+                 if key not in _CLIENT_ONLY_KEYS and key != 'stream' and value is not None}
+        encoder = build_image_form(llm_model, dumps_str(messages_with_placeholders), max_tokens,
+                                   temperature, top_p, raw_images[:image_count], extra)
+        headers = dict(_auth_headers(api_key), **{"Content-Type": encoder.content_type})
+
+        timeout = aiohttp.ClientTimeout(total=kwargs.get('timeout', 300))
+        async with _get_session(base_url).post(url, headers=headers, data=encoder.async_chunks(), timeout=timeout) as response:
+            response.raise_for_status()
+            result = loads(await response.read())
+        if isinstance(result, dict):
+            result["upload"] = encoder.upload_stats()
+        return result
+
+    except Exception as e:
+        print(f"[Shrug-Prompter] Async multipart request failed, falling back to standard: {e}")
+        if isinstance(e, aiohttp.ClientResponseError) and e.status in (404, 405) and CapabilityDetector:
+            CapabilityDetector.invalidate(base_url)
+        return await _send_request_openai_async(
+            messages, api_key, base_url, llm_model,
+            max_tokens, temperature, top_p, **kwargs
+        )
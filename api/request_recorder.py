@@ -0,0 +1,206 @@
+"""
+Record request shapes as JSON lines for later replay (tools/replay.py).
+
+With SHRUG_RECORD_REQUESTS=/path/requests.jsonl the router appends one line per
+request: server, model, messages, sampling parameters and the outcome (latency,
+error type). API keys and client callbacks are never written. Images are stored
+as their size and type only, and replay substitutes synthetic images of about the
+same size; SHRUG_RECORD_IMAGES=true keeps the actual image data instead.
+"""
+import base64
+import io
+import math
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterator
+
+try:
+    from api.json_codec import dumps, loads
+    from api.multipart import guess_image_type
+except ImportError:
+    from .json_codec import dumps, loads
+    from .multipart import guess_image_type
+
+RECORDED_IMAGE = "__RECORDED_IMAGE__"
+
+# Not part of the request shape (secrets, callbacks, routing objects)
+_SKIPPED_KEYS = ("api_key", "stop_condition", "on_delta", "endpoint_pool")
+_REQUEST_KEYS = ("base_url", "llm_model", "max_tokens", "temperature", "top_p")
+_SHAPE_KEYS = _REQUEST_KEYS + ("messages", "raw_images")
+
+
+class RequestRecorder:
+    """Process-wide JSONL recorder used by shrug_router"""
+
+    path = os.environ.get("SHRUG_RECORD_REQUESTS") or None
+    include_images = os.environ.get("SHRUG_RECORD_IMAGES", "false").lower() in ("1", "true", "yes")
+    _lock = threading.Lock()
+
+    @classmethod
+    def record(cls, provider: str, kwargs: Dict, response, seconds: float):
+        if not cls.path:
+            return
+        try:
+            line = dumps(dict(to_record(provider, kwargs, cls.include_images), **_outcome(response, seconds))) + b"\n"
+            with cls._lock, open(cls.path, "ab") as f:
+                f.write(line)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"[Shrug-Prompter] Could not record request to {cls.path}: {e}")
+            cls.path = None
+
+
+def to_record(provider: str, kwargs: Dict, include_images: bool = False) -> Dict:
+    """JSON-safe description of one send_request call"""
+    record = {"ts": round(time.time(), 3), "provider": provider}
+    for key in _REQUEST_KEYS:
+        record[key] = kwargs.get(key)
+    record["messages"] = [_record_message(m, include_images) for m in kwargs.get("messages") or []]
+    raw_images = kwargs.get("raw_images") or []
+    if raw_images:
+        record["raw_images"] = [_record_raw_image(img, include_images) for img in raw_images]
+    params = {k: v for k, v in kwargs.items()
+              if k not in _SHAPE_KEYS and k not in _SKIPPED_KEYS and _is_json_value(v)}
+    if params:
+        record["params"] = params
+    return record
+
+
+def to_kwargs(record: Dict) -> Dict:
+    """send_request kwargs (without api_key or provider) rebuilt from a record"""
+    kwargs = {key: record.get(key) for key in _REQUEST_KEYS}
+    kwargs["messages"] = [_replay_message(m) for m in record.get("messages") or []]
+    if record.get("raw_images"):
+        kwargs["raw_images"] = [_replay_raw_image(img) for img in record["raw_images"]]
+    kwargs.update(record.get("params") or {})
+    return kwargs
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """Records from a JSONL file, skipping lines that aren't request records"""
+    skipped = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = loads(line)
+            except ValueError:
+                skipped += 1
+                continue
+            if isinstance(record, dict) and isinstance(record.get("messages"), list):
+                yield record
+            else:
+                skipped += 1
+    if skipped:
+        print(f"[Shrug-Prompter] Skipped {skipped} line(s) in {path} that are not request records")
+
+
+def synthetic_image(nbytes: int, mime: str = "image/jpeg") -> bytes:
+    """Noise image encoded as `mime`, sized to roughly nbytes"""
+    return _synthetic_image(_round_size(nbytes), mime)
+
+
+# Recording
+
+def _outcome(response, seconds: float) -> Dict:
+    outcome = {"latency": round(seconds, 4)}
+    error = response.get("error") if isinstance(response, dict) else None
+    if error:
+        outcome["ok"] = False
+        outcome["error"] = {k: error[k] for k in ("type", "reason", "status_code") if error.get(k) is not None}
+    else:
+        outcome["ok"] = True
+        usage = response.get("usage") if isinstance(response, dict) else None
+        if isinstance(usage, dict) and usage.get("completion_tokens") is not None:
+            outcome["completion_tokens"] = usage["completion_tokens"]
+    return outcome
+
+
+def _is_json_value(value) -> bool:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(_is_json_value(v) for v in value)
+    if isinstance(value, dict):
+        return all(isinstance(k, str) and _is_json_value(v) for k, v in value.items())
+    return False
+
+
+def _record_message(message: Dict, include_images: bool) -> Dict:
+    content = message.get("content")
+    if include_images or not isinstance(content, list):
+        return message
+    items = []
+    for item in content:
+        url = (item.get("image_url") or {}).get("url", "") if item.get("type") == "image_url" else ""
+        if url.startswith("data:"):
+            header, _, data = url.partition(",")
+            mime = header[5:].split(";")[0] or "image/jpeg"
+            items.append({"type": "image_url", "image_url": {"url": RECORDED_IMAGE, "mime": mime,
+                                                             "bytes": len(data) * 3 // 4}})
+        else:
+            items.append(item)
+    return dict(message, content=items)
+
+
+def _record_raw_image(img, include_images: bool) -> Dict:
+    _, mime = guess_image_type(img)
+    entry = {"mime": mime, "bytes": len(img)}
+    if include_images:
+        entry["data"] = base64.b64encode(bytes(img)).decode("ascii")
+    return entry
+
+
+# Replay
+
+def _replay_message(message: Dict) -> Dict:
+    content = message.get("content")
+    if not isinstance(content, list):
+        return message
+    items = []
+    for item in content:
+        image_url = item.get("image_url") or {}
+        if item.get("type") == "image_url" and image_url.get("url") == RECORDED_IMAGE:
+            mime = image_url.get("mime", "image/jpeg")
+            data = base64.b64encode(synthetic_image(image_url.get("bytes", 0), mime)).decode("ascii")
+            items.append({"type": "image_url", "image_url": {"url": f"data:{mime};base64,{data}"}})
+        else:
+            items.append(item)
+    return dict(message, content=items)
+
+
+def _replay_raw_image(entry: Dict) -> bytes:
+    if entry.get("data"):
+        return base64.b64decode(entry["data"])
+    return synthetic_image(entry.get("bytes", 0), entry.get("mime", "image/jpeg"))
+
+
+def _round_size(nbytes: int) -> int:
+    # Two significant digits, so recordings of similar frames share one cached image
+    if nbytes <= 0:
+        return 0
+    scale = 10 ** max(0, int(math.log10(nbytes)) - 1)
+    return int(round(nbytes / scale) * scale)
+
+
+@lru_cache(maxsize=64)
+def _synthetic_image(nbytes: int, mime: str) -> bytes:
+    import numpy as np
+    from PIL import Image
+
+    png = mime == "image/png"
+    # Encoded noise costs about 3 bytes per pixel as PNG and 0.75 as JPEG at quality 85
+    side = int(math.sqrt(max(nbytes, 1) / (3.0 if png else 0.75)))
+    side = max(16, min(4096, side))
+    rng = np.random.default_rng(nbytes)
+    image = Image.fromarray(rng.integers(0, 256, (side, side, 3), dtype=np.uint8))
+    buffer = io.BytesIO()
+    if png:
+        image.save(buffer, format="PNG", compress_level=1)
+    elif mime == "image/webp":
+        image.save(buffer, format="WEBP", quality=85)
+    else:
+        image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
@@ -0,0 +1,253 @@
+"""Retries with backoff and jitter, a retry budget, and hedged requests"""
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, wait, FIRST_COMPLETED
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    from instrumentation import run_in_context
+except ImportError:
+    from ..instrumentation import run_in_context
+
+# HTTP statuses worth retrying: overload and transient gateway/server failures
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(str(value))
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Retries failed requests with exponential backoff and full jitter.
+
+    Only transient failures are retried: connection errors (including connect
+    timeouts), and the statuses in RETRY_STATUSES. Read timeouts are retried only when
+    the caller passes idempotent=True: the server may still be working on the first
+    request, and re-sending a long generation to a server that is already too slow
+    multiplies the wait. A Retry-After header from the server replaces the computed
+    backoff (capped at max_delay).
+
+    The retry budget keeps retries from multiplying load during an outage. Each
+    request earns budget_ratio retry tokens (the balance starts at budget_min and
+    is capped a little above it) and each retry spends one token.
+
+    With hedge_percentile set, a request still running past that percentile of
+    recent latencies gets a second copy (hedge_fn, normally a different endpoint).
+    Whichever finishes first wins.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 30.0,
+                 budget_ratio: float = 0.2, budget_min: float = 10.0,
+                 hedge_percentile: float = 0.0, hedge_min_samples: int = 20):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self.budget_ratio = float(budget_ratio)
+        self.budget_min = float(budget_min)
+        self.hedge_percentile = float(hedge_percentile)
+        self.hedge_min_samples = int(hedge_min_samples)
+
+        self._lock = threading.Lock()
+        self._tokens = self.budget_min
+        self._latencies = deque(maxlen=500)
+        self._hedge_pool = None
+        self._stats = {"requests": 0, "retries": 0, "retries_succeeded": 0, "budget_exhausted": 0,
+                       "hedges": 0, "hedge_wins": 0, "gave_up": 0}
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """Policy configured from SHRUG_RETRY_* / SHRUG_HEDGE_PERCENTILE"""
+        return cls(
+            max_attempts=int(os.environ.get("SHRUG_RETRY_ATTEMPTS", "3")),
+            base_delay=float(os.environ.get("SHRUG_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.environ.get("SHRUG_RETRY_MAX_DELAY", "30")),
+            budget_ratio=float(os.environ.get("SHRUG_RETRY_BUDGET", "0.2")),
+            hedge_percentile=float(os.environ.get("SHRUG_HEDGE_PERCENTILE", "0")),
+        )
+
+    # Classification and bookkeeping
+
+    @staticmethod
+    def is_retryable(response, idempotent: bool = False) -> bool:
+        error = response.get("error") if isinstance(response, dict) else None
+        if not error:
+            return False
+        status = error.get("status_code")
+        if status is not None:
+            return status in RETRY_STATUSES
+        reason = error.get("reason")
+        if reason == "connection":
+            return True
+        if reason == "timeout":
+            return idempotent
+        return False
+
+    def backoff(self, attempt: int, response=None) -> float:
+        """Delay before retry number `attempt` (1-based)"""
+        error = response.get("error", {}) if isinstance(response, dict) else {}
+        retry_after = parse_retry_after(error.get("retry_after"))
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def _start_request(self):
+        with self._lock:
+            self._stats["requests"] += 1
+            self._tokens = min(self.budget_min * 1.1, self._tokens + self.budget_ratio)
+
+    def _take_retry_token(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                self._stats["budget_exhausted"] += 1
+                return False
+            self._tokens -= 1.0
+            self._stats["retries"] += 1
+            return True
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Latency percentile after which a hedge is sent (None until enough samples)"""
+        if self.hedge_percentile <= 0:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100.0))
+        return ordered[index]
+
+    def _log_retry(self, attempt, delay, response):
+        message = response["error"].get("message", "Unknown error")
+        print(f"[Shrug-Prompter] Request failed ({message[:120]}), retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+
+    # Sync execution
+
+    def run(self, fn: Callable[[], Any], hedge_fn: Optional[Callable[[], Any]] = None, idempotent: bool = False) -> Any:
+        """Call fn() (returning a response or error dict) with retries and optional hedging"""
+        self._start_request()
+        attempt = 1
+        while True:
+            start = time.perf_counter()
+            response = self._run_hedged(fn, hedge_fn) if hedge_fn else fn()
+            if not (isinstance(response, dict) and "error" in response):
+                self._record_latency(time.perf_counter() - start)
+                if attempt > 1:
+                    self._count("retries_succeeded")
+                return response
+            if attempt >= self.max_attempts or not self.is_retryable(response, idempotent) or not self._take_retry_token():
+                if attempt > 1 or self.is_retryable(response, idempotent):
+                    self._count("gave_up")
+                response["error"]["attempts"] = attempt
+                return response
+            delay = self.backoff(attempt, response)
+            self._log_retry(attempt, delay, response)
+            time.sleep(delay)
+            attempt += 1
+
+    def _run_hedged(self, fn, hedge_fn):
+        delay = self.hedge_delay()
+        if delay is None:
+            return fn()
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="shrug-hedge")
+        # Pool threads don't inherit the caller's context; carry its Trace over
+        primary = self._hedge_pool.submit(run_in_context(fn))
+        try:
+            return primary.result(timeout=delay)
+        except FuturesTimeout:
+            pass
+
+        self._count("hedges")
+        hedge = self._hedge_pool.submit(run_in_context(hedge_fn))
+        pending = {primary, hedge}
+        result = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if not (isinstance(result, dict) and "error" in result):
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    # The slower copy finishes in the background and is discarded
+                    return result
+        return result
+
+    # Async execution
+
+    async def run_async(self, fn: Callable[[], Awaitable[Any]], hedge_fn: Optional[Callable[[], Awaitable[Any]]] = None,
+                        idempotent: bool = False) -> Any:
+        """Async version of run()"""
+        self._start_request()
+        attempt = 1
+        while True:
+            start = time.perf_counter()
+            response = await (self._run_hedged_async(fn, hedge_fn) if hedge_fn else fn())
+            if not (isinstance(response, dict) and "error" in response):
+                self._record_latency(time.perf_counter() - start)
+                if attempt > 1:
+                    self._count("retries_succeeded")
+                return response
+            if attempt >= self.max_attempts or not self.is_retryable(response, idempotent) or not self._take_retry_token():
+                if attempt > 1 or self.is_retryable(response, idempotent):
+                    self._count("gave_up")
+                response["error"]["attempts"] = attempt
+                return response
+            delay = self.backoff(attempt, response)
+            self._log_retry(attempt, delay, response)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _run_hedged_async(self, fn, hedge_fn):
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(fn())
+        if delay is None:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        hedge = asyncio.ensure_future(hedge_fn())
+        pending = {primary, hedge}
+        result = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if not (isinstance(result, dict) and "error" in result):
+                    if task is hedge:
+                        self._count("hedge_wins")
+                    for other in pending:
+                        other.cancel()
+                    return result
+        return result
+
+    def stats(self) -> Dict:
+        """Counters for debugging and dashboards"""
+        with self._lock:
+            return dict(self._stats, retry_tokens=round(self._tokens, 2))
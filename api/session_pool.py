@@ -0,0 +1,107 @@
+"""Process-wide pool of keep-alive HTTP sessions, one per inference server"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class SessionPool:
+    """
+    Hands out a shared requests.Session per base_url so repeated calls to the
+    same server reuse TCP/TLS connections instead of reconnecting every time.
+
+    All settings can be overridden with environment variables or configure().
+    """
+
+    # Max pooled connections per host; with pool_block this is also the hard per-host limit
+    pool_maxsize = int(os.environ.get("SHRUG_POOL_MAXSIZE", "16"))
+    # Number of distinct host pools each session keeps (redirects can hop hosts)
+    pool_connections = int(os.environ.get("SHRUG_POOL_CONNECTIONS", "4"))
+    # Block instead of opening extra throwaway connections once pool_maxsize is reached.
+    # Off by default: urllib3 waits for a free connection with no timeout, so more
+    # concurrent requests than pool_maxsize would hang instead of failing
+    pool_block = os.environ.get("SHRUG_POOL_BLOCK", "false").lower() in ("1", "true", "yes")
+    # Sessions unused for this many seconds are closed
+    idle_timeout = float(os.environ.get("SHRUG_POOL_IDLE_TIMEOUT", "300"))
+
+    _sessions = {}  # key -> {"session": Session, "last_used": float, "requests": int}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, pool_maxsize: Optional[int] = None, pool_connections: Optional[int] = None,
+                  pool_block: Optional[bool] = None, idle_timeout: Optional[float] = None):
+        """Update pool settings. Existing sessions are closed so the new limits apply."""
+        if pool_maxsize is not None:
+            cls.pool_maxsize = max(1, int(pool_maxsize))
+        if pool_connections is not None:
+            cls.pool_connections = max(1, int(pool_connections))
+        if pool_block is not None:
+            cls.pool_block = bool(pool_block)
+        if idle_timeout is not None:
+            cls.idle_timeout = float(idle_timeout)
+        cls.close_all()
+
+    @classmethod
+    def get_session(cls, base_url: str) -> requests.Session:
+        """Get (or create) the pooled session for a server"""
+        key = cls._key(base_url)
+        now = time.monotonic()
+        with cls._lock:
+            cls._evict_idle(now, keep=key)
+            entry = cls._sessions.get(key)
+            if entry is None:
+                entry = {"session": cls._create_session(), "last_used": now, "requests": 0}
+                cls._sessions[key] = entry
+            entry["last_used"] = now
+            entry["requests"] += 1
+            return entry["session"]
+
+    @classmethod
+    def close_all(cls):
+        """Close every pooled session"""
+        with cls._lock:
+            for entry in cls._sessions.values():
+                entry["session"].close()
+            cls._sessions.clear()
+
+    @classmethod
+    def stats(cls) -> List[Dict]:
+        """Snapshot of pooled sessions for debugging"""
+        now = time.monotonic()
+        with cls._lock:
+            return [
+                {"host": key, "requests": entry["requests"], "idle_seconds": round(now - entry["last_used"], 1)}
+                for key, entry in cls._sessions.items()
+            ]
+
+    @classmethod
+    def _create_session(cls) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=cls.pool_connections,
+            pool_maxsize=cls.pool_maxsize,
+            pool_block=cls.pool_block,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        return session
+
+    @classmethod
+    def _evict_idle(cls, now: float, keep: Optional[str] = None):
+        # Called with the lock held
+        if cls.idle_timeout <= 0:
+            return
+        for key in [k for k, e in cls._sessions.items() if k != keep and now - e["last_used"] > cls.idle_timeout]:
+            cls._sessions.pop(key)["session"].close()
+
+    @staticmethod
+    def _key(base_url: str) -> str:
+        # Pool by scheme://host:port so different paths on one server share connections
+        url = base_url if "://" in base_url else f"http://{base_url}"
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
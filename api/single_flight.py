@@ -0,0 +1,131 @@
+"""Single-flight coalescing: concurrent identical requests share one network call"""
+import asyncio
+import copy
+import hashlib
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    from api.json_codec import canonical_dumps
+except ImportError:
+    from .json_codec import canonical_dumps
+
+# Request kwargs that don't change what the server returns
+_IGNORED_KEYS = ("timeout", "coalesce")
+# Per-caller callbacks; requests carrying these are never coalesced
+_CALLBACK_KEYS = ("stop_condition", "on_delta")
+
+
+def _normalize(value):
+    # Raw image bytes are hashed so huge payloads don't end up in the JSON dump
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "bytes:" + hashlib.blake2b(bytes(value), digest_size=16).hexdigest()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def request_fingerprint(provider: str, kwargs: Dict) -> Optional[str]:
+    """
+    Hash of the normalized request (provider, server, model, messages, params).
+    Returns None for requests that must not be shared.
+    """
+    if any(kwargs.get(key) is not None for key in _CALLBACK_KEYS):
+        return None
+    body = {k: _normalize(v) for k, v in kwargs.items() if k not in _IGNORED_KEYS and v is not None}
+    body["provider"] = provider.lower()
+    return hashlib.sha256(canonical_dumps(body)).hexdigest()
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    The first caller for a key (the leader) runs the request; callers arriving
+    with the same key while it is in flight wait and receive the same result.
+    Nothing is cached once the call completes.
+
+    Every caller that shares a result gets its own deep copy, so nodes can
+    modify their response dicts without affecting each other.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls = weakref.WeakKeyDictionary()  # loop -> {key: [future, waiters]}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn() once for all concurrent callers with the same key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # After removal no new waiters can join, so the count below is final
+            with self._lock:
+                del self._calls[key]
+                shared = call.waiters > 0
+            call.event.set()
+        return copy.deepcopy(call.result) if shared else call.result
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async version of do(); coalesces callers on the same event loop"""
+        calls = self._async_calls.setdefault(asyncio.get_running_loop(), {})
+        entry = calls.get(key)
+        if entry is not None:
+            entry[1] += 1
+            self.coalesced += 1
+            return copy.deepcopy(await asyncio.shield(entry[0]))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = calls[key] = [future, 0]
+        self.executed += 1
+        try:
+            result = await fn()
+        except BaseException as e:
+            calls.pop(key, None)
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                if entry[1] == 0:
+                    future.exception()  # Mark retrieved; nobody else is waiting
+            raise
+        calls.pop(key, None)
+        future.set_result(result)
+        return copy.deepcopy(result) if entry[1] else result
+
+    def stats(self) -> Dict:
+        """Counters for debugging"""
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "in_flight": len(self._calls)}
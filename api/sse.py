@@ -0,0 +1,126 @@
+"""Incremental server-sent-events parsing and early-stop conditions for streamed completions"""
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+try:
+    from api.json_codec import loads
+except ImportError:
+    from .json_codec import loads
+
+
+class SSEParser:
+    """
+    Incremental parser for a text/event-stream body.
+
+    Feed it raw byte chunks as they arrive (chunk boundaries can fall anywhere,
+    including inside a line or a UTF-8 sequence) and it returns the data payload
+    of every event completed so far. Comments and non-data fields are ignored.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._data_lines: List[str] = []
+
+    def feed(self, chunk: bytes) -> List[str]:
+        events = []
+        self._buffer += chunk
+        while True:
+            newline = self._buffer.find(b"\n")
+            if newline < 0:
+                break
+            line = self._buffer[:newline].rstrip(b"\r").decode("utf-8", "replace")
+            self._buffer = self._buffer[newline + 1:]
+
+            if not line:
+                # Blank line terminates the event
+                if self._data_lines:
+                    events.append("\n".join(self._data_lines))
+                    self._data_lines = []
+            elif line.startswith(":"):
+                continue
+            elif line.startswith("data:"):
+                value = line[5:]
+                self._data_lines.append(value[1:] if value.startswith(" ") else value)
+        return events
+
+    def close(self) -> List[str]:
+        """Flush an event left unterminated at end of stream"""
+        events = self.feed(b"\n\n") if self._buffer else []
+        if self._data_lines:
+            events.append("\n".join(self._data_lines))
+            self._data_lines = []
+        return events
+
+
+def iter_sse_data(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Yield event data payloads from an iterable of raw byte chunks"""
+    parser = SSEParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def parse_chat_chunk(data: str) -> Optional[Dict]:
+    """Decode one chat.completion.chunk payload; None for [DONE] or malformed events"""
+    if data.strip() == "[DONE]":
+        return None
+    try:
+        return loads(data)
+    except ValueError:
+        return None
+
+
+class JSONCloseDetector:
+    """
+    Stop condition that fires once the first top-level JSON array (or object)
+    in the generated text is closed.
+
+    Scans incrementally, so each delta costs only its own length. Brackets
+    inside JSON strings are ignored; text before the opening bracket is skipped.
+    """
+
+    def __init__(self, opener: str = "["):
+        self.opener = opener
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escape = False
+        self.closed = False
+
+    def __call__(self, delta: str) -> bool:
+        for ch in delta:
+            if self.closed:
+                break
+            if not self.started:
+                if ch == self.opener:
+                    self.started = True
+                    self.depth = 1
+                continue
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "[{":
+                self.depth += 1
+            elif ch in "]}":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.closed = True
+        return self.closed
+
+
+# Names accepted by nodes' stop options
+STOP_CONDITIONS = ["none", "json_array_closed", "json_object_closed"]
+
+
+def make_stop_condition(name: str) -> Optional[Callable[[str], bool]]:
+    """Fresh stop-condition callable for a STOP_CONDITIONS name (None for "none")"""
+    if name == "json_array_closed":
+        return JSONCloseDetector("[")
+    if name == "json_object_closed":
+        return JSONCloseDetector("{")
+    return None
@@ -0,0 +1,42 @@
+"""Image batch encoding throughput: tensors_to_base64_list and tensors_to_raw_bytes_list"""
+import torch
+
+from benchmarks.harness import measure
+
+RESOLUTIONS = [(512, 512), (1024, 1024), (1080, 1920)]
+BATCH_SIZES = [1, 4, 16]
+QUICK_RESOLUTIONS = [(512, 512), (1024, 1024)]
+QUICK_BATCH_SIZES = [1, 4]
+
+
+def make_batch(batch: int, height: int, width: int, seed: int = 0) -> torch.Tensor:
+    """IMAGE batch of smooth gradients plus mild noise, so JPEG sizes look like real frames"""
+    generator = torch.Generator().manual_seed(seed)
+    y = torch.linspace(0, 1, height).view(1, height, 1, 1)
+    x = torch.linspace(0, 1, width).view(1, 1, width, 1)
+    tint = torch.rand(batch, 1, 1, 3, generator=generator)
+    noise = torch.rand(batch, height, width, 3, generator=generator) * 0.08
+    return (0.6 * (x + y) / 2 + 0.3 * tint + noise).clamp(0, 1)
+
+
+def run(results, quick: bool = False):
+    from utils import tensors_to_base64_list, tensors_to_raw_bytes_list
+
+    print("Encoding")
+    resolutions = QUICK_RESOLUTIONS if quick else RESOLUTIONS
+    batch_sizes = QUICK_BATCH_SIZES if quick else BATCH_SIZES
+    repeat = 3 if quick else 5
+    for height, width in resolutions:
+        for batch in batch_sizes:
+            images = make_batch(batch, height, width)
+            raw_mb = images.numel() / (1024 * 1024)  # As uint8 pixels
+            suffix = f"{width}x{height}/b{batch}"
+
+            # max_size above the frame size, so both paths encode the same pixels
+            stats = measure(lambda: tensors_to_base64_list(images, max_size=max(height, width)), repeat=repeat)
+            results.add(f"encode.base64/{suffix}", stats, per_second=batch / stats["median"],
+                        mb_per_s=raw_mb / stats["median"])
+
+            stats = measure(lambda: tensors_to_raw_bytes_list(images), repeat=repeat)
+            results.add(f"encode.raw_bytes/{suffix}", stats, per_second=batch / stats["median"],
+                        mb_per_s=raw_mb / stats["median"])
@@ -0,0 +1,46 @@
+"""ShrugPrompter.execute_prompt end to end against the local mock server"""
+from benchmarks.bench_encoding import make_batch
+from benchmarks.harness import measure, silenced
+
+# (name, image count, batch_mode, max_concurrency)
+MODES = [
+    ("single/1img", 1, False, 0),
+    ("single/4img", 4, False, 0),
+    ("batch/8img", 8, True, 4),
+]
+
+
+def run(results, quick: bool = False, latency: str = "fixed:0"):
+    from nodes.prompter import ShrugPrompter
+    from api.capabilities_detector import CapabilityDetector
+    from tools.mock_server import MockServer
+
+    print("Prompter end to end")
+    repeat = 3 if quick else 7
+    images = {count: make_batch(count, 512, 512) for _, count, _, _ in MODES}
+
+    # Server answers instantly by default, so the numbers track client-side work
+    for multipart in (True, False):
+        transport = "multipart" if multipart else "json"
+        with MockServer(latency=latency, multipart=multipart, completion_tokens=48, seed=0) as server:
+            CapabilityDetector.invalidate(server.base_url)
+            context = {"provider_config": {"provider": "openai", "base_url": server.base_url,
+                                           "api_key": "not-required-for-local", "llm_model": "mock-vlm"}}
+            prompter = ShrugPrompter()
+
+            for name, count, batch_mode, concurrency in MODES:
+                def call():
+                    with silenced():
+                        out = prompter.execute_prompt(
+                            context=dict(context), system_prompt="You describe images.",
+                            user_prompt="Describe the image.", max_tokens=64, temperature=0.7, top_p=0.9,
+                            images=images[count], batch_mode=batch_mode, max_concurrency=concurrency,
+                            use_cache=False, response_cleanup="basic")
+                    if any(text.startswith("Error") for text in out[1]):
+                        raise RuntimeError(f"Prompter returned an error: {out[1][0]}")
+
+                stats = measure(call, repeat=repeat)
+                results.add(f"prompter.{name}/{transport}", stats, per_second=count / stats["median"])
+
+            CapabilityDetector.invalidate(server.base_url)
+            CapabilityDetector._snapshot.pop(server.base_url, None)
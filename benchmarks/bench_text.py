@@ -0,0 +1,76 @@
+"""Response parsing, text cleanup and accumulator growth"""
+import json
+
+from benchmarks.harness import measure, silenced
+
+CAPTION = ("A woman in a red coat walks along a rain-soaked street at dusk, “neon signs” reflecting "
+           "in the puddles…\n\n  Cars pass   slowly behind her —  their headlights blurred.  ")
+
+CLEANUP_PRESETS = {
+    "basic": "trim",
+    "standard": "trim,unicode,newlines,collapse",
+    "strict": "trim,unicode,newlines,collapse,ascii",
+}
+
+ACCUMULATOR_SIZES = [100, 1000, 5000]
+QUICK_ACCUMULATOR_SIZES = [100, 1000]
+
+
+def _parse_inputs():
+    prompts = [f"Scene {i}: {CAPTION.strip()}" for i in range(16)]
+    return {
+        "plain": CAPTION * 4,
+        "json_array": json.dumps(prompts),
+        "json_object": json.dumps({"prompts": prompts}),
+        "fenced_json": "Here are the prompts:\n```json\n" + json.dumps(prompts, indent=2) + "\n```",
+    }
+
+
+def run(results, quick: bool = False):
+    from nodes.prompter import ShrugPrompter
+    from nodes.text_cleanup import TextCleanupNode
+    from nodes.loop_accumulator import LoopSafeAccumulator
+    from nodes.loop_compatible_nodes import LoopAwareVLMAccumulator
+
+    number = 200 if quick else 1000
+    repeat = 3 if quick else 5
+
+    print("Response parsing")
+    prompter = ShrugPrompter()
+    for name, text in _parse_inputs().items():
+        with silenced():
+            stats = measure(lambda: prompter._parse_response_smart(text, expected_count=16), repeat=repeat, number=number)
+        results.add(f"parse_response/{name}", stats, per_second=1.0 / stats["median"])
+
+    print("Text cleanup")
+    cleanup = TextCleanupNode()
+    for name, operations in CLEANUP_PRESETS.items():
+        with silenced():
+            stats = measure(lambda: cleanup.cleanup_text(CAPTION, operations), repeat=repeat, number=number)
+        results.add(f"cleanup_text/{name}", stats, per_second=1.0 / stats["median"])
+    long_text = CAPTION * 200
+    with silenced():
+        stats = measure(lambda: cleanup.cleanup_text(long_text, CLEANUP_PRESETS["strict"]), repeat=repeat, number=number // 10)
+    results.add("cleanup_text/strict_long", stats, mb_per_s=len(long_text.encode("utf-8")) / (1024 * 1024) / stats["median"])
+
+    # Cost of one more item once the accumulator already holds N; flat is good, growing means copying
+    print("Accumulator growth")
+    sizes = QUICK_ACCUMULATOR_SIZES if quick else ACCUMULATOR_SIZES
+    for size in sizes:
+        node = LoopSafeAccumulator()
+        LoopSafeAccumulator.reset_all()
+        for i in range(size):
+            node.accumulate(CAPTION, loop_id="bench")
+        stats = measure(lambda: node.accumulate(CAPTION, loop_id="bench"), repeat=repeat, number=50)
+        results.add(f"accumulator.loop_safe/append_at_{size}", stats)
+        LoopSafeAccumulator.reset_all()
+
+        node = LoopAwareVLMAccumulator()
+        LoopAwareVLMAccumulator.clear_all_accumulators()
+        context = {"batch_mode": True, "llm_responses": [{"choices": [{"message": {"content": CAPTION}}]}] * 4}
+        with silenced():
+            for i in range(size // 4):
+                node.accumulate_vlm(context, accumulator_id="bench")
+            stats = measure(lambda: node.accumulate_vlm(context, accumulator_id="bench"), repeat=repeat, number=20)
+        results.add(f"accumulator.vlm/append_at_{size}", stats)
+        LoopAwareVLMAccumulator.clear_all_accumulators()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark result files.
+
+Usage:
+    python benchmarks/compare.py baseline.json current.json [--threshold 0.10] [--json]
+
+Exits 1 when any benchmark got more than --threshold slower.
+"""
+import argparse
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.harness import compare, load, print_comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown that counts as a regression (default 0.10)")
+    parser.add_argument("--json", action="store_true", help="Print the comparison as JSON")
+    args = parser.parse_args()
+
+    baseline, current = load(args.baseline), load(args.current)
+    report = compare(baseline, current, args.threshold)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_comparison(report, baseline["meta"], current["meta"])
+    sys.exit(1 if report["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Timing helpers and result files for the benchmark suite.
+
+A result file is JSON: {"meta": {...}, "results": {name: stats}}. Every stats dict
+has "median" (seconds per call) so two runs can be compared name by name; some add
+a throughput figure ("per_second", "mb_per_s").
+"""
+import contextlib
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def measure(fn: Callable, repeat: int = 5, warmup: int = 1, number: int = 1) -> Dict:
+    """Time fn() `number` times per sample, `repeat` samples, after `warmup` untimed calls"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()  # Keep collector pauses out of the numbers
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    ordered = sorted(samples)
+    return {
+        "median": statistics.median(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+@contextlib.contextmanager
+def silenced():
+    """Discard stdout, for nodes that log every call"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+class Results:
+    """Collects named results and writes them with environment metadata"""
+
+    def __init__(self):
+        self.results: Dict[str, Dict] = {}
+
+    def add(self, name: str, stats: Dict, **extra):
+        stats = dict(stats, **extra)
+        self.results[name] = stats
+        rate = "".join(f"  {stats[key]:,.1f} {label}" for key, label in
+                       (("per_second", "/s"), ("mb_per_s", "MB/s")) if key in stats)
+        print(f"  {name:<58} {stats['median'] * 1000:10.3f} ms{rate}")
+
+    def meta(self) -> Dict:
+        try:
+            import torch
+            torch_version = torch.__version__
+            threads = torch.get_num_threads()
+        except ImportError:
+            torch_version, threads = None, None
+        try:
+            from api.json_codec import BACKEND as json_backend
+        except ImportError:
+            json_backend = None
+        return {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "torch": torch_version,
+            "torch_threads": threads,
+            "json_backend": json_backend,
+        }
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"meta": self.meta(), "results": self.results}, f, indent=2, sort_keys=True)
+        print(f"\nWrote {len(self.results)} results to {path}")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def load(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.10) -> Dict:
+    """
+    Per-benchmark change in median time between two result files.
+
+    A benchmark regressed when it got more than `threshold` (fraction) slower,
+    and improved when it got that much faster.
+    """
+    rows = []
+    base_results, new_results = baseline["results"], current["results"]
+    for name in sorted(set(base_results) | set(new_results)):
+        old, new = base_results.get(name), new_results.get(name)
+        if old is None or new is None:
+            rows.append({"name": name, "status": "added" if old is None else "removed"})
+            continue
+        change = new["median"] / old["median"] - 1.0 if old["median"] > 0 else 0.0
+        status = "regressed" if change > threshold else "improved" if change < -threshold else "unchanged"
+        rows.append({"name": name, "status": status, "baseline": old["median"], "current": new["median"],
+                     "change": change})
+    return {
+        "rows": rows,
+        "regressions": [row["name"] for row in rows if row["status"] == "regressed"],
+        "improvements": [row["name"] for row in rows if row["status"] == "improved"],
+    }
+
+
+def print_comparison(report: Dict, baseline_meta: Dict, current_meta: Dict):
+    print(f"Baseline {baseline_meta.get('commit')} ({baseline_meta.get('timestamp')})  ->  "
+          f"current {current_meta.get('commit')} ({current_meta.get('timestamp')})")
+    for row in report["rows"]:
+        if "change" not in row:
+            print(f"  {row['name']:<58} {row['status']}")
+            continue
+        marker = {"regressed": "  <-- slower", "improved": "  faster"}.get(row["status"], "")
+        print(f"  {row['name']:<58} {row['baseline'] * 1000:10.3f} -> {row['current'] * 1000:10.3f} ms "
+              f"{row['change'] * 100:+6.1f}%{marker}")
+    print(f"\n{len(report['regressions'])} regressed, {len(report['improvements'])} improved")
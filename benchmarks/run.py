@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Run the benchmark suite and write the results as JSON.
+
+Usage:
+    python benchmarks/run.py                          # all suites -> benchmarks/results/<commit>.json
+    python benchmarks/run.py --quick --suite text,encoding
+    python benchmarks/run.py --baseline benchmarks/results/main.json   # fail on >10% regressions
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# Keep benchmark servers out of the user's persisted capabilities and response cache
+os.environ.setdefault("SHRUG_CACHE_DIR", tempfile.mkdtemp(prefix="shrug-bench-"))
+
+from benchmarks import bench_encoding, bench_prompter, bench_text
+from benchmarks.harness import Results, compare, load, print_comparison
+
+SUITES = {
+    "encoding": bench_encoding.run,
+    "prompter": bench_prompter.run,
+    "text": bench_text.run,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shrug-prompter hot paths")
+    parser.add_argument("--suite", default=",".join(SUITES), help=f"Comma separated subset of: {', '.join(SUITES)}")
+    parser.add_argument("--quick", action="store_true", help="Fewer sizes and repeats, for a fast sanity check")
+    parser.add_argument("--output", default=None, help="Result file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", default=None, help="Compare against this result file; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slowdown that counts as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.suite.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SUITES]
+    if unknown:
+        parser.error(f"Unknown suite(s): {', '.join(unknown)}")
+
+    results = Results()
+    for name in names:
+        SUITES[name](results, quick=args.quick)
+
+    output = args.output
+    if output is None:
+        os.makedirs(os.path.join(REPO_ROOT, "benchmarks", "results"), exist_ok=True)
+        output = os.path.join(REPO_ROOT, "benchmarks", "results", f"{results.meta()['commit'] or 'latest'}.json")
+    results.save(output)
+
+    if args.baseline:
+        print()
+        baseline, current = load(args.baseline), load(output)
+        report = compare(baseline, current, args.threshold)
+        print_comparison(report, baseline["meta"], current["meta"])
+        sys.exit(1 if report["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
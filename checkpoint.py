@@ -0,0 +1,124 @@
+# In shrug-prompter/checkpoint.py
+"""
+Append-only checkpoint journal for long batch runs.
+
+Each finished item is written as one JSON line ({"key": ..., "value": ...}) the
+moment it completes, so a crash loses only the work still in flight. Reopening the
+journal reloads every finished item; a line cut short by the crash is ignored.
+Used by ShrugPrompter's batch mode and the headless captioning CLI (tools/caption.py).
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    from api.json_codec import dumps, loads
+except ImportError:
+    from .api.json_codec import dumps, loads
+
+
+class CheckpointJournal:
+    """
+    Finished items of one run, keyed by a caller-chosen string.
+
+    Thread-safe. With sync=True every record is fsynced, which also survives a
+    power loss; by default lines are flushed to the OS, which survives a crash of
+    this process.
+    """
+
+    def __init__(self, path: str, sync: bool = False):
+        self.path = path
+        self.sync = sync
+        self._entries: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self.corrupt_lines = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = loads(line)
+                    self._entries[str(entry["key"])] = entry.get("value")
+                except (ValueError, KeyError, TypeError):
+                    self.corrupt_lines += 1  # Usually the last line, cut off mid-write
+        if self.corrupt_lines:
+            print(f"[Shrug-Prompter] Ignored {self.corrupt_lines} unreadable line(s) in checkpoint {self.path}")
+
+    def _open(self):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "ab")
+            # Start on a fresh line if the previous run died mid-line
+            if self._file.tell() > 0:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        self._file.write(b"\n")
+        return self._file
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._entries.get(key, default)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        with self._lock:
+            return iter(list(self._entries.items()))
+
+    def record(self, key: str, value: Any = None):
+        """Mark key as finished with a JSON-serializable value, durably"""
+        line = dumps({"key": key, "value": value, "ts": round(time.time(), 3)}) + b"\n"
+        with self._lock:
+            f = self._open()
+            f.write(line)
+            f.flush()
+            if self.sync:
+                os.fsync(f.fileno())
+            self._entries[key] = value
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self):
+        """Delete the journal, e.g. once every item has finished"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def checkpoint_dir(base_dir: Optional[str] = None) -> str:
+    """Directory for journals: base_dir, else checkpoints/ in the response cache directory"""
+    if base_dir:
+        return base_dir
+    try:
+        from response_cache import _default_cache_dir
+    except ImportError:
+        from .response_cache import _default_cache_dir
+    return os.path.join(_default_cache_dir(), "checkpoints")
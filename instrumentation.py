@@ -0,0 +1,216 @@
+# In shrug-prompter/instrumentation.py
+"""
+Lightweight timing spans for the request lifecycle.
+
+A Trace covers one node execution. While it is active (trace.activate()), code
+anywhere below it records into it without passing it around:
+
+    with span("encode"):                # time a stage
+        ...
+    record_request(serialize=..., ttfb=..., network=..., parse=..., payload_bytes=...)
+
+Both are no-ops when no trace is active. Every observation also lands in a
+per-node histogram (Instrumentation.summary), and with SHRUG_TIMING_LOG set each
+request and each finished trace is appended to that file as a JSON line.
+
+Worker threads don't inherit the active trace; submit work as
+run_in_context(fn) (one wrapper per task) to carry it over.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+try:
+    from api.json_codec import dumps
+except ImportError:
+    from .api.json_codec import dumps
+
+_current: contextvars.ContextVar = contextvars.ContextVar("shrug_trace", default=None)
+
+# Stages that run on this machine; everything else is time spent waiting on the server
+CLIENT_STAGES = ("resize", "tensor_to_uint8", "encode", "serialize", "parse", "cleanup")
+NETWORK_STAGES = ("network",)
+
+
+class Histogram:
+    """Count, mean and percentiles over the most recent observations"""
+
+    def __init__(self, window: int = 2048):
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self._samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def summary(self) -> Dict:
+        ordered = sorted(self._samples)
+        if not ordered:
+            return {"count": 0}
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100.0))], 5)
+
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 5),
+            "p50": pct(50),
+            "p95": pct(95),
+            "p99": pct(99),
+            "max": round(ordered[-1], 5),
+        }
+
+
+class Instrumentation:
+    """Process-wide per-node histograms and the optional JSONL log"""
+
+    _histograms: Dict[str, Dict[str, Histogram]] = {}
+    _lock = threading.Lock()
+    _log_lock = threading.Lock()
+    log_path = os.environ.get("SHRUG_TIMING_LOG") or None
+
+    @classmethod
+    def observe(cls, node: str, name: str, value: float):
+        with cls._lock:
+            node_histograms = cls._histograms.setdefault(node, {})
+            histogram = node_histograms.get(name)
+            if histogram is None:
+                histogram = node_histograms[name] = Histogram()
+            histogram.observe(value)
+
+    @classmethod
+    def summary(cls, node: Optional[str] = None) -> Dict:
+        """{node: {stage: histogram summary}}, or one node's stages"""
+        with cls._lock:
+            if node is not None:
+                return {name: h.summary() for name, h in cls._histograms.get(node, {}).items()}
+            return {n: {name: h.summary() for name, h in hs.items()} for n, hs in cls._histograms.items()}
+
+    @classmethod
+    def reset(cls, node: Optional[str] = None):
+        with cls._lock:
+            if node is None:
+                cls._histograms.clear()
+            else:
+                cls._histograms.pop(node, None)
+
+    @classmethod
+    def log(cls, record: Dict):
+        if not cls.log_path:
+            return
+        line = dumps(record) + b"\n"
+        try:
+            with cls._log_lock, open(cls.log_path, "ab") as f:
+                f.write(line)
+        except OSError as e:
+            print(f"[Shrug-Prompter] Could not write timing log {cls.log_path}: {e}")
+            cls.log_path = None
+
+
+class Trace:
+    """Timings for one node execution"""
+
+    def __init__(self, node: str):
+        self.node = node
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.wall_time = None
+        self.stages: Dict[str, Dict] = {}
+        self.requests: List[Dict] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self):
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"total": 0.0, "count": 0})
+            stage["total"] += seconds
+            stage["count"] += 1
+        Instrumentation.observe(self.node, name, seconds)
+
+    def add_request(self, timings: Dict):
+        with self._lock:
+            self.requests.append(timings)
+            index = len(self.requests) - 1
+        for name, value in timings.items():
+            if name == "payload_bytes":
+                Instrumentation.observe(self.node, name, value)
+            elif isinstance(value, float):
+                self.add(name, value)
+        Instrumentation.log(dict(timings, type="request", node=self.node, run_id=self.run_id, index=index, ts=time.time()))
+
+    def finish(self) -> Dict:
+        self.wall_time = time.perf_counter() - self.started
+        Instrumentation.observe(self.node, "wall_time", self.wall_time)
+        summary = self.summary()
+        Instrumentation.log(dict(summary, type="run", ts=time.time()))
+        return summary
+
+    def summary(self) -> Dict:
+        with self._lock:
+            stages = {name: {"total": round(s["total"], 5), "count": s["count"]} for name, s in self.stages.items()}
+            payload = sum(r.get("payload_bytes", 0) for r in self.requests)
+            requests = len(self.requests)
+        client = sum(stages.get(name, {}).get("total", 0.0) for name in CLIENT_STAGES)
+        network = sum(stages.get(name, {}).get("total", 0.0) for name in NETWORK_STAGES)
+        return {
+            "node": self.node,
+            "run_id": self.run_id,
+            "wall_time": round(self.wall_time if self.wall_time is not None else time.perf_counter() - self.started, 5),
+            "requests": requests,
+            "payload_bytes": payload,
+            "stages": stages,
+            "client_seconds": round(client, 5),
+            "network_seconds": round(network, 5),
+            # Stage times are summed over threads, so this compares work, not wall time
+            "bound": "none" if not (client or network) else ("client" if client > network else "server"),
+        }
+
+    def report(self) -> str:
+        """This run's summary plus the node's histograms, as JSON"""
+        return json.dumps(dict(self.summary(), histograms=Instrumentation.summary(self.node)), indent=2)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str):
+    """Time the block into the active trace (no-op without one)"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - start)
+
+
+def record_request(**timings):
+    """Attach one request's timings (seconds, plus payload_bytes) to the active trace"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_request({k: (round(v, 6) if isinstance(v, float) else v) for k, v in timings.items()})
+
+
+def run_in_context(fn: Callable) -> Callable:
+    """Wrap fn to run with the caller's active trace in another thread; wrap once per task"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
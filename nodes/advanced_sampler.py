@@ -9,12 +9,16 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 try:
-    from utils import tensors_to_base64_list
+    from utils import tensors_to_base64_list, tensor_fingerprint
     from shrug_router import send_request
+    from response_cache import PersistentResponseCache, make_cache_key
+    from api.sse import STOP_CONDITIONS, make_stop_condition
 except ImportError:
     # Try relative imports as fallback
-    from ..utils import tensors_to_base64_list
+    from ..utils import tensors_to_base64_list, tensor_fingerprint
     from ..shrug_router import send_request
+    from ..response_cache import PersistentResponseCache, make_cache_key
+    from ..api.sse import STOP_CONDITIONS, make_stop_condition
 
 class AdvancedVLMSampler:
     """
@@ -56,14 +60,18 @@ class AdvancedVLMSampler:
                 "include_performance": ("BOOLEAN", {"default": False}),
                 "include_timing": ("BOOLEAN", {"default": False}),
                 
-                # Streaming (not used in ComfyUI but included for completeness)
-                "stream": ("BOOLEAN", {"default": False}),
+                # Streaming: tokens are read as they arrive, which enables early stopping
+                "stream": ("BOOLEAN", {"default": False, "tooltip": "Stream the response (server-sent events) and report time to first token"}),
+                "stop_when": (STOP_CONDITIONS, {"default": "none", "tooltip": "Cut the generation off as soon as this is met (turns streaming on)"}),
                 
                 # Timeout
                 "timeout": ("INT", {"default": 300, "min": 30, "max": 1800, "step": 30}),
                 
                 # Debug
                 "debug_mode": ("BOOLEAN", {"default": False}),
+                
+                # Caching
+                "persistent_cache": ("BOOLEAN", {"default": False, "tooltip": "Reuse responses cached on disk by any prompter node"}),
             }
         }
     
@@ -77,7 +85,7 @@ class AdvancedVLMSampler:
                repetition_penalty=-1, repetition_context_size=-1, seed=-1,
                processing_mode="conversation", return_individual=False,
                include_performance=False, include_timing=False, stream=False,
-               timeout=300, debug_mode=False):
+               timeout=300, debug_mode=False, persistent_cache=False, stop_when="none"):
         """
         Execute VLM sampling with advanced parameters.
         """
@@ -88,21 +96,17 @@ class AdvancedVLMSampler:
         if not provider_config:
             raise ValueError("Provider config required. Connect a VLMProviderConfig node.")
         
-        # Process images if provided
-        image_b64_list = tensors_to_base64_list(images) if images is not None else []
-        
-        # Build messages
-        messages = self._build_messages(system_prompt, user_prompt, image_b64_list, processing_mode)
-        
         # Build request kwargs - only include required parameters
+        # Messages are filled in after the cache check so a hit skips image encoding
         kwargs = {
             "provider": provider_config["provider"],
             "base_url": provider_config["base_url"],
+            "endpoint_pool": provider_config.get("endpoint_pool"),
             "api_key": provider_config["api_key"],
             "llm_model": provider_config["llm_model"],
-            "messages": messages,
+            "messages": None,
             "max_tokens": max_tokens,
-            "stream": stream,
+            "stream": stream or stop_when != "none",
             "include_performance": include_performance,
             "timeout": timeout
         }
@@ -144,10 +148,37 @@ class AdvancedVLMSampler:
             else:
                 debug_info.append("Using all model default parameters")
             debug_info.append(f"Mode: {processing_mode}")
+            if stop_when != "none":
+                debug_info.append(f"Stop when: {stop_when}")
+        
+        
+        # Check the shared persistent cache before encoding anything
+        response = None
+        cache_key = None
+        if persistent_cache:
+            cache_key = make_cache_key(
+                "AdvancedVLMSampler",
+                base_url=provider_config.get("base_url"),  # The configured server, not the pool's pick
+                system=system_prompt,
+                user=user_prompt,
+                images=tensor_fingerprint(images),
+                params={k: v for k, v in kwargs.items() if k not in ("messages", "api_key", "base_url", "endpoint_pool", "timeout", "stream")},
+                stop_when=stop_when,
+            )
+            response = PersistentResponseCache.shared().get(cache_key)
+            if response is not None and debug_mode:
+                debug_info.append("Response from persistent cache")
         
         # Make request
         try:
-            response = send_request(**kwargs)
+            if response is None:
+                # Process images if provided
+                image_b64_list = tensors_to_base64_list(images) if images is not None else []
+                kwargs["messages"] = self._build_messages(system_prompt, user_prompt, image_b64_list, processing_mode)
+                kwargs["stop_condition"] = make_stop_condition(stop_when)
+                response = send_request(**kwargs)
+                if cache_key and "error" not in response:
+                    PersistentResponseCache.shared().set(cache_key, response)
             
             # Extract responses
             responses = []
@@ -179,6 +210,19 @@ class AdvancedVLMSampler:
                     if debug_mode:
                         debug_info.append(f"Performance: {perf.get('total_time', 0):.2f}s total")
                         debug_info.append(f"Tokens/sec: {perf.get('tokens_per_second', 0):.2f}")
+                
+                # Streamed responses carry client-side timing
+                streaming = response.get("streaming")
+                if streaming:
+                    completion_tokens = (response.get("usage") or {}).get("completion_tokens", 0)
+                    if not avg_time_per_token and completion_tokens:
+                        avg_time_per_token = streaming["total_time"] / completion_tokens
+                    if debug_mode:
+                        ttft = streaming.get("time_to_first_token")
+                        debug_info.append(f"Time to first token: {ttft:.2f}s" if ttft is not None else "No tokens received")
+                        debug_info.append(f"Streamed {streaming['chunks']} chunks in {streaming['total_time']:.2f}s")
+                        if streaming.get("stopped_early"):
+                            debug_info.append(f"Stopped early: {stop_when}")
             
             # Update context
             context["llm_response"] = response
@@ -1,6 +1,17 @@
 # nodes/asr_prompter.py
+import sys
+import os
 import base64
-import requests
+
+# Add parent directory to path for imports
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+try:
+    from api.session_pool import SessionPool
+except ImportError:
+    from ..api.session_pool import SessionPool
 
 class ShrugASRNode:
     @classmethod
@@ -31,7 +42,7 @@ class ShrugASRNode:
             files = {'file': (os.path.basename(audio_path), f)}
             data = {'model': model_id}
 
-            response = requests.post(url, files=files, data=data)
+            response = SessionPool.get_session(base_url).post(url, files=files, data=data)
             response.raise_for_status() # Raise an exception for bad status codes
 
             transcribed_text = response.json().get("text", "")
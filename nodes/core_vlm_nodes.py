@@ -79,6 +79,7 @@ class VLMPrompter:
                 "context": ("VLM_CONTEXT",),
                 "seed": ("INT", {"default": -1}),
                 "image_size": (["auto", "256", "384", "512", "768", "1024", "original"], {"default": "auto"}),
+                "persistent_cache": ("BOOLEAN", {"default": False, "tooltip": "Reuse responses cached on disk by any prompter node"}),
             }
         }
     
@@ -90,7 +91,7 @@ class VLMPrompter:
     def __init__(self):
         self._cache = weakref.WeakValueDictionary()
     
-    def process_images(self, images, system_prompt, user_prompt, max_tokens, temperature, top_p, context=None, seed=-1, image_size="auto"):
+    def process_images(self, images, system_prompt, user_prompt, max_tokens, temperature, top_p, context=None, seed=-1, image_size="auto", persistent_cache=False):
         """
         Process images with automatic memory management.
         Images are processed one at a time and memory is freed immediately.
@@ -122,7 +123,7 @@ class VLMPrompter:
                     # Process and immediately append result
                     response = self._process_single_image(
                         single_image, system_prompt, user_prompt, 
-                        max_tokens, temperature, top_p, context, seed, image_size
+                        max_tokens, temperature, top_p, context, seed, image_size, persistent_cache
                     )
                     results["responses"].append(response)
                     
@@ -133,7 +134,7 @@ class VLMPrompter:
                 # Single image
                 response = self._process_single_image(
                     images, system_prompt, user_prompt,
-                    max_tokens, temperature, top_p, context, seed, image_size
+                    max_tokens, temperature, top_p, context, seed, image_size, persistent_cache
                 )
                 results["responses"].append(response)
         
@@ -143,8 +144,42 @@ class VLMPrompter:
         
         return (results,)
     
-    def _process_single_image(self, image_tensor, system_prompt, user_prompt, max_tokens, temperature, top_p, context, seed, image_size):
+    def _process_single_image(self, image_tensor, system_prompt, user_prompt, max_tokens, temperature, top_p, context, seed, image_size, persistent_cache=False):
         """Process a single image efficiently"""
+        import sys
+        import os
+        parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if parent_dir not in sys.path:
+            sys.path.insert(0, parent_dir)
+        
+        # Check the shared persistent cache before encoding (responses are plain text here)
+        cache_key = None
+        if persistent_cache:
+            try:
+                from response_cache import PersistentResponseCache, make_cache_key
+                from utils import tensor_fingerprint
+            except ImportError:
+                from ..response_cache import PersistentResponseCache, make_cache_key
+                from ..utils import tensor_fingerprint
+            provider_config = context.get("provider_config", context)
+            cache_key = make_cache_key(
+                "VLMPrompter",
+                provider=provider_config.get("provider"),
+                base_url=provider_config.get("base_url"),
+                model=provider_config.get("llm_model"),
+                system=system_prompt,
+                user=user_prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                top_p=top_p,
+                seed=seed,
+                image_size=image_size,
+                image=tensor_fingerprint(image_tensor),
+            )
+            cached = PersistentResponseCache.shared().get(cache_key)
+            if cached is not None:
+                return cached
+        
         # Convert to raw bytes for multipart or base64 for standard
         with torch.no_grad():
             # Move to CPU if needed, but don't copy
@@ -169,12 +204,6 @@ class VLMPrompter:
             del pil_image
         
         # Make API call
-        import sys
-        import os
-        parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        if parent_dir not in sys.path:
-            sys.path.insert(0, parent_dir)
-            
         try:
             from shrug_router import send_request
         except ImportError:
@@ -222,6 +251,7 @@ class VLMPrompter:
         kwargs = {
             "provider": provider_config["provider"],
             "base_url": provider_config["base_url"],
+            "endpoint_pool": provider_config.get("endpoint_pool"),
             "api_key": provider_config["api_key"],
             "llm_model": provider_config["llm_model"],
             "messages": messages,
@@ -247,7 +277,10 @@ class VLMPrompter:
             response = send_request(**kwargs)
             # Extract just the text content, don't keep the full response
             if isinstance(response, dict) and "choices" in response:
-                return response["choices"][0]["message"]["content"]
+                text = response["choices"][0]["message"]["content"]
+                if cache_key:
+                    PersistentResponseCache.shared().set(cache_key, text)
+                return text
             return str(response)
         finally:
             # Clean up image data
@@ -0,0 +1,106 @@
+"""
+Endpoint status node for shrug-prompter.
+Reports circuit breaker state, load balancer and retry counters for dashboards.
+"""
+
+import json
+import os
+import sys
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+try:
+    from shrug_router import endpoint_stats, retry_stats, coalescing_stats
+    from api.session_pool import SessionPool
+    from api.circuit_breaker import CircuitBreaker
+except ImportError:
+    from ..shrug_router import endpoint_stats, retry_stats, coalescing_stats
+    from ..api.session_pool import SessionPool
+    from ..api.circuit_breaker import CircuitBreaker
+
+
+class ShrugEndpointStatus:
+    """
+    Shows the health of every server the prompter nodes have talked to.
+    Outputs a readable report and the same data as JSON.
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {},
+            "optional": {
+                "context": ("VLM_CONTEXT", {"tooltip": "Only report the servers of this provider config"}),
+                "reset_breakers": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "Close all circuits so the next request is sent even to servers marked down"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("status_report", "status_json")
+    FUNCTION = "get_status"
+    CATEGORY = "Shrug Nodes/Config"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # State changes between runs without any input changing
+        return float("nan")
+
+    def get_status(self, context=None, reset_breakers=False):
+        if reset_breakers:
+            CircuitBreaker.reset()
+
+        stats = endpoint_stats()
+        stats["retries"] = retry_stats()
+        stats["coalescing"] = coalescing_stats()
+
+        servers = self._context_servers(context)
+        if servers is not None:
+            stats["breakers"] = [b for b in stats["breakers"] if b["server"] in servers]
+            stats["pools"] = [p for p in stats["pools"]
+                              if any(SessionPool._key(ep["url"]) in servers for ep in p["endpoints"])]
+
+        return (self._format_report(stats), json.dumps(stats, indent=2))
+
+    @staticmethod
+    def _context_servers(context):
+        if not context or "provider_config" not in context:
+            return None
+        config = context["provider_config"]
+        urls = list((config.get("endpoint_pool") or {}).get("urls", [])) or [config.get("base_url", "")]
+        return {SessionPool._key(url) for url in urls if url}
+
+    @staticmethod
+    def _format_report(stats):
+        lines = ["Servers:"]
+        if not stats["breakers"]:
+            lines.append("  (no requests sent yet)")
+        for b in stats["breakers"]:
+            line = (f"  {b['server']}: {b['state'].upper()} - {b['successes']} ok, {b['failures']} failed, "
+                    f"{b['rejected']} rejected")
+            if b["state"] == "open":
+                line += f", next check in {b['retry_in']:.0f}s"
+            if b["last_error"] and b["state"] != "closed":
+                line += f" (last error: {b['last_error'][:100]})"
+            lines.append(line)
+
+        for pool in stats["pools"]:
+            lines.append(f"Pool {pool['pool']}:")
+            for ep in pool["endpoints"]:
+                latency = f"{ep['ewma_latency']:.2f}s" if ep["ewma_latency"] is not None else "n/a"
+                line = (f"  {ep['url']}: {ep['outstanding']} in flight, {ep['requests']} requests, "
+                        f"{ep['failures']} failures, latency {latency}")
+                if ep["ejected_for"]:
+                    line += f", ejected for {ep['ejected_for']:.0f}s"
+                lines.append(line)
+
+        r = stats["retries"]
+        lines.append(f"Retries: {r['retries']} sent, {r['retries_succeeded']} succeeded, {r['gave_up']} gave up, "
+                     f"{r['budget_exhausted']} over budget; hedges: {r['hedges']} ({r['hedge_wins']} won)")
+        c = stats["coalescing"]
+        lines.append(f"Coalescing: {c['executed']} sent, {c['coalesced']} shared an in-flight request")
+        return "\n".join(lines)
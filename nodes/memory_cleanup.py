@@ -51,13 +51,12 @@ class GlobalMemoryCleanup:
                 for obj in gc.get_objects():
                     if isinstance(obj, ShrugPrompter):
                         cache_size = len(obj._cache)
+                        cache_bytes = getattr(obj._cache, "total_bytes", 0)
                         obj._cache.clear()
-                        obj._cache_hits = 0
-                        obj._cache_misses = 0
                         prompter_count += 1
                         total_freed += cache_size
                         if verbose and cache_size > 0:
-                            report_lines.append(f"Cleared {cache_size} entries from ShrugPrompter cache")
+                            report_lines.append(f"Cleared {cache_size} entries ({cache_bytes / 1024**2:.2f}MB) from ShrugPrompter cache")
                 
                 if prompter_count > 0:
                     report_lines.append(f"Cleaned {prompter_count} ShrugPrompter instances")
@@ -8,14 +8,22 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 try:
-    from utils import tensors_to_base64_list, tensors_to_raw_bytes_list
+    from utils import tensors_to_base64_list, tensors_to_raw_bytes_list, tensor_fingerprint, iter_encoded_images, resize_tensor_batch
     from shrug_router import send_request
     from api.capabilities_detector import CapabilityDetector
     from nodes.text_cleanup import TextCleanupNode
+    from response_cache import PersistentResponseCache, LRUCache
+    from api.json_codec import canonical_dumps
+    from instrumentation import Trace, span, run_in_context
+    from checkpoint import CheckpointJournal, checkpoint_dir
 except ImportError:
     # Try relative imports as fallback
-    from ..utils import tensors_to_base64_list, tensors_to_raw_bytes_list
+    from ..utils import tensors_to_base64_list, tensors_to_raw_bytes_list, tensor_fingerprint, iter_encoded_images, resize_tensor_batch
     from ..shrug_router import send_request
+    from ..response_cache import PersistentResponseCache, LRUCache
+    from ..api.json_codec import canonical_dumps
+    from ..instrumentation import Trace, span, run_in_context
+    from ..checkpoint import CheckpointJournal, checkpoint_dir
     try:
         from ..api.capabilities_detector import CapabilityDetector
     except ImportError:
@@ -56,32 +64,45 @@ class ShrugPrompter:
                 "resize_value": ("INT", {"default": 512, "min": 128, "max": 2048, "step": 64, "tooltip": "Size in pixels for resize_mode"}),
                 "resize_width": ("INT", {"default": 512, "min": 128, "max": 2048, "step": 64, "tooltip": "Width for exact mode only"}),
                 "resize_height": ("INT", {"default": 512, "min": 128, "max": 2048, "step": 64, "tooltip": "Height for exact mode only"}),
+                "client_resize": ("BOOLEAN", {"default": True, "tooltip": "Downscale images locally per resize_mode before encoding, so full-resolution frames are never uploaded"}),
                 "image_quality": ("INT", {"default": 85, "min": 1, "max": 100, "tooltip": "JPEG quality (1-100)"}),
                 "preserve_alpha": ("BOOLEAN", {"default": False, "tooltip": "Keep transparency, output PNG"}),
                 "response_cleanup": (["none", "basic", "standard", "strict"], {"default": "none", "tooltip": "none=no cleanup, basic=trim only, standard=trim+unicode+newlines, strict=ASCII only"}),
                 "clear_cache": ("BOOLEAN", {"default": False, "tooltip": "Clear the cache before processing"}),
                 "max_cache_size": ("INT", {"default": 10, "min": 0, "max": 100, "step": 5, "tooltip": "Maximum cache size (0 to disable cache completely)"}),
+                "max_cache_mb": ("INT", {"default": 64, "min": 0, "max": 4096, "tooltip": "Memory budget for cached responses in MB (0 = no byte limit)"}),
+                "persistent_cache": ("BOOLEAN", {"default": False, "tooltip": "Also cache responses on disk, shared by all prompter nodes and kept across restarts"}),
+                "max_concurrency": ("INT", {"default": 0, "min": 0, "max": 64, "tooltip": "Batch mode: requests in flight at once (0 = server's recommended batch size, 1 = one at a time)"}),
+                "checkpoint": ("BOOLEAN", {"default": False, "tooltip": "Batch mode: save each finished image's response to disk as it lands, so rerunning the same batch and prompt after a crash only sends the images that hadn't finished"}),
             },
         }
 
-    RETURN_TYPES = ("*", "LIST", "STRING", "INT", "BOOLEAN", "STRING", "IMAGE")
-    RETURN_NAMES = ("context", "response_texts", "first_response", "response_count", "is_batch_mode", "debug_info", "images")
+    RETURN_TYPES = ("*", "LIST", "STRING", "INT", "BOOLEAN", "STRING", "IMAGE", "STRING")
+    RETURN_NAMES = ("context", "response_texts", "first_response", "response_count", "is_batch_mode", "debug_info", "images", "timing")
     FUNCTION = "execute_prompt"
     CATEGORY = "Shrug Nodes/Logic"
-    OUTPUT_IS_LIST = (False, False, False, False, False, False, False)
+    OUTPUT_IS_LIST = (False, False, False, False, False, False, False, False)
 
     def __init__(self):
-        self._cache = {}
+        # LRU bounded by both entry count and bytes; hits/misses are tracked by the cache
+        self._cache = LRUCache(max_entries=10, max_bytes=64 * 1024 * 1024, name="ShrugPrompter")
         self._cache_max_size = 10  # Reduced default cache size
         self._text_cleaner = None  # Reuse cleaner instance
-        self._cache_hits = 0
-        self._cache_misses = 0
 
-    def execute_prompt(self, context, system_prompt, user_prompt, max_tokens, temperature, top_p, 
+    def execute_prompt(self, **kwargs):
+        """Run the request inside a timing trace; its JSON report is the `timing` output"""
+        trace = Trace("ShrugPrompter")
+        with trace.activate():
+            result = self._execute_prompt(**kwargs)
+        trace.finish()
+        return result + (trace.report(),)
+
+    def _execute_prompt(self, context, system_prompt, user_prompt, max_tokens, temperature, top_p, 
                           images=None, sampler_config=None, mask=None, metadata="{}", template_vars="{}", use_cache=True, debug_mode=False,
                           batch_mode=False, processing_mode="sequential", timeout=300, extra_api_params="{}", 
                           resize_mode="max", resize_value=512, resize_width=512, resize_height=512, 
-                          image_quality=85, preserve_alpha=False, response_cleanup="none", clear_cache=False, max_cache_size=10):
+                          image_quality=85, preserve_alpha=False, response_cleanup="none", clear_cache=False, max_cache_size=10,
+                          max_concurrency=0, persistent_cache=False, max_cache_mb=64, client_resize=True, checkpoint=False):
 
         debug_info = []
         context["vlm_metadata"] = metadata
@@ -90,15 +111,15 @@ class ShrugPrompter:
         # Cache management
         if clear_cache:
             self._cache.clear()
-            self._cache_hits = 0
-            self._cache_misses = 0
             print("[ShrugPrompter] Cache cleared")
         
-        # Update max cache size
+        # Update cache budgets
         self._cache_max_size = max_cache_size
+        self._cache.max_bytes = max_cache_mb * 1024 * 1024
         if max_cache_size == 0:
             use_cache = False  # Disable cache if max size is 0
             self._cache.clear()
+        self._cleanup_cache()
 
         # Log initial state
         num_images = len(images) if images is not None and hasattr(images, '__len__') else 0
@@ -111,11 +132,12 @@ class ShrugPrompter:
         print(f"[ShrugPrompter] Processing mode: {processing_mode}")
         print(f"[ShrugPrompter] Cache enabled: {use_cache} (size: {len(self._cache)}/{self._cache_max_size})")
         if use_cache and len(self._cache) > 0:
-            print(f"[ShrugPrompter] Cache stats - hits: {self._cache_hits}, misses: {self._cache_misses}")
+            print(f"[ShrugPrompter] Cache stats - {self._cache.summary()}")
         print(f"[ShrugPrompter] Max tokens: {max_tokens}")
         
         if debug_mode:
             debug_info.append(f"Starting VLM request with {num_images} images")
+            debug_info.append(f"Cache: {self._cache.summary()}")
 
         try:
             # The rest of the implementation is the same as previous answers.
@@ -156,14 +178,26 @@ class ShrugPrompter:
                         # These are API parameters, add to extra_params
                         extra_params[key] = value
             
-            cache_key = self._create_cache_key(provider_config, processed_system, processed_user, max_tokens, temperature, top_p, top_k, repetition_penalty, images, mask)
-            if use_cache and cache_key in self._cache:
-                self._cache_hits += 1
-                context["llm_response"] = self._cache[cache_key]
+            # Fingerprinting the images isn't free, so the key is only built when something will use it
+            cache_key = None
+            if use_cache or persistent_cache or (checkpoint and batch_mode):
+                cache_key = self._create_cache_key(provider_config, processed_system, processed_user, max_tokens, temperature, top_p, top_k, repetition_penalty, images, mask,
+                                                   extra_params=extra_params, batch_mode=batch_mode, client_resize=client_resize,
+                                                   resize=[resize_mode, resize_value, resize_width, resize_height],
+                                                   image_quality=image_quality, preserve_alpha=preserve_alpha)
+            cached_response = self._cache.get(cache_key) if use_cache else None
+            if cached_response is None and persistent_cache:
+                cached_response = PersistentResponseCache.shared().get(f"ShrugPrompter:{cache_key}")
+                if cached_response is not None:
+                    print(f"[ShrugPrompter] Persistent cache HIT")
+                    if use_cache:
+                        self._cache[cache_key] = cached_response
+                        self._cleanup_cache()
+            if cached_response is not None:
+                context["llm_response"] = cached_response
                 print(f"[ShrugPrompter] Cache HIT! Using cached response")
                 # Need to extract responses from cached data
                 response_list = []
-                cached_response = self._cache[cache_key]
                 if isinstance(cached_response, dict) and "choices" in cached_response and cached_response["choices"]:
                     text = cached_response["choices"][0].get("message", {}).get("content", "")
                     response_list.append(text)
@@ -173,13 +207,10 @@ class ShrugPrompter:
                 first_response = response_list[0] if response_list else ""
                 response_count = len(response_list)
                 is_batch = False  # Cache is always single mode
-                debug_output = "Response from cache" if debug_mode else "No debug info"
+                debug_output = f"Response from cache ({self._cache.summary()})" if debug_mode else "No debug info"
                 
                 return (context, response_list, first_response, response_count, is_batch, debug_output, images)
             
-            # Cache miss
-            self._cache_misses += 1
-
             # Check if we should use multipart
             use_multipart = False
             if CapabilityDetector and provider_config.get("base_url"):
@@ -187,40 +218,81 @@ class ShrugPrompter:
                 if use_multipart:
                     print(f"[ShrugPrompter] Using multipart endpoint for better performance")
             
-            # Process images based on endpoint type
-            if use_multipart:
-                # Get raw bytes for multipart
-                image_bytes_list = tensors_to_raw_bytes_list(images, quality=image_quality, preserve_alpha=preserve_alpha)
-                image_b64_list = None
-            else:
-                # Get base64 for standard endpoint
-                image_b64_list = self._process_images(images, resize_mode, resize_value, resize_width, resize_height, image_quality, preserve_alpha)
-                image_bytes_list = None
             mask_b64 = self._process_mask(mask)
+            # Shrink the batch locally in one pass; the server-side resize params are still sent
+            with span("resize"):
+                send_images = resize_tensor_batch(images, resize_mode, resize_value, resize_width, resize_height) if client_resize else images
+            num_images = len(send_images) if send_images is not None else 0
 
-            # Check if batch mode is enabled and we have multiple images
-            # Need to check both b64 and bytes lists since multipart uses bytes
-            images_list = image_b64_list or image_bytes_list or []
-            if batch_mode and len(images_list) > 1:
-                print(f"[ShrugPrompter] BATCH MODE: Processing {len(images_list)} images as separate API calls")
+            if batch_mode and num_images > 1:
+                print(f"[ShrugPrompter] BATCH MODE: Processing {num_images} images as separate API calls")
                 if debug_mode:
-                    debug_info.append(f"Batch mode: Processing {len(images_list)} images as separate inferences")
-                
-                # Each image gets its own inference
-                response_data = self._build_and_execute_batch_request(
-                    provider_config, processed_system, processed_user, image_b64_list, image_bytes_list,
-                    mask_b64, max_tokens, temperature, top_p, top_k, repetition_penalty, processing_mode, debug_info, timeout, extra_params,
-                    resize_mode, resize_value, resize_width, resize_height, image_quality, preserve_alpha, use_multipart, debug_mode
-                )
+                    debug_info.append(f"Batch mode: Processing {num_images} images as separate inferences")
                 
+                # Images that finished in an earlier, interrupted run of this batch aren't sent again
+                journal, finished = None, {}
+                if checkpoint:
+                    journal = self._open_checkpoint(cache_key, processing_mode)
+                    finished = {int(key): value for key, value in journal.items() if key.isdigit() and int(key) < num_images}
+                    if finished:
+                        print(f"[ShrugPrompter] Checkpoint: {len(finished)}/{num_images} images already finished, sending the other {num_images - len(finished)}")
+                    if debug_mode:
+                        debug_info.append(f"Checkpoint {journal.path}: {len(finished)} finished")
+                pending = [i for i in range(num_images) if i not in finished]
+
+                def journal_completion(position, response):
+                    if "error" not in response:
+                        journal.record(str(pending[position]), response)
+
+                # Each image gets its own inference. Images are encoded lazily, a few
+                # ahead of the requests in flight, instead of all up front
+                concurrency = self._resolve_concurrency(max_concurrency, provider_config.get("base_url"))
+                if pending:
+                    pending_images = send_images[pending] if finished else send_images
+                    image_stream = iter_encoded_images(pending_images, quality=image_quality, as_base64=not use_multipart,
+                                                       prefetch=concurrency + 2, preserve_alpha=preserve_alpha)
+                    image_b64_list = None if use_multipart else image_stream
+                    image_bytes_list = image_stream if use_multipart else None
+                    response_data = self._build_and_execute_batch_request(
+                        provider_config, processed_system, processed_user, image_b64_list, image_bytes_list,
+                        mask_b64, max_tokens, temperature, top_p, top_k, repetition_penalty, processing_mode, debug_info, timeout, extra_params,
+                        resize_mode, resize_value, resize_width, resize_height, image_quality, preserve_alpha, use_multipart, debug_mode,
+                        max_concurrency=concurrency, total_images=len(pending),
+                        on_complete=journal_completion if journal is not None else None
+                    )
+                else:
+                    response_data = {"completions": [], "processing_mode": processing_mode}
+
+                completions = response_data.get("completions", [])
+                if finished:
+                    merged = [finished.get(i) for i in range(num_images)]
+                    for position, i in enumerate(pending):
+                        merged[i] = completions[position]
+                    completions = merged
+                    response_data = dict(response_data, completions=completions)
+                if journal is not None:
+                    if all("error" not in completion for completion in completions):
+                        journal.remove()  # Nothing left to resume
+                    else:
+                        journal.close()
+
                 # Store multiple responses for batch mode
-                context["llm_responses"] = response_data.get("completions", [])
+                context["llm_responses"] = completions
                 context["llm_response"] = response_data  # Keep full response for compatibility
                 context["batch_mode"] = True
-                context["batch_size"] = len(images_list)
+                context["batch_size"] = num_images
             else:
                 # Single request mode - can have multiple images in one conversation
-                num_images = len(images_list)
+                # Process images based on endpoint type
+                if use_multipart:
+                    # Get raw bytes for multipart
+                    image_bytes_list = tensors_to_raw_bytes_list(send_images, quality=image_quality, preserve_alpha=preserve_alpha)
+                    image_b64_list = None
+                else:
+                    # Get base64 for standard endpoint
+                    image_b64_list = self._process_images(send_images, resize_mode, resize_value, resize_width, resize_height, image_quality, preserve_alpha)
+                    image_bytes_list = None
+                num_images = len(image_b64_list or image_bytes_list or [])
                 if num_images > 0:
                     print(f"[ShrugPrompter] SINGLE MODE: Processing {num_images} images in one API call")
                 else:
@@ -239,6 +311,12 @@ class ShrugPrompter:
                     print(f"[ShrugPrompter] ❌ Request failed: {response_data['error'].get('message', 'Unknown error')}")
                 else:
                     print(f"[ShrugPrompter] ✓ Request successful")
+                    upload = response_data.get("upload")
+                    if upload:
+                        upload_line = f"Uploaded {upload['bytes'] / 1024**2:.2f}MB in {upload['seconds']:.2f}s ({upload['mb_per_s']:.1f} MB/s)"
+                        print(f"[ShrugPrompter] {upload_line}")
+                        if debug_mode:
+                            debug_info.append(upload_line)
                 
                 context["llm_response"] = response_data
                 context["batch_mode"] = False
@@ -246,6 +324,8 @@ class ShrugPrompter:
                 if use_cache and "error" not in response_data:
                     self._cache[cache_key] = response_data
                     self._cleanup_cache()
+                if persistent_cache and "error" not in response_data:
+                    PersistentResponseCache.shared().set(f"ShrugPrompter:{cache_key}", response_data)
 
         except Exception as e:
             import traceback
@@ -327,7 +407,8 @@ class ShrugPrompter:
                     print(f"\n[ShrugPrompter] === Response Cleanup ({response_cleanup}) ===")
                 
                 for i, text in enumerate(response_list):
-                    cleaned, original, _, _ = cleaner.cleanup_text(text, operations)
+                    with span("cleanup"):
+                        cleaned, original, _, _ = cleaner.cleanup_text(text, operations)
                     cleaned_list.append(cleaned)
                     
                     if debug_mode and original != cleaned:
@@ -371,9 +452,12 @@ class ShrugPrompter:
         return (context, response_list, first_response, response_count, is_batch, debug_output, images)
 
     # Helper methods are complete and do not require further changes.
-    def _create_cache_key(self, provider_config, system, user, max_tokens, temp, top_p, top_k, repetition_penalty, images, mask):
+    def _create_cache_key(self, provider_config, system, user, max_tokens, temp, top_p, top_k, repetition_penalty, images, mask,
+                          extra_params=None, batch_mode=False, client_resize=True, resize=None, image_quality=85, preserve_alpha=False):
+        # Also keys the shared on-disk cache, so everything that changes the answer belongs here
         data = { 
             "provider": provider_config.get("provider"), 
+            "base_url": provider_config.get("base_url"),
             "model": provider_config.get("llm_model"), 
             "system": system, 
             "user": user, 
@@ -382,35 +466,48 @@ class ShrugPrompter:
             "top_p": top_p,
             "top_k": top_k,
             "repetition_penalty": repetition_penalty,
+            "extra": extra_params or {},  # extra_api_params and sampler extras (seed, min_p, ...)
+            "batch_mode": batch_mode,
+            "client_resize": client_resize,
+            "resize": resize,
+            "image_quality": image_quality,
+            "preserve_alpha": preserve_alpha,
             "images_shape": str(images.shape) if images is not None else "None", 
-            "mask_shape": str(mask.shape) if mask is not None else "None" 
+            "mask_shape": str(mask.shape) if mask is not None else "None",
+            # Content hashes so different frames of the same size don't collide
+            "images_hash": tensor_fingerprint(images),
+            "mask_hash": tensor_fingerprint(mask)
+        }
+        return hashlib.md5(canonical_dumps(data)).hexdigest()
+
+    def _open_checkpoint(self, cache_key, processing_mode):
+        """Journal for this batch: same frames, prompts and settings map to the same file"""
+        run = {
+            "request": cache_key,  # Server, model, prompts, sampling, image settings and content hashes
+            "processing_mode": processing_mode,
         }
-        return hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        run_key = hashlib.sha256(canonical_dumps(run)).hexdigest()[:24]
+        return CheckpointJournal(os.path.join(checkpoint_dir(), f"ShrugPrompter-{run_key}.jsonl"))
 
     def _cleanup_cache(self):
-        """More efficient cache cleanup with LRU behavior"""
+        """Evict least recently used entries until within the entry and byte budgets"""
         if self._cache_max_size == 0:
             self._cache.clear()
             return
-            
-        if len(self._cache) > self._cache_max_size:
-            # Remove oldest entries (FIFO order)
-            num_to_remove = len(self._cache) - self._cache_max_size
-            for key in list(self._cache.keys())[:num_to_remove]:
-                del self._cache[key]
-            print(f"[ShrugPrompter] Cache cleanup: removed {num_to_remove} old entries")
+        
+        self._cache.max_entries = self._cache_max_size
+        num_removed = self._cache.evict()
+        if num_removed:
+            print(f"[ShrugPrompter] Cache cleanup: evicted {num_removed} least recently used entries")
 
     def _process_images(self, images, resize_mode="max", resize_value=512, resize_width=512, resize_height=512, image_quality=85, preserve_alpha=False):
         """Process images with proper resize parameters for server-side resizing"""
         if images is None:
             return []
         
-        # For now, we still use base64 encoding but don't resize client-side
-        # The resize parameters will be passed to the API for server-side resizing
-        # This avoids creating unnecessary copies in memory
-        
-        # Use original size - let server handle resizing
-        return tensors_to_base64_list(images, max_size=None, quality=image_quality) if images is not None else []
+        # Images arrive already downscaled when client_resize is on (see resize_tensor_batch).
+        # The resize parameters are still passed to the API for server-side resizing
+        return tensors_to_base64_list(images, max_size=None, quality=image_quality, preserve_alpha=preserve_alpha) if images is not None else []
 
     def _process_mask(self, mask):
         if mask is None: return None
@@ -482,133 +579,77 @@ class ShrugPrompter:
         # Return original text if no smart parsing applied
         return text
 
-    def _build_and_execute_batch_request(self, provider_config, system, user, images_b64, images_bytes, mask, max_tokens, temp, top_p, top_k, repetition_penalty, processing_mode, debug_info, timeout=300, extra_params=None, resize_mode="max", resize_value=512, resize_width=512, resize_height=512, image_quality=85, preserve_alpha=False, use_multipart=False, debug_mode=False):
-        """Execute batch request as separate API calls - simpler and more memory efficient"""
+    def _build_and_execute_batch_request(self, provider_config, system, user, images_b64, images_bytes, mask, max_tokens, temp, top_p, top_k, repetition_penalty, processing_mode, debug_info, timeout=300, extra_params=None, resize_mode="max", resize_value=512, resize_width=512, resize_height=512, image_quality=85, preserve_alpha=False, use_multipart=False, debug_mode=False, max_concurrency=1, total_images=None, on_complete=None):
+        """
+        Execute batch request as separate API calls, up to max_concurrency in flight at once.
+
+        The image lists may be lazy iterators (see iter_encoded_images); pass total_images
+        for those. Images are pulled only as request slots free up. on_complete(i, response)
+        is called from the worker thread as each image finishes.
+        """
         import gc
-        
-        all_completions = []
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
         
         # Determine which image list to use
-        if use_multipart and images_bytes:
+        if use_multipart and images_bytes is not None:
             images_to_process = images_bytes
         else:
             images_to_process = images_b64 or []
         
-        total_images = len(images_to_process)
+        if total_images is None:
+            total_images = len(images_to_process)
+        workers = max(1, min(max_concurrency, total_images))
         
         print(f"[ShrugPrompter] Starting batch processing of {total_images} images")
         print(f"[ShrugPrompter] Processing mode: {processing_mode}")
+        print(f"[ShrugPrompter] Concurrency: {workers} request(s) in flight")
+        if debug_info is not None:
+            debug_info.append(f"Batch concurrency: {workers}")
+        if resize_mode != "none":
+            print(f"[ShrugPrompter] Resize params: mode={resize_mode}, value={resize_value}, quality={image_quality}")
         
-        # Process each image with a separate API call
-        for i, img_data in enumerate(images_to_process):
-            remaining = total_images - i - 1
-            print(f"\n[ShrugPrompter] Processing image {i+1}/{total_images} (remaining: {remaining})")
-            
-            if debug_info:
-                debug_info.append(f"Processing image {i+1}/{total_images}")
-            
-            # Build single-image request
-            if use_multipart:
-                # For multipart, use placeholder
-                messages = [
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": [
-                        {"type": "text", "text": user},
-                        {"type": "image_url", "image_url": {"url": "__RAW_IMAGE__"}}
-                    ]}
-                ]
-            else:
-                # For standard, use base64
-                messages = [
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": [
-                        {"type": "text", "text": user},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_data}"}}
-                    ]}
-                ]
-            
-            # Make individual API call
-            kwargs = {
-                "provider": provider_config["provider"],
-                "base_url": provider_config["base_url"],
-                "api_key": provider_config["api_key"],
-                "llm_model": provider_config["llm_model"],
-                "messages": messages,
-                "max_tokens": max_tokens,
-                "temperature": temp,
-                "top_p": top_p,
-                "timeout": timeout
-            }
-            
-            # Add optional parameters only if not default
-            if top_k > 0:
-                kwargs["top_k"] = top_k
-            if repetition_penalty != 1.0:
-                kwargs["repetition_penalty"] = repetition_penalty
-            
-            # Add processing mode for batch calls
-            kwargs["processing_mode"] = processing_mode
-            
-            # Only add mask if provided
-            if mask:
-                kwargs["mask"] = mask
-            
-            # Add resize parameters based on mode
-            if resize_mode != "none":
-                if resize_mode == "max":
-                    kwargs["resize_max"] = resize_value
-                    print(f"[ShrugPrompter] Setting resize_max={resize_value}")
-                elif resize_mode == "width":
-                    kwargs["resize_width"] = resize_value
-                elif resize_mode == "height":
-                    kwargs["resize_height"] = resize_value
-                elif resize_mode == "exact":
-                    kwargs["resize_width"] = resize_width
-                    kwargs["resize_height"] = resize_height
-            
-            # Add quality and alpha settings
-            kwargs["image_quality"] = image_quality
-            kwargs["preserve_alpha"] = preserve_alpha
-            
-            # Debug: Show what resize params we're sending
-            if resize_mode != "none":
-                print(f"[ShrugPrompter] Resize params: mode={resize_mode}, value={resize_value}, quality={image_quality}")
-            
-            # Add raw images for multipart
-            if use_multipart and images_bytes:
-                # img_data is tuple of (bytes, mime_type)
-                kwargs["raw_images"] = [img_data[0]]
-            
-            # Merge extra parameters
-            if extra_params:
-                kwargs.update(extra_params)
-            
-            try:
-                response = send_request(**kwargs)
-                
-                # Log response info
-                if "error" in response:
-                    print(f"[ShrugPrompter] ❌ Image {i+1} failed: {response['error'].get('message', 'Unknown error')}")
-                else:
-                    content_preview = ""
-                    if "choices" in response and response["choices"]:
-                        content = response["choices"][0].get("message", {}).get("content", "")
-                        content_preview = content[:100] + "..." if len(content) > 100 else content
-                        content_preview = content_preview.replace('\n', ' ')
-                    print(f"[ShrugPrompter] ✓ Image {i+1} complete: {content_preview}")
+        def run_item(i, img_data):
+            kwargs = self._build_batch_item_kwargs(
+                provider_config, system, user, img_data, mask, max_tokens, temp, top_p, top_k, repetition_penalty,
+                processing_mode, timeout, extra_params, resize_mode, resize_value, resize_width, resize_height,
+                image_quality, preserve_alpha, use_multipart and images_bytes is not None
+            )
+            response = self._execute_batch_item(i, total_images, kwargs)
+            if on_complete:
+                on_complete(i, response)
+            return response
+        
+        if workers == 1:
+            all_completions = []
+            for i, img_data in enumerate(images_to_process):
+                remaining = total_images - i - 1
+                print(f"\n[ShrugPrompter] Processing image {i+1}/{total_images} (remaining: {remaining})")
+                if debug_info:
+                    debug_info.append(f"Processing image {i+1}/{total_images}")
+                all_completions.append(run_item(i, img_data))
                 
-                all_completions.append(response)
-            except Exception as e:
-                # If one fails, record error but continue
-                print(f"[ShrugPrompter] ❌ Image {i+1} exception: {str(e)}")
-                error_response = {
-                    "error": {"message": f"Failed processing image {i+1}: {str(e)}"}
-                }
-                all_completions.append(error_response)
+                # Clean up memory after each image
+                if i % 3 == 0:  # Every 3 images
+                    gc.collect()
+        else:
+            # Results are stored by index so output order matches input order
+            all_completions = [None] * total_images
             
-            # Clean up memory after each image
-            if i % 3 == 0:  # Every 3 images
-                gc.collect()
+            def run_into(i, img_data):
+                all_completions[i] = run_item(i, img_data)
+            
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shrug-batch") as executor:
+                in_flight = set()
+                for i, img_data in enumerate(images_to_process):
+                    # Don't pull the next image until a request slot is free
+                    if len(in_flight) >= workers:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                    in_flight.add(executor.submit(run_in_context(run_into), i, img_data))
+                for future in in_flight:
+                    future.result()
+            gc.collect()
         
         # Summary logging
         successful = sum(1 for r in all_completions if "error" not in r)
@@ -622,6 +663,118 @@ class ShrugPrompter:
             "processing_mode": processing_mode
         }
 
+    def _build_batch_item_kwargs(self, provider_config, system, user, img_data, mask, max_tokens, temp, top_p, top_k, repetition_penalty, processing_mode, timeout, extra_params, resize_mode, resize_value, resize_width, resize_height, image_quality, preserve_alpha, use_multipart):
+        """Build the request kwargs for a single image of a batch"""
+        # Multipart only for an item that was encoded as (bytes, mime_type), like the other multipart paths
+        use_multipart = use_multipart and isinstance(img_data, tuple)
+
+        # Build single-image request
+        if use_multipart:
+            # For multipart, use placeholder
+            messages = [
+                {"role": "system", "content": system},
+                {"role": "user", "content": [
+                    {"type": "text", "text": user},
+                    {"type": "image_url", "image_url": {"url": "__RAW_IMAGE__"}}
+                ]}
+            ]
+        else:
+            # For standard, use base64
+            messages = [
+                {"role": "system", "content": system},
+                {"role": "user", "content": [
+                    {"type": "text", "text": user},
+                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_data}"}}
+                ]}
+            ]
+        
+        kwargs = {
+            "provider": provider_config["provider"],
+            "base_url": provider_config["base_url"],
+            "endpoint_pool": provider_config.get("endpoint_pool"),
+            "api_key": provider_config["api_key"],
+            "llm_model": provider_config["llm_model"],
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temp,
+            "top_p": top_p,
+            "timeout": timeout
+        }
+        
+        # Add optional parameters only if not default
+        if top_k > 0:
+            kwargs["top_k"] = top_k
+        if repetition_penalty != 1.0:
+            kwargs["repetition_penalty"] = repetition_penalty
+        
+        # Add processing mode for batch calls
+        kwargs["processing_mode"] = processing_mode
+        
+        # Only add mask if provided
+        if mask:
+            kwargs["mask"] = mask
+        
+        # Add resize parameters based on mode
+        if resize_mode != "none":
+            if resize_mode == "max":
+                kwargs["resize_max"] = resize_value
+            elif resize_mode == "width":
+                kwargs["resize_width"] = resize_value
+            elif resize_mode == "height":
+                kwargs["resize_height"] = resize_value
+            elif resize_mode == "exact":
+                kwargs["resize_width"] = resize_width
+                kwargs["resize_height"] = resize_height
+        
+        # Add quality and alpha settings
+        kwargs["image_quality"] = image_quality
+        kwargs["preserve_alpha"] = preserve_alpha
+        
+        # Add raw images for multipart
+        if use_multipart:
+            # img_data is tuple of (bytes, mime_type)
+            kwargs["raw_images"] = [img_data[0]]
+        
+        # Merge extra parameters
+        if extra_params:
+            kwargs.update(extra_params)
+        
+        return kwargs
+
+    def _execute_batch_item(self, i, total_images, kwargs):
+        """Send one batch request; failures are returned as error dicts so other images are unaffected"""
+        try:
+            response = send_request(**kwargs)
+            
+            # Log response info
+            if "error" in response:
+                print(f"[ShrugPrompter] ❌ Image {i+1}/{total_images} failed: {response['error'].get('message', 'Unknown error')}")
+            else:
+                content_preview = ""
+                if "choices" in response and response["choices"]:
+                    content = response["choices"][0].get("message", {}).get("content", "")
+                    content_preview = content[:100] + "..." if len(content) > 100 else content
+                    content_preview = content_preview.replace('\n', ' ')
+                upload = response.get("upload")
+                upload_note = f" [upload {upload['mb_per_s']:.1f} MB/s]" if upload else ""
+                print(f"[ShrugPrompter] ✓ Image {i+1}/{total_images} complete{upload_note}: {content_preview}")
+            
+            return response
+        except Exception as e:
+            # If one fails, record error but continue
+            print(f"[ShrugPrompter] ❌ Image {i+1}/{total_images} exception: {str(e)}")
+            return {
+                "error": {"message": f"Failed processing image {i+1}: {str(e)}"}
+            }
+
+    def _resolve_concurrency(self, max_concurrency, base_url):
+        """0 means auto: use the server's recommended batch size"""
+        if max_concurrency > 0:
+            return max_concurrency
+        if CapabilityDetector and base_url:
+            return max(1, CapabilityDetector.get_optimal_batch_size(base_url))
+        return 1
+
     def _build_and_execute_request(self, provider_config, system, user, images_b64, images_bytes, mask, max_tokens, temp, top_p, top_k, repetition_penalty, timeout=300, extra_params=None, resize_mode="max", resize_value=512, resize_width=512, resize_height=512, image_quality=85, preserve_alpha=False, use_multipart=False, debug_mode=False):
         if use_multipart and images_bytes:
             # For multipart, use placeholders
@@ -635,6 +788,7 @@ class ShrugPrompter:
         kwargs = {
             "provider": provider_config["provider"], 
             "base_url": provider_config["base_url"], 
+            "endpoint_pool": provider_config.get("endpoint_pool"),
             "api_key": provider_config["api_key"], 
             "llm_model": provider_config["llm_model"], 
             "messages": messages, 
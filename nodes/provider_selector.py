@@ -1,6 +1,17 @@
 # nodes/provider_selector.py
 # In shrug-prompter/nodes/provider_selector.py
 import os
+import sys
+
+# Add parent directory to path for imports
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+try:
+    from api.load_balancer import STRATEGIES, parse_base_urls
+except ImportError:
+    from ..api.load_balancer import STRATEGIES, parse_base_urls
 
 class ShrugProviderSelector:
     """
@@ -29,6 +40,11 @@ class ShrugProviderSelector:
                     "default": "Enter model name (will auto-populate if server is reachable)",
                     "multiline": False
                 }),
+            },
+            "optional": {
+                # Only used when base_url lists several servers (comma separated)
+                "balance_strategy": (STRATEGIES, {"default": "least_outstanding", "tooltip": "How requests are spread when base_url lists several servers"}),
+                "max_per_endpoint": ("INT", {"default": 0, "min": 0, "max": 256, "tooltip": "Requests in flight per server (0 = unlimited)"}),
             }
         }
 
@@ -37,10 +53,11 @@ class ShrugProviderSelector:
     FUNCTION = "create_context"
     CATEGORY = "Shrug Nodes/Config"
 
-    def create_context(self, provider, base_url, api_key, llm_model):
+    def create_context(self, provider, base_url, api_key, llm_model, balance_strategy="least_outstanding", max_per_endpoint=0):
         """
         Validates inputs and packages them into a provider_config dictionary.
         Prioritizes user-provided widget values over environment variables.
+        A comma separated base_url becomes an endpoint pool; base_url is then the first server.
         """
         # Clean up the model name (remove vision indicators that might be added by the UI)
         clean_model = llm_model.replace(" (Vision)", "").strip()
@@ -54,20 +71,28 @@ class ShrugProviderSelector:
         if not final_api_key and provider != "ollama" and not is_local:
             print(f"Warning: ShrugProviderSelector - API Key for {provider} is not set.")
 
-        # Ensure base_url has protocol
-        if not base_url.startswith(("http://", "https://")):
-            base_url = f"http://{base_url}"
+        # Ensure base_url has protocol (and split a list of servers)
+        base_urls = parse_base_urls(base_url) or ["http://localhost:8080"]
+        base_url = base_urls[0]
 
         context = {
             "provider_config": {
                 "provider": provider,
-                "base_url": base_url.rstrip('/'),  # Remove trailing slash
+                "base_url": base_url,
                 "api_key": final_api_key,
                 "llm_model": clean_model,
             }
         }
 
-        print(f"Provider config: {provider} at {base_url} using model {clean_model}")
+        if len(base_urls) > 1:
+            context["provider_config"]["endpoint_pool"] = {
+                "urls": base_urls,
+                "strategy": balance_strategy,
+                "max_per_endpoint": max_per_endpoint,
+            }
+            print(f"Provider config: {provider} across {len(base_urls)} servers ({balance_strategy}) using model {clean_model}")
+        else:
+            print(f"Provider config: {provider} at {base_url} using model {clean_model}")
 
         # The output must be a tuple
         return (context,)
@@ -12,6 +12,15 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
+try:
+    from api.session_pool import SessionPool
+    from response_cache import LRUCache
+    from api.json_codec import dumps, loads
+except ImportError:
+    from ..api.session_pool import SessionPool
+    from ..response_cache import LRUCache
+    from ..api.json_codec import dumps, loads
+
 
 class RemoteTextEncoder:
     """
@@ -39,6 +48,7 @@ class RemoteTextEncoder:
                     "tooltip": "Truncate embeddings to this dimension (0 = use full dimension)"
                 }),
                 "cache_embeddings": ("BOOLEAN", {"default": True}),
+                "max_cache_mb": ("INT", {"default": 256, "min": 0, "max": 8192, "tooltip": "Memory budget for cached embeddings in MB (0 = no byte limit)"}),
                 "debug_mode": ("BOOLEAN", {"default": False}),
             }
         }
@@ -49,11 +59,11 @@ class RemoteTextEncoder:
     CATEGORY = "Shrug Nodes/Text"
     
     def __init__(self):
-        self._cache = {}
-        self._max_cache_size = 100
+        # LRU bounded by entry count and by tensor bytes
+        self._cache = LRUCache(max_entries=100, max_bytes=256 * 1024 * 1024, name="RemoteTextEncoder")
     
     def encode_text(self, context, text, normalize=True, batch_texts=None, 
-                   dimensions=0, cache_embeddings=True, debug_mode=False):
+                   dimensions=0, cache_embeddings=True, debug_mode=False, max_cache_mb=256):
         """
         Get real embeddings from the heylookitsanllm embeddings endpoint.
         """
@@ -76,11 +86,13 @@ class RemoteTextEncoder:
             debug_info.append(f"Using model: {provider_config.get('llm_model', 'default')}")
         
         # Check cache
+        self._cache.max_bytes = max_cache_mb * 1024 * 1024
         cache_key = self._generate_cache_key(texts_to_encode, dimensions, normalize)
-        if cache_embeddings and cache_key in self._cache:
+        cached_result = self._cache.get(cache_key) if cache_embeddings else None
+        if cached_result is not None:
             if debug_mode:
                 debug_info.append("Using cached embeddings")
-            cached_result = self._cache[cache_key]
+                debug_info.append(f"Cache: {self._cache.summary()}")
             return self._format_output(cached_result, debug_info, debug_mode)
         
         # Build embeddings API request
@@ -107,10 +119,10 @@ class RemoteTextEncoder:
         
         try:
             # Send request to embeddings endpoint
-            response = requests.post(
+            response = SessionPool.get_session(base_url).post(
                 embeddings_url,
                 headers=headers,
-                json=request_data,
+                data=dumps(request_data),
                 timeout=30
             )
             
@@ -136,7 +148,7 @@ class RemoteTextEncoder:
                 raise RuntimeError(f"Embeddings API error ({response.status_code}): {error_msg}")
             
             # Parse response
-            response_data = response.json()
+            response_data = loads(response.content)
             
             if debug_mode:
                 debug_info.append(f"Response: {json.dumps(response_data, indent=2)[:500]}...")
@@ -158,10 +170,9 @@ class RemoteTextEncoder:
             if normalize:
                 embeddings = self._normalize_embeddings(embeddings)
             
-            # Cache the result
+            # Cache the result (evicts least recently used entries past the budget)
             if cache_embeddings:
-                self._cache[cache_key] = embeddings
-                self._cleanup_cache()
+                self._cache.set(cache_key, embeddings)
             
             if debug_mode:
                 debug_info.append(f"Successfully retrieved embeddings")
@@ -207,14 +218,6 @@ class RemoteTextEncoder:
         key_str = f"{text_str}_{dimensions}_{normalize}"
         return hashlib.md5(key_str.encode()).hexdigest()
     
-    def _cleanup_cache(self):
-        """Clean up cache if it gets too large."""
-        if len(self._cache) > self._max_cache_size:
-            # Remove oldest entries (first half)
-            items = list(self._cache.items())
-            for key, _ in items[:len(items)//2]:
-                del self._cache[key]
-    
     def _format_output(self, embeddings, debug_info, debug_mode):
         """Format output for ComfyUI."""
         # Create conditioning format (compatible with CLIP conditioning)
@@ -13,9 +13,9 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 try:
-    from shrug_router import send_request
+    from shrug_router import send_requests
 except ImportError:
-    from ..shrug_router import send_request
+    from ..shrug_router import send_requests
 
 
 class SeedPromptGenerator:
@@ -25,6 +25,9 @@ class SeedPromptGenerator:
     prompts that can be expanded by downstream VLM nodes.
     """
     
+    # Enhancement requests in flight at once
+    ENHANCE_CONCURRENCY = 16
+    
     # Predefined seed categories with examples
     SEED_CATEGORIES = {
         "cinematic": {
@@ -413,40 +416,41 @@ class SeedPromptGenerator:
         return seeds
     
     def _enhance_seeds_with_ai(self, seeds, context, instruction):
-        """Use AI to enhance and expand seed prompts."""
-        enhanced = []
+        """Use AI to enhance and expand seed prompts, all seeds concurrently."""
+        provider_config = context.get("provider_config", {})
+        
+        try:
+            # One enhancement request per seed
+            requests_kwargs = [
+                {
+                    "provider": provider_config["provider"],
+                    "messages": [
+                        {"role": "system", "content": "You are a creative prompt enhancer. Enhance prompts with rich detail while preserving their core concept."},
+                        {"role": "user", "content": f"{instruction}\n\n{seed}"}
+                    ],
+                    "api_key": provider_config["api_key"],
+                    "base_url": provider_config["base_url"],
+                    "endpoint_pool": provider_config.get("endpoint_pool"),
+                    "llm_model": provider_config["llm_model"],
+                    "max_tokens": 200,
+                    "temperature": 0.8,
+                    "top_p": 0.9,
+                    "timeout": 30
+                }
+                for seed in seeds
+            ]
+            responses = send_requests(requests_kwargs, max_concurrency=self.ENHANCE_CONCURRENCY)
+        except Exception as e:
+            print(f"Enhancement failed for seeds: {e}")
+            return list(seeds)
         
-        for seed in seeds:
-            try:
-                # Build enhancement request
-                messages = [
-                    {"role": "system", "content": "You are a creative prompt enhancer. Enhance prompts with rich detail while preserving their core concept."},
-                    {"role": "user", "content": f"{instruction}\n\n{seed}"}
-                ]
-                
-                # Get provider config from context
-                provider_config = context.get("provider_config", {})
-                
-                response = send_request(
-                    provider=provider_config["provider"],
-                    messages=messages,
-                    api_key=provider_config["api_key"],
-                    base_url=provider_config["base_url"],
-                    llm_model=provider_config["llm_model"],
-                    max_tokens=200,
-                    temperature=0.8,
-                    top_p=0.9,
-                    timeout=30
-                )
-                
-                if "choices" in response and response["choices"]:
-                    enhanced_text = response["choices"][0]["message"]["content"].strip()
-                    enhanced.append(enhanced_text)
-                else:
-                    enhanced.append(seed)  # Fallback to original
-                    
-            except Exception as e:
-                print(f"Enhancement failed for seed: {e}")
+        enhanced = []
+        for seed, response in zip(seeds, responses):
+            if "choices" in response and response["choices"]:
+                enhanced.append(response["choices"][0]["message"]["content"].strip())
+            else:
+                if "error" in response:
+                    print(f"Enhancement failed for seed: {response['error'].get('message', 'Unknown error')}")
                 enhanced.append(seed)  # Fallback to original
         
         return enhanced
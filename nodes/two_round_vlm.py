@@ -14,13 +14,15 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 try:
-    from utils import tensors_to_base64_list, tensors_to_raw_bytes_list
+    from utils import tensors_to_base64_list, tensors_to_raw_bytes_list, tensor_fingerprint
     from shrug_router import send_request
     from api.capabilities_detector import CapabilityDetector
     from nodes.text_cleanup import TextCleanupNode
+    from response_cache import PersistentResponseCache, make_cache_key
 except ImportError:
-    from ..utils import tensors_to_base64_list, tensors_to_raw_bytes_list
+    from ..utils import tensors_to_base64_list, tensors_to_raw_bytes_list, tensor_fingerprint
     from ..shrug_router import send_request
+    from ..response_cache import PersistentResponseCache, make_cache_key
     try:
         from ..api.capabilities_detector import CapabilityDetector
     except ImportError:
@@ -90,6 +92,7 @@ class TwoRoundVLMPrompter:
                 }),
                 "resize_value": ("INT", {"default": 512, "min": 64, "max": 2048}),
                 "image_quality": ("INT", {"default": 85, "min": 1, "max": 100}),
+                "persistent_cache": ("BOOLEAN", {"default": False, "tooltip": "Reuse round responses cached on disk by any prompter node"}),
             }
         }
     
@@ -107,7 +110,7 @@ class TwoRoundVLMPrompter:
                           images=None, round1_template=None, round2_template=None,
                           pass_observation=True, batch_mode=False, debug_mode=False,
                           response_cleanup="standard", resize_mode="none", 
-                          resize_value=512, image_quality=85):
+                          resize_value=512, image_quality=85, persistent_cache=False):
         
         debug_output = []
         
@@ -124,14 +127,16 @@ class TwoRoundVLMPrompter:
         if batch_mode and images is not None and len(images) > 1:
             round1_responses = self._process_batch_round1(
                 round1_context, images, round1_system_prompt, round1_user_prompt,
-                max_tokens, temperature, top_p, resize_mode, resize_value, image_quality, debug_mode
+                max_tokens, temperature, top_p, resize_mode, resize_value, image_quality, debug_mode,
+                persistent_cache=persistent_cache
             )
             round1_observation = "\n---\n".join(round1_responses)
         else:
             # Single image processing
             round1_observation = self._process_single_round1(
                 round1_context, images, round1_system_prompt, round1_user_prompt,
-                max_tokens, temperature, top_p, resize_mode, resize_value, image_quality, debug_mode
+                max_tokens, temperature, top_p, resize_mode, resize_value, image_quality, debug_mode,
+                persistent_cache=persistent_cache
             )
         
         if debug_mode:
@@ -162,7 +167,8 @@ class TwoRoundVLMPrompter:
         # Round 2 is text-only (no images)
         final_prompt = self._process_round2(
             round2_context, round2_system_prompt, round2_full_prompt,
-            max_tokens, temperature, top_p, debug_mode
+            max_tokens, temperature, top_p, debug_mode,
+            persistent_cache=persistent_cache
         )
         
         if debug_mode:
@@ -186,10 +192,34 @@ class TwoRoundVLMPrompter:
         
         return (updated_context, final_prompt, round1_observation, debug_info)
     
+    @staticmethod
+    def _provider_key_fields(context):
+        """Provider, server and model for cache keys, from a nested or flat VLM_CONTEXT"""
+        provider_config = context.get("provider_config", context)
+        return {
+            "provider": provider_config.get("provider"),
+            "base_url": provider_config.get("base_url"),
+            "model": provider_config.get("llm_model") or provider_config.get("model"),
+        }
+
     def _process_single_round1(self, context, images, system_prompt, user_prompt,
                                max_tokens, temperature, top_p, resize_mode, 
-                               resize_value, image_quality, debug_mode):
+                               resize_value, image_quality, debug_mode, persistent_cache=False):
         """Process Round 1 with visual observation"""
+        cache_key = None
+        if persistent_cache:
+            cache_key = make_cache_key(
+                "TwoRoundVLMPrompter:round1",
+                **self._provider_key_fields(context),
+                system=system_prompt, user=user_prompt,
+                max_tokens=max_tokens, temperature=temperature, top_p=top_p,
+                resize=[resize_mode, resize_value, image_quality],
+                images=[tensor_fingerprint(img) for img in images] if isinstance(images, list) else tensor_fingerprint(images),
+            )
+            cached = PersistentResponseCache.shared().get(cache_key)
+            if cached is not None:
+                return cached
+        
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
@@ -226,25 +256,41 @@ class TwoRoundVLMPrompter:
             top_p=top_p
         )
         
-        return response.get('content', '')
+        content = response.get('content', '')
+        if cache_key and content and "error" not in response:
+            PersistentResponseCache.shared().set(cache_key, content)
+        return content
     
     def _process_batch_round1(self, context, images, system_prompt, user_prompt,
                              max_tokens, temperature, top_p, resize_mode,
-                             resize_value, image_quality, debug_mode):
+                             resize_value, image_quality, debug_mode, persistent_cache=False):
         """Process multiple images in Round 1"""
         responses = []
         for i, image in enumerate(images):
             response = self._process_single_round1(
                 context, [image], system_prompt, user_prompt,
                 max_tokens, temperature, top_p, resize_mode,
-                resize_value, image_quality, debug_mode
+                resize_value, image_quality, debug_mode,
+                persistent_cache=persistent_cache
             )
             responses.append(f"Image {i+1}:\n{response}")
         return responses
     
     def _process_round2(self, context, system_prompt, user_prompt,
-                       max_tokens, temperature, top_p, debug_mode):
+                       max_tokens, temperature, top_p, debug_mode, persistent_cache=False):
         """Process Round 2 text-only rewriting"""
+        cache_key = None
+        if persistent_cache:
+            cache_key = make_cache_key(
+                "TwoRoundVLMPrompter:round2",
+                **self._provider_key_fields(context),
+                system=system_prompt, user=user_prompt,
+                max_tokens=max_tokens, temperature=temperature, top_p=top_p,
+            )
+            cached = PersistentResponseCache.shared().get(cache_key)
+            if cached is not None:
+                return cached
+        
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
@@ -258,7 +304,10 @@ class TwoRoundVLMPrompter:
             top_p=top_p
         )
         
-        return response.get('content', '')
+        content = response.get('content', '')
+        if cache_key and content and "error" not in response:
+            PersistentResponseCache.shared().set(cache_key, content)
+        return content
     
     def _apply_template(self, template, prompt):
         """Apply template variables to prompt"""
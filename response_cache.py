@@ -0,0 +1,340 @@
+# In shrug-prompter/response_cache.py
+"""
+Response caches shared by prompter-style nodes.
+
+LRUCache is the in-memory cache each node instance keeps. PersistentResponseCache
+stores responses in a small SQLite database in the user directory, so re-running
+a workflow after a crash or restart doesn't re-pay inference for requests that
+already completed.
+"""
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    from api.json_codec import canonical_dumps, dumps, loads
+except ImportError:
+    from .api.json_codec import canonical_dumps, dumps, loads
+
+
+def _default_cache_dir():
+    """SHRUG_CACHE_DIR, else ComfyUI's user directory, else ~/.cache/shrug-prompter"""
+    env_dir = os.environ.get("SHRUG_CACHE_DIR")
+    if env_dir:
+        return env_dir
+    try:
+        import folder_paths  # Only available inside ComfyUI
+        return os.path.join(folder_paths.get_user_directory(), "shrug-prompter")
+    except (ImportError, AttributeError):
+        return os.path.join(os.path.expanduser("~"), ".cache", "shrug-prompter")
+
+
+def make_cache_key(namespace: str, **parts) -> str:
+    """Build a stable cache key from a node namespace and JSON-serializable parts"""
+    return f"{namespace}:{hashlib.sha256(canonical_dumps(parts)).hexdigest()}"
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a cached value in bytes"""
+    # Tensors and numpy arrays: count the data buffer, not the Python wrapper
+    if hasattr(value, "element_size") and hasattr(value, "nelement"):
+        return value.element_size() * value.nelement()
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value) if value.isascii() else len(value.encode("utf-8", "surrogatepass"))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache bounded by entry count and/or total bytes.
+
+    Hits move the entry to the back, and eviction drops the least recently used
+    entry first until both budgets are met. Sizes come from estimate_size, so
+    large multi-image responses and embedding tensors count for what they weigh.
+    A budget of 0 means unlimited.
+    """
+
+    def __init__(self, max_entries: int = 0, max_bytes: int = 0, name: str = "cache"):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.name = name
+        self._data = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the value and mark it most recently used; counts a hit or miss"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        """Insert or replace a value, then evict down to budget"""
+        size = estimate_size(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if self.max_bytes and size > self.max_bytes:
+                # Would evict everything else and still not fit
+                return
+            self._data[key] = (value, size)
+            self._bytes += size
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop least recently used entries until within budget; returns the count removed"""
+        removed = 0
+        with self._lock:
+            while self._data and (
+                (self.max_entries and len(self._data) > self.max_entries)
+                or (self.max_bytes and self._bytes > self.max_bytes)
+            ):
+                _, (_, size) = self._data.popitem(last=False)
+                self._bytes -= size
+                removed += 1
+            self.evictions += removed
+        return removed
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def clear(self):
+        """Remove everything and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def __contains__(self, key):
+        # Membership checks don't count as hits and don't touch recency
+        return key in self._data
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> Dict:
+        """Counters and usage for debugging"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def summary(self) -> str:
+        """One-line human readable version of stats()"""
+        st = self.stats()
+        budget = f"/{st['max_bytes'] / 1024**2:.1f}MB" if st["max_bytes"] else ""
+        return (f"{st['entries']} entries, {st['bytes'] / 1024**2:.2f}MB{budget}, "
+                f"hits {st['hits']}, misses {st['misses']}, evictions {st['evictions']}")
+
+
+class PersistentResponseCache:
+    """
+    SQLite-backed cache with a byte-size budget, TTL expiry and LRU eviction.
+
+    Uses WAL journaling with one connection per thread, so concurrent readers
+    (batch threads, several nodes, several ComfyUI processes) don't block each other.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        conn.commit()
+
+    @classmethod
+    def shared(cls, path: Optional[str] = None) -> "PersistentResponseCache":
+        """Process-wide instance per database path, configured from the environment"""
+        path = path or os.path.join(_default_cache_dir(), "response_cache.sqlite3")
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(
+                    path,
+                    max_bytes=int(float(os.environ.get("SHRUG_CACHE_MAX_MB", "512")) * 1024 * 1024),
+                    ttl_seconds=float(os.environ.get("SHRUG_CACHE_TTL", str(7 * 24 * 3600))),
+                )
+            return cls._instances[path]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None:
+                self._misses += 1
+                return None
+            if self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds:
+                with self._write_lock:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                self._misses += 1
+                return None
+            with self._write_lock:
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                conn.commit()
+            self._hits += 1
+            return loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            print(f"[Shrug-Prompter] Persistent cache read failed: {e}")
+            self._misses += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serializable value, then enforce TTL and the byte budget"""
+        try:
+            blob = dumps(value)
+        except (TypeError, ValueError) as e:
+            print(f"[Shrug-Prompter] Persistent cache skipped unserializable value: {e}")
+            return
+        if self.max_bytes > 0 and len(blob) > self.max_bytes:
+            return
+
+        now = time.time()
+        try:
+            conn = self._conn()
+            with self._write_lock:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created, last_access) VALUES (?, ?, ?, ?, ?)",
+                    (key, blob, len(blob), now, now),
+                )
+                if self.ttl_seconds > 0:
+                    self._evictions += conn.execute(
+                        "DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)
+                    ).rowcount
+                self._enforce_budget(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"[Shrug-Prompter] Persistent cache write failed: {e}")
+
+    def _enforce_budget(self, conn: sqlite3.Connection):
+        # Called with the write lock held; drops least recently used rows until under budget
+        if self.max_bytes <= 0:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self._evictions += len(doomed)
+
+    def delete(self, key: str):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            conn.commit()
+
+    def clear(self):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+        self._hits = self._misses = self._evictions = 0
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict:
+        """Counters and usage for debugging"""
+        entries, total = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+        }
@@ -1,4 +1,8 @@
 # In shrug-prompter/shrug_router.py
+import asyncio
+import os
+import time
+
 try:
     # Try relative import first (for ComfyUI)
     try:
@@ -28,9 +32,108 @@ except ImportError:
             except ImportError:
                 from api.openai_api import send_request_openai
 
+# Async transport is optional: without aiohttp, send_request_async runs the sync client in a thread
+try:
+    try:
+        from .api.openai_api_async import send_request_openai_async
+    except ImportError:
+        from api.openai_api_async import send_request_openai_async
+except ImportError:
+    send_request_openai_async = None
+
+try:
+    from .api.event_loop import BackgroundLoop
+except ImportError:
+    from api.event_loop import BackgroundLoop
+
+try:
+    from .api.single_flight import SingleFlight, request_fingerprint
+except ImportError:
+    from api.single_flight import SingleFlight, request_fingerprint
+
+try:
+    from .api.load_balancer import EndpointPool
+except ImportError:
+    from api.load_balancer import EndpointPool
+
+try:
+    from .api.retry_policy import RetryPolicy
+except ImportError:
+    from api.retry_policy import RetryPolicy
+
+# The transports import api.circuit_breaker by absolute name; use the same module so
+# endpoint_stats() sees their breakers
+try:
+    from api.circuit_breaker import CircuitBreaker
+except ImportError:
+    from .api.circuit_breaker import CircuitBreaker
+
+# Same module as tools/replay.py, which turns recording off while it replays
+try:
+    from api.request_recorder import RequestRecorder
+except ImportError:
+    from .api.request_recorder import RequestRecorder
+
+# Transient failures are retried with backoff (per-request opt-out: retry=False)
+_retry_policy = RetryPolicy.from_env()
+
+# Identical requests in flight at the same time share one call (per-request opt-out: coalesce=False)
+COALESCE_REQUESTS = os.environ.get("SHRUG_COALESCE", "true").lower() in ("1", "true", "yes")
+_single_flight = SingleFlight()
+
 # As new providers are added, their API modules will be imported here.
 # e.g., from .api.gemini_api import send_request_gemini
 
+def _is_endpoint_failure(response):
+    # Connection errors, timeouts, 5xx, 429 and open circuits count against the endpoint;
+    # other 4xx are the request's fault
+    error = response.get("error") if isinstance(response, dict) else None
+    if error and error.get("type") == "circuit_open":
+        return True
+    if not error or error.get("type") != "request_error":
+        return False
+    status = error.get("status_code")
+    return status is None or status >= 500 or status == 429
+
+def _send_balanced(endpoint_pool, kwargs):
+    """Send through an EndpointPool (or endpoint_pool config dict), choosing base_url per request"""
+    pool = EndpointPool.from_config(endpoint_pool)
+    with pool.lease() as lease:
+        response = send_request_openai(**dict(kwargs, base_url=lease["url"]))
+        lease["success"] = not _is_endpoint_failure(response)
+    return response
+
+async def _send_balanced_async(endpoint_pool, kwargs, send):
+    pool = EndpointPool.from_config(endpoint_pool)
+    # Poll instead of blocking the event loop while every endpoint is at its cap
+    url = pool.try_acquire()
+    while url is None:
+        await asyncio.sleep(0.01)
+        url = pool.try_acquire()
+    start = time.perf_counter()
+    success = False
+    try:
+        response = await send(dict(kwargs, base_url=url))
+        success = not _is_endpoint_failure(response)
+        return response
+    finally:
+        pool.release(url, success, time.perf_counter() - start)
+
+def _is_idempotent(kwargs):
+    # Timed-out requests are only re-sent when the caller opts in: a generation that ran
+    # into the timeout will most likely time out again. Never for streams, whose
+    # callbacks would see deltas twice
+    idempotent = kwargs.pop('idempotent', False)
+    return bool(idempotent) and kwargs.get('stop_condition') is None and kwargs.get('on_delta') is None
+
+def _hedge_target(endpoint_pool, attempt):
+    # Hedging only makes sense when there is another server to send the copy to
+    if endpoint_pool and len(EndpointPool.from_config(endpoint_pool).urls) > 1:
+        return attempt
+    return None
+
+REQUIRED_PARAMS = ['messages', 'api_key', 'base_url', 'llm_model', 'max_tokens', 'temperature', 'top_p']
+
 def send_request(provider: str, **kwargs):
     """
     Routes the request to the correct provider-specific API module based on the
@@ -39,7 +142,15 @@ def send_request(provider: str, **kwargs):
     Args:
         provider (str): The name of the LLM provider (e.g., "openai").
         **kwargs: A dictionary of arguments to be passed to the provider's
-                  request function.
+                  request function. Router-level options:
+                  endpoint_pool - EndpointPool or config dict; base_url is then
+                  picked from the pool for each request.
+                  coalesce - share identical in-flight requests (default on).
+                  retry - retry transient failures per RetryPolicy (default on).
+                  idempotent - True to also re-send a request whose response
+                  timed out (off by default; connect timeouts are always retried).
+                  With SHRUG_RECORD_REQUESTS set, each call is appended to that
+                  file for tools/replay.py (see api/request_recorder.py).
 
     Returns:
         The JSON response from the specified API provider.
@@ -50,15 +161,34 @@ def send_request(provider: str, **kwargs):
     if provider_lower == "openai":
         # Remove 'provider' key as it's for routing only
         kwargs.pop('provider', None)
+        coalesce = kwargs.pop('coalesce', COALESCE_REQUESTS)
+        retry = kwargs.pop('retry', True)
+        idempotent = _is_idempotent(kwargs)
 
         # Ensure required parameters are present
-        required_params = ['messages', 'api_key', 'base_url', 'llm_model', 'max_tokens', 'temperature', 'top_p']
-        missing_params = [param for param in required_params if param not in kwargs]
+        missing_params = [param for param in REQUIRED_PARAMS if param not in kwargs]
 
         if missing_params:
             return {"error": {"message": f"Missing required parameters: {missing_params}"}}
 
-        return send_request_openai(**kwargs)
+        endpoint_pool = kwargs.pop('endpoint_pool', None)
+
+        def attempt():
+            if endpoint_pool:
+                return _send_balanced(endpoint_pool, kwargs)
+            return send_request_openai(**kwargs)
+
+        def call():
+            if not retry:
+                return attempt()
+            return _retry_policy.run(attempt, _hedge_target(endpoint_pool, attempt), idempotent)
+
+        key = request_fingerprint(provider_lower, dict(kwargs, endpoint_pool=endpoint_pool)) if coalesce else None
+        start = time.perf_counter()
+        response = call() if key is None else _single_flight.do(key, call)
+        if RequestRecorder.path:
+            RequestRecorder.record(provider_lower, kwargs, response, time.perf_counter() - start)
+        return response
 
     # Example of future expansion:
     # elif provider_lower == "gemini":
@@ -67,3 +197,99 @@ def send_request(provider: str, **kwargs):
 
     else:
         return {"error": {"message": f"Provider '{provider}' is not supported in the router."}}
+
+
+async def send_request_async(provider: str, **kwargs):
+    """
+    Async counterpart of send_request, for use inside an event loop.
+
+    Takes the same arguments and returns the same response/error dicts.
+    """
+    provider_lower = provider.lower()
+
+    if provider_lower == "openai":
+        kwargs.pop('provider', None)
+        coalesce = kwargs.pop('coalesce', COALESCE_REQUESTS)
+        retry = kwargs.pop('retry', True)
+        idempotent = _is_idempotent(kwargs)
+
+        missing_params = [param for param in REQUIRED_PARAMS if param not in kwargs]
+        if missing_params:
+            return {"error": {"message": f"Missing required parameters: {missing_params}"}}
+
+        endpoint_pool = kwargs.pop('endpoint_pool', None)
+
+        async def send(request_kwargs):
+            if send_request_openai_async is None:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, lambda: send_request_openai(**request_kwargs))
+            return await send_request_openai_async(**request_kwargs)
+
+        async def attempt():
+            if endpoint_pool:
+                return await _send_balanced_async(endpoint_pool, kwargs, send)
+            return await send(kwargs)
+
+        async def call():
+            if not retry:
+                return await attempt()
+            return await _retry_policy.run_async(attempt, _hedge_target(endpoint_pool, attempt), idempotent)
+
+        key = request_fingerprint(provider_lower, dict(kwargs, endpoint_pool=endpoint_pool)) if coalesce else None
+        start = time.perf_counter()
+        response = await call() if key is None else await _single_flight.do_async(key, call)
+        if RequestRecorder.path:
+            RequestRecorder.record(provider_lower, kwargs, response, time.perf_counter() - start)
+        return response
+
+    else:
+        return {"error": {"message": f"Provider '{provider}' is not supported in the router."}}
+
+
+def send_requests(requests_kwargs, max_concurrency: int = 64, timeout=None):
+    """
+    Send many requests concurrently from synchronous code.
+
+    Runs them on a private background event loop (never ComfyUI's own loop), with
+    at most max_concurrency in flight. Each item is a kwargs dict for send_request,
+    including 'provider'.
+
+    Returns:
+        List of response/error dicts in the same order as requests_kwargs
+    """
+    requests_kwargs = list(requests_kwargs)
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run_one(kwargs):
+            async with semaphore:
+                return await send_request_async(**dict(kwargs))
+
+        results = await asyncio.gather(*(run_one(kw) for kw in requests_kwargs), return_exceptions=True)
+        return [
+            {"error": {"message": str(r), "type": "unknown_error"}} if isinstance(r, BaseException) else r
+            for r in results
+        ]
+
+    if not requests_kwargs:
+        return []
+    return BackgroundLoop.run(run_all(), timeout)
+
+
+def coalescing_stats():
+    """How many requests were sent vs. shared with an identical in-flight request"""
+    return _single_flight.stats()
+
+
+def retry_stats():
+    """Retry, retry-budget and hedging counters"""
+    return _retry_policy.stats()
+
+
+def endpoint_stats():
+    """Circuit breaker state per server and per-endpoint load balancer counters"""
+    return {
+        "breakers": CircuitBreaker.all_states(),
+        "pools": [{"pool": repr(pool), "endpoints": pool.stats()} for pool in EndpointPool.all_pools()],
+    }
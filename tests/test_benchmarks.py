@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Tests for the benchmark harness (benchmarks/harness.py).
+Run with pytest or directly: python tests/test_benchmarks.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import compare, measure
+
+
+def _run(**medians):
+    return {"meta": {}, "results": {name: {"median": value} for name, value in medians.items()}}
+
+
+def test_measure_reports_per_call_time():
+    calls = []
+    stats = measure(lambda: calls.append(1), repeat=3, warmup=2, number=10)
+    assert len(calls) == 32
+    assert stats["min"] <= stats["median"] <= stats["max"]
+    print("✓ measure")
+
+
+def test_compare_flags_regressions():
+    report = compare(_run(a=1.0, b=1.0, c=1.0, gone=1.0), _run(a=1.2, b=0.5, c=1.05, new=1.0), threshold=0.1)
+    status = {row["name"]: row["status"] for row in report["rows"]}
+    assert status == {"a": "regressed", "b": "improved", "c": "unchanged", "gone": "removed", "new": "added"}
+    assert report["regressions"] == ["a"]
+    print("✓ compare")
+
+
+if __name__ == "__main__":
+    test_measure_reports_per_call_time()
+    test_compare_flags_regressions()
+    print("✅ Benchmark harness tests passed!")
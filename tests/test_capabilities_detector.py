@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for CapabilityDetector caching.
+Run with pytest or directly: python tests/test_capabilities_detector.py
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.capabilities_detector import CapabilityDetector
+from api.session_pool import SessionPool
+from tools.mock_server import MockServer
+
+URL = "http://caps-test:8080"
+MULTIPART = {"recommendations": {"vision_models": {"use_multipart": True}}}
+
+
+def _fake_probe(results):
+    calls = []
+    done = threading.Event()
+
+    def probe(base_url):
+        calls.append(base_url)
+        capabilities = results.pop(0)
+        CapabilityDetector._cache[base_url] = (capabilities, time.monotonic() + 60)
+        done.set()
+        return capabilities
+
+    return probe, calls, done
+
+
+def test_negative_result_expires_and_refreshes_in_background():
+    original = CapabilityDetector._probe
+    probe, calls, done = _fake_probe([None, MULTIPART])
+    CapabilityDetector._probe = probe
+    try:
+        CapabilityDetector.invalidate(URL)
+        assert not CapabilityDetector.should_use_multipart(URL)  # First contact: server down
+        assert len(calls) == 1
+
+        # Expired entry: the stale value is served while a re-probe runs in the background
+        CapabilityDetector._cache[URL] = (None, time.monotonic() - 1)
+        done.clear()
+        assert not CapabilityDetector.should_use_multipart(URL)
+        assert done.wait(2)
+        assert CapabilityDetector.should_use_multipart(URL)
+        assert len(calls) == 2
+    finally:
+        CapabilityDetector._probe = original
+        CapabilityDetector.invalidate(URL)
+    print("✓ Negative TTL and background refresh")
+
+
+def test_invalidate_forces_reprobe():
+    original = CapabilityDetector._probe
+    probe, calls, _ = _fake_probe([MULTIPART, None])
+    CapabilityDetector._probe = probe
+    try:
+        CapabilityDetector.invalidate(URL)
+        assert CapabilityDetector.should_use_multipart(URL)
+        assert CapabilityDetector.should_use_multipart(URL)
+        assert len(calls) == 1
+        CapabilityDetector.invalidate(URL)
+        assert not CapabilityDetector.should_use_multipart(URL)
+        assert len(calls) == 2
+    finally:
+        CapabilityDetector._probe = original
+        CapabilityDetector.invalidate(URL)
+    print("✓ Invalidation")
+
+
+def test_snapshot_round_trip():
+    path = os.path.join(tempfile.mkdtemp(), "capabilities.json")
+    CapabilityDetector._snapshot[URL] = {"capabilities": MULTIPART, "etag": '"abc"', "version": "1.0"}
+    CapabilityDetector.save_snapshot(path)
+
+    # A fresh process: nothing cached, snapshot loaded at import
+    CapabilityDetector.invalidate(URL)
+    CapabilityDetector._snapshot.pop(URL)
+    CapabilityDetector.load_snapshot(path)
+    refreshed = []
+    original = CapabilityDetector._refresh_in_background
+    CapabilityDetector._refresh_in_background = lambda base_url: refreshed.append(base_url)
+    try:
+        assert CapabilityDetector.should_use_multipart(URL)  # No synchronous probe
+        assert refreshed == [URL]  # Revalidated in the background
+        assert CapabilityDetector._snapshot[URL]["etag"] == '"abc"'
+    finally:
+        CapabilityDetector._refresh_in_background = original
+        CapabilityDetector.invalidate(URL)
+        CapabilityDetector._snapshot.pop(URL, None)
+    print("✓ Persisted snapshot")
+
+
+def test_failed_refresh_keeps_known_capabilities():
+    server = MockServer(multipart=True).start()
+    base_url = server.base_url
+    try:
+        CapabilityDetector.invalidate(base_url)
+        assert CapabilityDetector.should_use_multipart(base_url)
+
+        # The server goes away (and its kept-alive connection with it); the re-probe
+        # fails but multipart stays on
+        server.stop()
+        SessionPool.close_all()
+        assert CapabilityDetector._probe(base_url) is not None
+        expires_at = CapabilityDetector._cache[base_url][1]
+        assert CapabilityDetector.should_use_multipart(base_url)
+        assert expires_at <= time.monotonic() + CapabilityDetector.negative_ttl  # Re-checked soon
+    finally:
+        server.stop()
+        # Don't leave the throwaway port in the persisted capabilities snapshot
+        CapabilityDetector.invalidate(base_url)
+        if CapabilityDetector._snapshot.pop(base_url, None):
+            CapabilityDetector.save_snapshot()
+    print("✓ Failed refresh keeps known capabilities")
+
+
+if __name__ == "__main__":
+    test_negative_result_expires_and_refreshes_in_background()
+    test_invalidate_forces_reprobe()
+    test_snapshot_round_trip()
+    test_failed_refresh_keeps_known_capabilities()
+    print("✅ Capability detector tests passed!")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Tests for checkpoint.py and the captioning CLI built on it (tools/caption.py).
+Run with pytest or directly: python tests/test_checkpoint.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from checkpoint import CheckpointJournal
+
+
+def test_journal_survives_a_torn_line():
+    path = os.path.join(tempfile.mkdtemp(), "run.checkpoint.jsonl")
+    with CheckpointJournal(path) as journal:
+        journal.record("a", {"caption": "first"})
+        journal.record("b", {"caption": "second"})
+    with open(path, "ab") as f:
+        f.write(b'{"key": "c", "val')  # Crash mid-write
+
+    journal = CheckpointJournal(path)
+    assert journal.corrupt_lines == 1
+    assert "a" in journal and "c" not in journal
+    journal.record("c", {"caption": "third"})
+    journal.close()
+    assert CheckpointJournal(path).get("c") == {"caption": "third"}
+    print("✓ Journal reload after crash")
+
+
+def test_captioner_resumes_and_isolates_failures():
+    from tools.caption import Captioner, find_images, run
+    from tools.mock_server import MockServer
+    from api.capabilities_detector import CapabilityDetector
+
+    root = tempfile.mkdtemp()
+    for i in range(4):
+        Image.fromarray((np.random.rand(64, 80, 3) * 255).astype("uint8")).save(os.path.join(root, f"{i}.jpg"))
+    with open(os.path.join(root, "broken.png"), "wb") as f:
+        f.write(b"not an image")
+    paths = find_images([root])
+    assert len(paths) == 5
+
+    journal_path = os.path.join(root, "captions.checkpoint.jsonl")
+    settings = {"system_prompt": "s", "user_prompt": "u", "max_tokens": 8, "temperature": 0.5, "top_p": 0.9}
+    with MockServer(latency="fixed:0", multipart=False) as server:
+        config = {"provider": "openai", "base_url": server.base_url, "api_key": "x", "llm_model": "m"}
+        captioner = Captioner(config, settings, CheckpointJournal(journal_path), sidecar=True, resize=64)
+        summary = run(captioner, paths, concurrency=2)
+        assert (summary["captioned"], summary["failed"]) == (4, 1)
+        assert os.path.exists(os.path.join(root, "0.txt"))
+
+        # A fresh run skips finished files, retries the failure, and redoes files with new settings
+        captioner = Captioner(config, settings, CheckpointJournal(journal_path), resize=64)
+        assert [os.path.basename(p) for p in paths if not captioner.is_finished(p)] == ["broken.png"]
+        changed = Captioner(config, dict(settings, user_prompt="other"), CheckpointJournal(journal_path), resize=64)
+        assert not any(changed.is_finished(p) for p in paths)
+        CapabilityDetector.invalidate(server.base_url)
+        if CapabilityDetector._snapshot.pop(server.base_url, None):
+            CapabilityDetector.save_snapshot()
+    print("✓ Captioner resume and error isolation")
+
+
+def test_prompter_batch_resumes_from_checkpoint():
+    import torch
+    import nodes.prompter as prompter_module
+    from checkpoint import checkpoint_dir
+    from tools.mock_server import MockServer
+
+    previous_cache_dir = os.environ.get("SHRUG_CACHE_DIR")
+    os.environ["SHRUG_CACHE_DIR"] = tempfile.mkdtemp()
+    send_request = prompter_module.send_request
+    sent = []
+
+    def fail_after_four(**kwargs):
+        sent.append(1)
+        return send_request(**kwargs) if len(sent) <= 4 else {"error": {"message": "server went away"}}
+
+    args = dict(system_prompt="s", user_prompt="u", max_tokens=8, temperature=0.5, top_p=0.9,
+                images=torch.rand(6, 32, 32, 3), batch_mode=True, max_concurrency=1, checkpoint=True)
+    try:
+        with MockServer(latency="fixed:0", multipart=False) as server:
+            context = {"provider_config": {"provider": "openai", "base_url": server.base_url, "api_key": "x", "llm_model": "m"}}
+            prompter_module.send_request = fail_after_four
+            first = prompter_module.ShrugPrompter().execute_prompt(context=dict(context), **args)
+            assert sum(text.startswith("Error") for text in first[1]) == 2
+            assert len(os.listdir(checkpoint_dir())) == 1  # Kept for the rerun
+
+            prompter_module.send_request = send_request
+            before = server.stats()["requests"]["/v1/chat/completions"]
+            second = prompter_module.ShrugPrompter().execute_prompt(context=dict(context), **args)
+            assert server.stats()["requests"]["/v1/chat/completions"] - before == 2  # Only the unfinished images
+            assert second[3] == 6 and not any(text.startswith("Error") for text in second[1])
+            assert os.listdir(checkpoint_dir()) == []  # Removed once everything finished
+    finally:
+        prompter_module.send_request = send_request
+        if previous_cache_dir is None:
+            os.environ.pop("SHRUG_CACHE_DIR", None)
+        else:
+            os.environ["SHRUG_CACHE_DIR"] = previous_cache_dir
+    print("✓ Prompter batch checkpoint")
+
+
+if __name__ == "__main__":
+    test_journal_survives_a_torn_line()
+    test_captioner_resumes_and_isolates_failures()
+    test_prompter_batch_resumes_from_checkpoint()
+    print("✅ Checkpoint tests passed!")
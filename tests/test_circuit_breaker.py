@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for api/circuit_breaker.py.
+Run with pytest or directly: python tests/test_circuit_breaker.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.circuit_breaker import CircuitBreaker, CLOSED, OPEN
+
+
+def _breaker(probe_result=True):
+    probes = []
+    breaker = CircuitBreaker("http://gpu:8080", probe=lambda key: probes.append(key) or probe_result)
+    breaker.failure_threshold = 3
+    breaker.reset_timeout = 60
+    return breaker, probes
+
+
+def _error(**fields):
+    return {"error": dict({"message": "failed", "type": "request_error"}, **fields)}
+
+
+def test_opens_after_consecutive_server_failures():
+    breaker, _ = _breaker()
+    breaker.record(_error(reason="connection"))
+    breaker.record(_error(status_code=503))
+    breaker.record({"choices": []})  # Success resets the streak
+    breaker.record(_error(status_code=404))  # Client errors don't count
+    assert breaker.state == CLOSED
+
+    for _ in range(3):
+        breaker.record(_error(reason="timeout"))
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.open_error()["error"]["type"] == "circuit_open"
+    print("✓ Opens after failures and fails fast")
+
+
+def test_probe_closes_or_reopens():
+    breaker, probes = _breaker(probe_result=False)
+    for _ in range(3):
+        breaker.record_failure("down")
+    breaker.opened_at = time.monotonic() - 61
+    assert not breaker.allow() and breaker.state == OPEN
+    assert len(probes) == 1
+    assert not breaker.allow()  # Reset timeout restarted, no second probe yet
+    assert len(probes) == 1
+
+    breaker._probe = lambda key: True
+    breaker.opened_at = time.monotonic() - 61
+    assert breaker.allow() and breaker.state == CLOSED
+    print("✓ Half-open probe")
+
+
+if __name__ == "__main__":
+    test_opens_after_consecutive_server_failures()
+    test_probe_closes_or_reopens()
+    print("✅ Circuit breaker tests passed!")
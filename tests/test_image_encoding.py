@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Tests for the tensor-to-image encoding helpers in utils.py.
+Run with pytest or directly: python tests/test_image_encoding.py
+"""
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+from PIL import Image
+
+from utils import iter_encoded_images, tensors_to_base64_list, tensors_to_raw_bytes_list, tensor_batch_to_uint8
+
+
+def test_rgba_batch_encodes_the_same_in_batch_and_single_paths():
+    torch.manual_seed(0)
+    batch = torch.rand(3, 24, 32, 4)
+
+    # Batch mode streams frames; the single-request path encodes the whole batch
+    streamed = list(iter_encoded_images(batch, quality=85, prefetch=2, preserve_alpha=True))
+    assert streamed == tensors_to_raw_bytes_list(batch, quality=85, preserve_alpha=True)
+    streamed_b64 = list(iter_encoded_images(batch, quality=85, as_base64=True, prefetch=2, preserve_alpha=True))
+    assert streamed_b64 == tensors_to_base64_list(batch, max_size=None, quality=85, preserve_alpha=True)
+
+    expected_alpha = tensor_batch_to_uint8(batch)[..., 3]
+    for (img_bytes, mime_type), alpha in zip(streamed, expected_alpha):
+        assert mime_type == "image/png"
+        image = Image.open(io.BytesIO(img_bytes))
+        assert image.mode == "RGBA"
+        assert np.array_equal(np.asarray(image)[..., 3], alpha)
+    print("✓ RGBA batch keeps alpha in both paths")
+
+
+if __name__ == "__main__":
+    test_rgba_batch_encodes_the_same_in_batch_and_single_paths()
+    print("✅ Image encoding tests passed!")
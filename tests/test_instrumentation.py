@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for instrumentation.py.
+Run with pytest or directly: python tests/test_instrumentation.py
+"""
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instrumentation import Instrumentation, Trace, span, record_request, run_in_context
+
+
+def test_spans_follow_the_active_trace():
+    with span("encode"):
+        pass  # No active trace: nothing recorded, no error
+
+    trace = Trace("TestNode")
+    with trace.activate():
+        with span("encode"):
+            pass
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(run_in_context(record_request), network=0.25, payload_bytes=100) for _ in range(3)]
+            for future in futures:
+                future.result()
+    summary = trace.finish()
+
+    assert summary["stages"]["encode"]["count"] == 1
+    assert summary["stages"]["network"] == {"total": 0.75, "count": 3}
+    assert summary["requests"] == 3 and summary["payload_bytes"] == 300
+    assert summary["bound"] == "server"
+    histograms = json.loads(trace.report())["histograms"]
+    assert histograms["network"]["p50"] == 0.25
+    Instrumentation.reset("TestNode")
+    print("✓ Spans and request records")
+
+
+def test_jsonl_log():
+    path = os.path.join(tempfile.mkdtemp(), "timing.jsonl")
+    previous, Instrumentation.log_path = Instrumentation.log_path, path
+    try:
+        trace = Trace("TestNode")
+        with trace.activate():
+            record_request(serialize=0.01, network=0.5, payload_bytes=10)
+        trace.finish()
+        records = [json.loads(line) for line in open(path)]
+        assert [r["type"] for r in records] == ["request", "run"]
+        assert records[0]["run_id"] == records[1]["run_id"]
+    finally:
+        Instrumentation.log_path = previous
+        Instrumentation.reset("TestNode")
+    print("✓ JSONL log")
+
+
+if __name__ == "__main__":
+    test_spans_follow_the_active_trace()
+    test_jsonl_log()
+    print("✅ Instrumentation tests passed!")
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests for api/json_codec.py.
+Run with pytest or directly: python tests/test_json_codec.py
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import json_codec
+
+
+def test_round_trip_and_compact_output():
+    value = {"model": "m", "messages": [{"role": "user", "content": "héllo"}], "top_p": 0.9, "stream": False}
+    encoded = json_codec.dumps(value)
+    assert isinstance(encoded, bytes)
+    assert json_codec.loads(encoded) == value
+    assert json_codec.loads(encoded.decode("utf-8")) == value
+    assert encoded == json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    print(f"✓ Round trip ({json_codec.BACKEND})")
+
+
+def test_canonical_dumps_is_order_independent():
+    first = json_codec.canonical_dumps({"b": 1, "a": {"y": 2, "x": object.__name__}, "n": 2 ** 70})
+    second = json_codec.canonical_dumps({"n": 2 ** 70, "a": {"x": "object", "y": 2}, "b": 1})
+    assert first == second
+    assert json_codec.canonical_dumps({"shape": (1, 2), "obj": object()}).startswith(b'{"obj":"<object object')
+    print("✓ Canonical keys")
+
+
+def test_invalid_input_raises_value_error():
+    try:
+        json_codec.loads(b"{not json")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+    print("✓ Invalid JSON")
+
+
+if __name__ == "__main__":
+    test_round_trip_and_compact_output()
+    test_canonical_dumps_is_order_independent()
+    test_invalid_input_raises_value_error()
+    print("✅ JSON codec tests passed!")
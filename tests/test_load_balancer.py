@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for api/load_balancer.py.
+Run with pytest or directly: python tests/test_load_balancer.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.load_balancer import EndpointPool, parse_base_urls
+
+URLS = ["http://a:8080", "http://b:8080", "http://c:8080"]
+
+
+def test_least_outstanding_spreads_load():
+    pool = EndpointPool(URLS, strategy="least_outstanding")
+    leased = [pool.acquire() for _ in range(6)]
+    assert sorted(leased) == sorted(URLS * 2)
+    print("✓ Least outstanding")
+
+
+def test_round_robin_and_cap():
+    pool = EndpointPool(URLS[:2], strategy="round_robin", max_per_endpoint=1)
+    first, second = pool.acquire(), pool.acquire()
+    assert {first, second} == set(URLS[:2])
+    assert pool.try_acquire() is None  # Both at their cap
+    pool.release(first)
+    assert pool.try_acquire() == first
+    print("✓ Round robin with per-endpoint cap")
+
+
+def test_latency_ewma_prefers_fast_endpoint():
+    pool = EndpointPool(URLS[:2], strategy="latency_ewma")
+    pool.release(URLS[0], True, 2.0)
+    pool.release(URLS[1], True, 0.1)
+    # Slow endpoint still scores worse with several requests in flight on the fast one
+    assert all(pool.try_acquire() == URLS[1] for _ in range(5))
+    print("✓ Latency EWMA")
+
+
+def test_ejection_after_failures():
+    pool = EndpointPool(URLS[:2], strategy="round_robin", eject_after=2, eject_seconds=60)
+    for _ in range(2):
+        pool.release(URLS[0], success=False)
+    assert all(pool.try_acquire() == URLS[1] for _ in range(4))
+    assert pool.stats()[0]["ejected_for"] > 0
+
+    # With everything ejected, traffic still goes somewhere
+    for _ in range(2):
+        pool.release(URLS[1], success=False)
+    assert pool.try_acquire() in URLS[:2]
+    print("✓ Ejection")
+
+
+def test_shared_pools_and_url_parsing():
+    urls = parse_base_urls("localhost:8080, http://gpu2:8080/\nhttps://gpu3")
+    assert urls == ["http://localhost:8080", "http://gpu2:8080", "https://gpu3"]
+    config = {"urls": urls, "strategy": "round_robin"}
+    assert EndpointPool.from_config(config) is EndpointPool.from_config(dict(config))
+    print("✓ Pool registry and URL parsing")
+
+
+if __name__ == "__main__":
+    test_least_outstanding_spreads_load()
+    test_round_robin_and_cap()
+    test_latency_ewma_prefers_fast_endpoint()
+    test_ejection_after_failures()
+    test_shared_pools_and_url_parsing()
+    print("✅ Load balancer tests passed!")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for tools/mock_server.py, driven through the real router and transports.
+Run with pytest or directly: python tests/test_mock_server.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from shrug_router import send_request
+from api.capabilities_detector import CapabilityDetector
+from api.circuit_breaker import CircuitBreaker
+from tools.mock_server import MockServer, parse_distribution
+
+
+def _request(server, **extra):
+    return dict(messages=[{"role": "user", "content": "Describe the image"}], api_key="not-required-for-local",
+                base_url=server.base_url, llm_model="mock-vlm", max_tokens=8, temperature=0.7, top_p=0.9,
+                coalesce=False, **extra)
+
+
+def test_chat_streaming_and_multipart():
+    with MockServer(latency="fixed:0", reply="one two three four five six seven eight nine ten", seed=1) as server:
+        result = send_request("openai", **_request(server))
+        assert result["choices"][0]["message"]["content"] == "one two three four five six seven eight"
+        assert result["usage"]["completion_tokens"] == 8
+
+        seen = []
+        result = send_request("openai", **_request(server, stream=True, on_delta=seen.append,
+                                                    stop_condition=lambda text: "four" in text))
+        assert result["choices"][0]["finish_reason"] == "stop_condition"
+        assert "".join(seen) == "one two three four"
+
+        png = b"\x89PNG\r\n\x1a\n" + os.urandom(50_000)
+        CapabilityDetector.invalidate(server.base_url)
+        image = {"type": "image_url", "image_url": {"url": "data:image/png;base64,"}}
+        request = _request(server, raw_images=[png, png])
+        request["messages"] = [{"role": "user", "content": [{"type": "text", "text": "Describe"}, image, image]}]
+        result = send_request("openai", **request)
+        assert result["images_received"] == 2
+        assert server.stats()["requests"]["/v1/chat/completions/multipart"] == 1
+
+        # Don't leave the throwaway port in the persisted capabilities snapshot
+        CapabilityDetector.invalidate(server.base_url)
+        if CapabilityDetector._snapshot.pop(server.base_url, None):
+            CapabilityDetector.save_snapshot()
+    print("✓ Chat, streaming and multipart")
+
+
+def test_embeddings_and_transcriptions():
+    with MockServer(latency="fixed:0", embedding_dim=16) as server:
+        first = requests.post(f"{server.base_url}/v1/embeddings", json={"input": ["a", "b"]}).json()
+        again = requests.post(f"{server.base_url}/v1/embeddings", json={"input": "a"}).json()
+        assert len(first["data"]) == 2 and len(first["data"][0]["embedding"]) == 16
+        assert first["data"][0]["embedding"] == again["data"][0]["embedding"]
+
+        text = requests.post(f"{server.base_url}/v1/audio/transcriptions", files={"file": ("a.wav", b"RIFF....")}).json()
+        assert "transcription" in text["text"]
+    print("✓ Embeddings and transcriptions")
+
+
+def test_error_injection():
+    with MockServer(latency="fixed:0", error_rate=1.0, error_status=503, retry_after=0) as server:
+        result = send_request("openai", **_request(server, retry=False))
+        assert result["error"]["status_code"] == 503
+        assert result["error"]["retry_after"] == "0"
+        assert server.stats()["errors_injected"] == 1
+        CircuitBreaker.reset(server.base_url)
+    print("✓ Error injection")
+
+
+def test_latency_distributions_are_reproducible():
+    import random
+    draws = [parse_distribution("lognormal:0.2,0.5", random.Random(7)) for _ in range(2)]
+    assert [draws[0]() for _ in range(5)] == [draws[1]() for _ in range(5)]
+    assert parse_distribution("fixed:0.1", random.Random())() == 0.1
+    try:
+        parse_distribution("gamma:1", random.Random())
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("✓ Latency distributions")
+
+
+if __name__ == "__main__":
+    test_chat_streaming_and_multipart()
+    test_embeddings_and_transcriptions()
+    test_error_injection()
+    test_latency_distributions_are_reproducible()
+    print("✅ Mock server tests passed!")
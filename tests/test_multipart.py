@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for api/multipart.py.
+Run with pytest or directly: python tests/test_multipart.py
+"""
+import os
+import sys
+from email.parser import BytesParser
+from email.policy import HTTP
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.multipart import MultipartEncoder, build_image_form
+
+
+def _parse(encoder):
+    body = b"".join(bytes(chunk) for chunk in encoder)
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {encoder.content_type}\r\n\r\n".encode() + body)
+    return [(part.get_param("name", header="content-disposition"), part.get_filename(),
+             part.get_content_type(), part.get_payload(decode=True)) for part in message.iter_parts()]
+
+
+def test_image_form_round_trip():
+    png = b"\x89PNG\r\n\x1a\n" + os.urandom(100_000)
+    jpeg = b"\xff\xd8\xff" + os.urandom(5_000)
+    encoder = build_image_form("model", "[]", 64, 0.7, 0.9, [png, jpeg], {"preserve_alpha": True})
+    parts = _parse(encoder)
+
+    assert ("preserve_alpha", None, "text/plain", b"true") in parts
+    assert parts[-2] == ("images", "image_0.png", "image/png", png)
+    assert parts[-1] == ("images", "image_1.jpg", "image/jpeg", jpeg)
+    assert encoder.upload_stats()["bytes"] > len(png) + len(jpeg)
+    print("✓ Image form round trip")
+
+
+def test_parts_are_streamed_without_copies():
+    image = bytearray(os.urandom(10_000))
+    encoder = MultipartEncoder([], [("file", "a.bin", "application/octet-stream", image)], chunk_size=4096)
+    chunks = list(encoder)
+    views = [chunk for chunk in chunks if isinstance(chunk, memoryview)]
+    assert [len(view) for view in views] == [4096, 4096, 1808]
+    assert all(view.obj is image for view in views)  # Slices of the caller's buffer
+
+    generated = MultipartEncoder([], [("file", "b.bin", "application/octet-stream", iter([b"ab", b"cd"]))])
+    assert _parse(generated)[0][3] == b"abcd"
+    print("✓ Streamed parts")
+
+
+if __name__ == "__main__":
+    test_image_form_round_trip()
+    test_parts_are_streamed_without_copies()
+    print("✅ Multipart tests passed!")
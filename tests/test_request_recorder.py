@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for api/request_recorder.py and the router's recording hook.
+Run with pytest or directly: python tests/test_request_recorder.py
+"""
+import base64
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.request_recorder import RequestRecorder, RECORDED_IMAGE, read_records, to_kwargs, to_record
+from api.multipart import guess_image_type
+from shrug_router import send_request
+from tools.mock_server import MockServer
+
+PNG = b"\x89PNG\r\n\x1a\n" + os.urandom(30_000)
+
+
+def _kwargs(base_url="http://gpu:8080"):
+    data_url = "data:image/jpeg;base64," + base64.b64encode(os.urandom(12_000)).decode()
+    return dict(messages=[{"role": "user", "content": [{"type": "text", "text": "Describe"},
+                                                       {"type": "image_url", "image_url": {"url": data_url}}]}],
+                api_key="sk-secret", base_url=base_url, llm_model="vlm", max_tokens=32, temperature=0.7,
+                top_p=0.9, raw_images=[PNG], timeout=60, on_delta=print)
+
+
+def test_record_keeps_shape_not_secrets_or_images():
+    record = to_record("openai", _kwargs())
+    assert "sk-secret" not in str(record) and "on_delta" not in str(record)
+    image = record["messages"][0]["content"][1]["image_url"]
+    assert image == {"url": RECORDED_IMAGE, "mime": "image/jpeg", "bytes": 12_000}
+    assert record["raw_images"] == [{"mime": "image/png", "bytes": len(PNG)}]
+
+    kwargs = to_kwargs(record)
+    assert kwargs["timeout"] == 60 and kwargs["llm_model"] == "vlm"
+    assert kwargs["messages"][0]["content"][1]["image_url"]["url"].startswith("data:image/jpeg;base64,")
+    assert guess_image_type(kwargs["raw_images"][0])[1] == "image/png"
+    assert 0.5 < len(kwargs["raw_images"][0]) / len(PNG) < 2  # Synthetic, but about the same size
+    print("✓ Request shape round trip")
+
+
+def test_router_records_each_call():
+    path = os.path.join(tempfile.mkdtemp(), "recorded.jsonl")
+    RequestRecorder.path = path
+    try:
+        with MockServer(latency="fixed:0", multipart=False) as server:
+            kwargs = _kwargs(server.base_url)
+            del kwargs["raw_images"]
+            send_request("openai", **kwargs)
+            send_request("openai", **dict(kwargs, max_tokens=8, retry=False, base_url="http://127.0.0.1:9"))
+    finally:
+        RequestRecorder.path = None
+    records = list(read_records(path))
+    assert [r["ok"] for r in records] == [True, False]
+    assert records[0]["completion_tokens"] == 32
+    assert records[1]["error"]["reason"] == "connection"
+    print("✓ Router recording hook")
+
+
+if __name__ == "__main__":
+    test_record_keeps_shape_not_secrets_or_images()
+    test_router_records_each_call()
+    print("✅ Request recorder tests passed!")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared response caches in response_cache.py.
+Run with pytest or directly: python tests/test_response_cache.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import LRUCache, PersistentResponseCache, make_cache_key
+
+
+def test_lru_hits_move_to_back():
+    """A read protects an entry from being the next eviction"""
+    cache = LRUCache(max_entries=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+
+    assert "a" in cache and "c" in cache and "b" not in cache
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["evictions"] == 1
+    print("✓ LRU recency ordering")
+
+
+def test_lru_byte_budget():
+    """Large values evict by size, not entry count"""
+    cache = LRUCache(max_bytes=1000)
+    cache.set("small1", b"x" * 100)
+    cache.set("small2", b"x" * 100)
+    cache.set("big", b"x" * 900)
+
+    # Only the oldest entry has to go to get back under budget
+    assert "big" in cache and "small2" in cache
+    assert "small1" not in cache
+    assert cache.total_bytes <= 1000
+
+    cache.set("too_big", b"x" * 5000)
+    assert "too_big" not in cache and "big" in cache
+    print("✓ LRU byte budget")
+
+
+def test_lru_counts_misses_and_clear_resets():
+    cache = LRUCache(max_entries=10)
+    assert cache.get("nope") is None
+    cache["k"] = {"choices": [{"message": {"content": "hello"}}]}
+    assert cache.stats()["misses"] == 1
+    assert cache.total_bytes > 0
+    cache.clear()
+    assert len(cache) == 0 and cache.total_bytes == 0 and cache.stats()["misses"] == 0
+    print("✓ LRU counters")
+
+
+def _temp_cache(**kwargs):
+    path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    return PersistentResponseCache(path, **kwargs)
+
+
+def test_persistent_roundtrip():
+    """Values survive a new cache instance on the same file"""
+    cache = _temp_cache()
+    response = {"choices": [{"message": {"content": "a cat on a sofa"}}]}
+    cache.set("ShrugPrompter:abc", response)
+
+    reopened = PersistentResponseCache(cache.path)
+    assert reopened.get("ShrugPrompter:abc") == response
+    assert reopened.get("ShrugPrompter:missing") is None
+    print("✓ Persistent cache round trip")
+
+
+def test_persistent_ttl_expiry():
+    cache = _temp_cache(ttl_seconds=0.05)
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert len(cache) == 0
+    print("✓ Persistent cache TTL expiry")
+
+
+def test_persistent_byte_budget_evicts_lru():
+    """The least recently read entry is evicted first once over budget"""
+    cache = _temp_cache(max_bytes=250)
+    cache.set("a", "x" * 100)
+    time.sleep(0.01)
+    cache.set("b", "y" * 100)
+    time.sleep(0.01)
+    assert cache.get("a") is not None  # a is now more recent than b
+    time.sleep(0.01)
+    cache.set("c", "z" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["bytes"] <= 250
+    print("✓ Persistent cache byte budget")
+
+
+def test_make_cache_key_is_stable():
+    key1 = make_cache_key("VLMPrompter", system="s", params={"b": 1, "a": 2})
+    key2 = make_cache_key("VLMPrompter", params={"a": 2, "b": 1}, system="s")
+    assert key1 == key2
+    assert key1.startswith("VLMPrompter:")
+    assert make_cache_key("AdvancedVLMSampler", system="s", params={"b": 1, "a": 2}) != key1
+    print("✓ Cache keys are stable and namespaced")
+
+
+if __name__ == "__main__":
+    test_lru_hits_move_to_back()
+    test_lru_byte_budget()
+    test_lru_counts_misses_and_clear_resets()
+    test_persistent_roundtrip()
+    test_persistent_ttl_expiry()
+    test_persistent_byte_budget_evicts_lru()
+    test_make_cache_key_is_stable()
+    print("✅ Response cache tests passed!")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for api/retry_policy.py.
+Run with pytest or directly: python tests/test_retry_policy.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+
+from api.retry_policy import RetryPolicy, parse_retry_after
+from instrumentation import Instrumentation, Trace, record_request
+
+
+def _error(**fields):
+    return {"error": dict({"message": "failed", "type": "request_error"}, **fields)}
+
+
+def test_transient_errors_are_retried():
+    policy = RetryPolicy(max_attempts=3, base_delay=0)
+    responses = [_error(status_code=503, retry_after="0"), _error(reason="connection"), {"choices": []}]
+    result = policy.run(lambda: responses.pop(0))
+
+    assert result == {"choices": []}
+    stats = policy.stats()
+    assert stats["retries"] == 2 and stats["retries_succeeded"] == 1
+    print("✓ Transient errors retried")
+
+
+def test_permanent_and_timeout_errors():
+    policy = RetryPolicy(max_attempts=3, base_delay=0)
+    calls = []
+    result = policy.run(lambda: calls.append(1) or _error(status_code=400))
+    assert len(calls) == 1 and result["error"]["attempts"] == 1
+
+    # Read timeouts are only re-sent when the caller opts in
+    assert RetryPolicy.is_retryable(_error(reason="timeout"), idempotent=True)
+    assert not RetryPolicy.is_retryable(_error(reason="timeout"), idempotent=False)
+    calls.clear()
+    result = policy.run(lambda: calls.append(1) or _error(reason="timeout"))
+    assert len(calls) == 1 and result["error"]["attempts"] == 1
+    print("✓ Permanent errors and timeouts")
+
+
+def test_retry_budget_limits_retries():
+    policy = RetryPolicy(max_attempts=5, base_delay=0, budget_ratio=0.0, budget_min=2)
+    result = policy.run(lambda: _error(status_code=503))
+    assert result["error"]["attempts"] == 3  # Two retries, then the budget is empty
+    assert policy.stats()["budget_exhausted"] == 1
+    print("✓ Retry budget")
+
+
+def test_retry_after_parsing():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    policy = RetryPolicy(max_delay=5)
+    assert policy.backoff(1, _error(retry_after="120")) == 5
+    assert 0 <= policy.backoff(3) <= 2.0
+    print("✓ Retry-After and backoff")
+
+
+def test_hedged_requests_record_into_the_callers_trace():
+    policy = RetryPolicy(hedge_percentile=50, hedge_min_samples=1)
+    policy._record_latency(0.01)
+    release = threading.Event()
+
+    def primary():
+        release.wait(5)
+        record_request(network=1.0)
+        return {"choices": ["slow"]}
+
+    def hedge():
+        record_request(network=0.5)
+        return {"choices": ["fast"]}
+
+    trace = Trace("TestHedge")
+    with trace.activate():
+        result = policy.run(primary, hedge_fn=hedge)
+    release.set()
+    summary = trace.finish()
+
+    assert result == {"choices": ["fast"]} and policy.stats()["hedge_wins"] == 1
+    assert summary["stages"]["network"]["total"] >= 0.5
+    Instrumentation.reset("TestHedge")
+    print("✓ Hedged requests keep the trace")
+
+
+if __name__ == "__main__":
+    test_transient_errors_are_retried()
+    test_permanent_and_timeout_errors()
+    test_retry_budget_limits_retries()
+    test_retry_after_parsing()
+    test_hedged_requests_record_into_the_callers_trace()
+    print("✅ Retry policy tests passed!")
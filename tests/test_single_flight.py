@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for request coalescing in api/single_flight.py.
+Run with pytest or directly: python tests/test_single_flight.py
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.single_flight import SingleFlight, request_fingerprint
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"choices": [{"message": {"content": "shared"}}]}
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        results = list(executor.map(lambda _: flight.do("k", slow), range(6)))
+
+    assert len(calls) == 1
+    assert all(r == results[0] for r in results)
+    # Each caller gets its own copy
+    assert len({id(r) for r in results}) == 6
+    assert flight.stats()["coalesced"] == 5
+    print("✓ Concurrent identical calls coalesced")
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    def follower():
+        started.wait()
+        try:
+            flight.do("k", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    try:
+        flight.do("k", failing)
+    except ValueError as e:
+        errors.append(str(e))
+    thread.join()
+
+    assert errors == ["boom", "boom"]
+    # Completed calls are not cached
+    assert flight.do("k", lambda: "fresh") == "fresh"
+    print("✓ Errors propagate and nothing is cached")
+
+
+def test_fingerprint_normalization():
+    base = {"messages": [{"role": "user", "content": "hi"}], "llm_model": "m", "temperature": 0.5}
+    assert request_fingerprint("openai", dict(base, timeout=30)) == request_fingerprint("OpenAI", dict(base, timeout=300))
+    assert request_fingerprint("openai", dict(base, temperature=0.6)) != request_fingerprint("openai", base)
+    assert request_fingerprint("openai", dict(base, raw_images=[b"a"])) != request_fingerprint("openai", dict(base, raw_images=[b"b"]))
+    assert request_fingerprint("openai", dict(base, stop_condition=lambda d: False)) is None
+    print("✓ Request fingerprints")
+
+
+if __name__ == "__main__":
+    test_concurrent_callers_share_one_call()
+    test_errors_reach_every_waiter()
+    test_fingerprint_normalization()
+    print("✅ Single-flight tests passed!")
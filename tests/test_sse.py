@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming helpers in api/sse.py.
+Run with pytest or directly: python tests/test_sse.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.sse import SSEParser, iter_sse_data, parse_chat_chunk, make_stop_condition
+
+
+def test_parser_handles_split_chunks():
+    """Events split at arbitrary byte boundaries come out whole"""
+    stream = b'data: {"a": 1}\n\n: keep-alive\n\ndata: {"b": "\xc3\xa9"}\r\n\r\ndata: [DONE]\n\n'
+    pieces = [stream[i:i + 5] for i in range(0, len(stream), 5)]
+    events = list(iter_sse_data(pieces))
+
+    assert events == ['{"a": 1}', '{"b": "é"}', "[DONE]"]
+    assert parse_chat_chunk(events[0]) == {"a": 1}
+    assert parse_chat_chunk(events[2]) is None
+    print("✓ SSE parser with split chunks")
+
+
+def test_parser_multiline_and_unterminated():
+    parser = SSEParser()
+    assert parser.feed(b"data: line1\ndata: line2\n\n") == ["line1\nline2"]
+    assert parser.feed(b"data: tail") == []
+    assert parser.close() == ["tail"]
+    print("✓ SSE multi-line data and flush")
+
+
+def test_json_array_stop_condition():
+    """Fires on the bracket that closes the first top-level array, ignoring brackets in strings"""
+    stop = make_stop_condition("json_array_closed")
+    deltas = ["Sure: ", '["a ]', ' [x]",', ' ["nested"]', "]", " extra"]
+    fired_at = next(i for i, d in enumerate(deltas) if stop(d))
+    assert fired_at == 4
+    assert make_stop_condition("none") is None
+    print("✓ JSON array stop condition")
+
+
+def test_json_object_stop_condition():
+    stop = make_stop_condition("json_object_closed")
+    assert not stop('{"caption": "a {curly} cat", ')
+    assert not stop('"tags": ["x"]')
+    assert stop("}")
+    print("✓ JSON object stop condition")
+
+
+if __name__ == "__main__":
+    test_parser_handles_split_chunks()
+    test_parser_multiline_and_unterminated()
+    test_json_array_stop_condition()
+    test_json_object_stop_condition()
+    print("✅ SSE tests passed!")
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Caption a directory (or glob) of images with ShrugPrompter, without ComfyUI.
+
+Each image is loaded, shrunk, encoded and sent through the same prompter, encoders
+and router the node uses, with --concurrency images in flight. Every finished file
+is written to a checkpoint journal right away, so an interrupted run picks up where
+it stopped; a file that fails is reported without stopping the run, and tried again
+on the next run.
+
+Usage:
+    python tools/caption.py /data/images --base-url http://localhost:8080 --model qwen2.5-vl \\
+        --prompt "Describe this image in one paragraph." --output captions.jsonl
+    python tools/caption.py "/data/**/*.png" --sidecar --concurrency 8 --cleanup standard
+
+Captions go to --output as JSON lines ({"file", "caption", ...}) and/or, with
+--sidecar, to a .txt file next to each image. Rerunning the same command resumes;
+files whose content or prompt settings changed are captioned again.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import redirect_stdout
+from typing import Dict, Iterable, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import numpy as np
+import torch
+from PIL import Image, ImageOps
+
+from nodes.prompter import ShrugPrompter
+from checkpoint import CheckpointJournal
+from api.json_codec import canonical_dumps, dumps
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif", ".tiff")
+
+
+def log(message: str):
+    # stdout belongs to the prompter's own logging (silenced unless --verbose)
+    print(f"[Shrug-Prompter] {message}", file=sys.stderr, flush=True)
+
+
+def find_images(inputs: Iterable[str], recursive: bool = True, extensions=IMAGE_EXTENSIONS) -> List[str]:
+    """Image files from directories, glob patterns and plain paths, sorted and de-duplicated"""
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                for root, _, files in os.walk(item):
+                    found.update(os.path.join(root, name) for name in files)
+            else:
+                found.update(os.path.join(item, name) for name in os.listdir(item))
+        elif any(ch in item for ch in "*?["):
+            found.update(glob.glob(item, recursive=True))
+        elif os.path.isfile(item):
+            found.add(item)
+        else:
+            log(f"Skipping {item}: not a file, directory or glob")
+    return sorted(os.path.abspath(path) for path in found
+                  if path.lower().endswith(extensions) and os.path.isfile(path))
+
+
+def load_image(path: str, max_side: int = 0) -> torch.Tensor:
+    """[1,H,W,3] float IMAGE tensor, shrunk so the long side is at most max_side (0 = full size)"""
+    with Image.open(path) as image:
+        if max_side:
+            image.draft("RGB", (max_side, max_side))  # JPEG: decode at reduced scale
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        if max_side and max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        array = np.asarray(image, dtype=np.float32) / 255.0
+    return torch.from_numpy(array).unsqueeze(0)
+
+
+def file_signature(path: str) -> str:
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def write_sidecar(path: str, text: str):
+    target = os.path.splitext(path)[0] + ".txt"
+    tmp = f"{target}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, target)
+
+
+class Captioner:
+    """Runs ShrugPrompter over files with per-file error isolation and checkpointing"""
+
+    def __init__(self, provider_config: Dict, prompt_settings: Dict, journal: CheckpointJournal,
+                 output: Optional[str] = None, sidecar: bool = False, resize: int = 512, skip_failed: bool = False):
+        self.provider_config = provider_config
+        self.prompt_settings = prompt_settings
+        self.journal = journal
+        self.sidecar = sidecar
+        self.resize = resize
+        self.skip_failed = skip_failed
+        # Results are only reused for the same model, prompts and sampling settings
+        self.settings_hash = hashlib.sha256(canonical_dumps(
+            dict(prompt_settings, model=provider_config.get("llm_model"), resize=resize))).hexdigest()[:16]
+        self._output = open(output, "ab") if output else None
+        self._output_lock = threading.Lock()
+        self._local = threading.local()
+        self.done = 0
+        self.failed = 0
+        self._count_lock = threading.Lock()
+
+    def is_finished(self, path: str) -> bool:
+        entry = self.journal.get(path)
+        if not isinstance(entry, dict) or entry.get("settings") != self.settings_hash:
+            return False
+        try:
+            if entry.get("signature") != file_signature(path):
+                return False
+        except OSError:
+            return False
+        return self.skip_failed or "error" not in entry
+
+    def _prompter(self) -> ShrugPrompter:
+        prompter = getattr(self._local, "prompter", None)
+        if prompter is None:
+            prompter = self._local.prompter = ShrugPrompter()
+        return prompter
+
+    def caption(self, path: str) -> Dict:
+        """Caption one file; never raises, failures come back as {"error": ...}"""
+        start = time.perf_counter()
+        record = {"file": path}
+        signature = None
+        try:
+            signature = file_signature(path)
+            images = load_image(path, self.resize)
+            out = self._prompter().execute_prompt(
+                context={"provider_config": dict(self.provider_config)}, images=images, batch_mode=False,
+                use_cache=False, resize_mode="max" if self.resize else "none", resize_value=self.resize or 512,
+                **self.prompt_settings)
+            response = out[0].get("llm_response") or {}
+            if "error" in response:
+                raise RuntimeError(response["error"].get("message", "request failed"))
+            responses = [str(text) for text in out[1]]
+            record["caption"] = responses[0] if responses else ""
+            if len(responses) > 1:
+                record["responses"] = responses
+            usage = response.get("usage") if isinstance(response, dict) else None
+            if isinstance(usage, dict) and usage.get("completion_tokens") is not None:
+                record["completion_tokens"] = usage["completion_tokens"]
+            if self.sidecar:
+                write_sidecar(path, record["caption"])
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["seconds"] = round(time.perf_counter() - start, 3)
+
+        # Output first, then the checkpoint: a crash in between repeats a line rather than losing one
+        if self._output is not None:
+            with self._output_lock:
+                self._output.write(dumps(record) + b"\n")
+                self._output.flush()
+        self.journal.record(path, dict(record, settings=self.settings_hash, signature=signature))
+        with self._count_lock:
+            if "error" in record:
+                self.failed += 1
+            else:
+                self.done += 1
+        return record
+
+    def close(self):
+        if self._output is not None:
+            self._output.close()
+            self._output = None
+
+
+def run(captioner: Captioner, paths: List[str], concurrency: int, progress_every: float = 10.0) -> Dict:
+    """Caption paths with at most `concurrency` files in flight (loaded images included)"""
+    todo = iter(paths)
+    total = len(paths)
+    start = last_report = time.perf_counter()
+    interrupted = False
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="shrug-caption") as pool:
+        in_flight = set()
+        try:
+            while True:
+                while len(in_flight) < concurrency:
+                    path = next(todo, None)
+                    if path is None:
+                        break
+                    in_flight.add(pool.submit(captioner.caption, path))
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, timeout=progress_every, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    if "error" in record:
+                        log(f"Failed {record['file']}: {record['error']}")
+                now = time.perf_counter()
+                if now - last_report >= progress_every:
+                    last_report = now
+                    _report_progress(captioner, total, now - start)
+        except KeyboardInterrupt:
+            interrupted = True
+            log(f"Interrupted; waiting for {len(in_flight)} file(s) in flight. Rerun to resume.")
+            wait(in_flight)
+    elapsed = time.perf_counter() - start
+    _report_progress(captioner, total, elapsed)
+    return {"captioned": captioner.done, "failed": captioner.failed, "seconds": round(elapsed, 1),
+            "interrupted": interrupted}
+
+
+def _report_progress(captioner: Captioner, total: int, elapsed: float):
+    finished = captioner.done + captioner.failed
+    rate = finished / elapsed if elapsed > 0 else 0.0
+    eta = f", ETA {_duration((total - finished) / rate)}" if rate > 0 and finished < total else ""
+    log(f"{finished}/{total} files ({captioner.failed} failed), {rate:.2f} img/s{eta}")
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}h{rest // 60:02d}m" if hours else f"{rest // 60}m{rest % 60:02d}s"
+
+
+def _read_text(value: Optional[str], path: Optional[str]) -> Optional[str]:
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caption image datasets with ShrugPrompter, without ComfyUI")
+    parser.add_argument("inputs", nargs="+", help="Image files, directories or glob patterns")
+    parser.add_argument("--base-url", default=os.environ.get("SHRUG_BASE_URL", "http://localhost:8080"))
+    parser.add_argument("--model", required=True, help="Model name on the server")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", "not-required-for-local"))
+    parser.add_argument("--prompt", default="Describe this image in detail.", help="User prompt")
+    parser.add_argument("--prompt-file", default=None, help="Read the user prompt from a file")
+    parser.add_argument("--system", default="You are an expert image captioner.", help="System prompt")
+    parser.add_argument("--system-file", default=None, help="Read the system prompt from a file (e.g. a template)")
+    parser.add_argument("--max-tokens", type=int, default=300)
+    parser.add_argument("--temperature", type=float, default=0.7)
+    parser.add_argument("--top-p", type=float, default=0.9)
+    parser.add_argument("--cleanup", choices=("none", "basic", "standard", "strict"), default="standard",
+                        help="ShrugPrompter response cleanup preset")
+    parser.add_argument("--resize", type=int, default=512, help="Longest side sent to the server (0 = original size)")
+    parser.add_argument("--quality", type=int, default=85, help="JPEG quality of the upload")
+    parser.add_argument("--timeout", type=int, default=300, help="Seconds per request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Files in flight at once")
+    parser.add_argument("--output", default=None, help="Append captions to this JSONL file")
+    parser.add_argument("--sidecar", action="store_true", help="Write <image>.txt next to each image")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Checkpoint journal (default <output>.checkpoint.jsonl, or ./captions.checkpoint.jsonl)")
+    parser.add_argument("--skip-failed", action="store_true", help="Don't retry files that failed in an earlier run")
+    parser.add_argument("--no-recursive", action="store_true", help="Don't descend into subdirectories")
+    parser.add_argument("--limit", type=int, default=None, help="Caption at most this many files this run")
+    parser.add_argument("--verbose", action="store_true", help="Show the prompter's per-request logging")
+    args = parser.parse_args()
+
+    if not args.output and not args.sidecar:
+        parser.error("Choose --output captions.jsonl and/or --sidecar")
+
+    paths = find_images(args.inputs, recursive=not args.no_recursive)
+    if not paths:
+        log("No images found")
+        sys.exit(1)
+
+    checkpoint = args.checkpoint or (f"{os.path.splitext(args.output)[0]}.checkpoint.jsonl" if args.output
+                                     else "captions.checkpoint.jsonl")
+    journal = CheckpointJournal(checkpoint)
+    provider_config = {"provider": "openai", "base_url": args.base_url, "api_key": args.api_key, "llm_model": args.model}
+    prompt_settings = {
+        "system_prompt": _read_text(args.system, args.system_file),
+        "user_prompt": _read_text(args.prompt, args.prompt_file),
+        "max_tokens": args.max_tokens, "temperature": args.temperature, "top_p": args.top_p,
+        "response_cleanup": args.cleanup, "image_quality": args.quality, "timeout": args.timeout,
+    }
+    captioner = Captioner(provider_config, prompt_settings, journal, output=args.output, sidecar=args.sidecar,
+                          resize=args.resize, skip_failed=args.skip_failed)
+
+    pending = [path for path in paths if not captioner.is_finished(path)]
+    if args.limit is not None:
+        pending = pending[:args.limit]
+    log(f"{len(paths)} images, {len(paths) - len(pending)} already done per {checkpoint}, "
+        f"captioning {len(pending)} with {args.model} at {args.base_url} (concurrency {args.concurrency})")
+
+    try:
+        if args.verbose:
+            summary = run(captioner, pending, max(1, args.concurrency))
+        else:
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                summary = run(captioner, pending, max(1, args.concurrency))
+    finally:
+        captioner.close()
+        journal.close()
+    log(json.dumps(summary))
+    sys.exit(130 if summary["interrupted"] else 1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for an OpenAI-compatible edge-llm server, for benchmarks and tests.
+
+Implements /v1/models, /v1/capabilities, /v1/chat/completions (JSON and SSE
+streaming), /v1/chat/completions/multipart, /v1/embeddings and
+/v1/audio/transcriptions. Only the standard library is used.
+
+Timing model per chat request: time to first token is drawn from --latency,
+then tokens arrive at --tokens-per-second. Non-streaming requests answer after
+the whole generation. Errors and dropped connections can be injected at a given
+rate, and --seed makes every draw reproducible.
+
+Usage:
+    python tools/mock_server.py --port 8080
+    python tools/mock_server.py --latency lognormal:0.3,0.5 --tokens-per-second 40 --error-rate 0.05
+
+In-process:
+    with MockServer(latency="fixed:0.05") as server:
+        send_request("openai", base_url=server.base_url, ...)
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+DEFAULT_REPLY = ("A detailed mock caption describing the subject, the lighting, the colors "
+                 "and the composition of the frame in a few plain sentences")
+
+
+def parse_distribution(spec: str, rng: random.Random) -> Callable[[], float]:
+    """
+    Sampler for a latency spec in seconds:
+        fixed:S  uniform:LO,HI  normal:MEAN,STD  lognormal:MEDIAN,SIGMA  exp:MEAN
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] if args else []
+    kind = kind.strip().lower()
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda: rng.lognormvariate(math.log(values[0]), values[1]) if values[0] > 0 else 0.0
+    if kind == "exp" and len(values) == 1:
+        return lambda: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Bad latency spec '{spec}', expected e.g. fixed:0.1, uniform:0.05,0.2, lognormal:0.2,0.5")
+
+
+class MockServer:
+    """Configurable mock server running on a background thread"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, model: str = "mock-vlm",
+                 latency: str = "fixed:0.05", tokens_per_second: float = 0.0, completion_tokens: int = 32,
+                 reply: Optional[str] = None, error_rate: float = 0.0, error_status: int = 503,
+                 retry_after: Optional[float] = None, drop_rate: float = 0.0, multipart: bool = True,
+                 batch_size: int = 4, embedding_dim: int = 384, seed: Optional[int] = None, verbose: bool = False):
+        self.model = model
+        self.tokens_per_second = float(tokens_per_second)
+        self.completion_tokens = int(completion_tokens)
+        self.reply = reply or DEFAULT_REPLY
+        self.error_rate = float(error_rate)
+        self.error_status = int(error_status)
+        self.retry_after = retry_after
+        self.drop_rate = float(drop_rate)
+        self.multipart = multipart
+        self.batch_size = int(batch_size)
+        self.embedding_dim = int(embedding_dim)
+        self.verbose = verbose
+
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._latency = parse_distribution(latency, self._rng)
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": {}, "errors_injected": 0, "dropped": 0, "in_flight": 0, "peak_in_flight": 0,
+                       "bytes_received": 0}
+
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="shrug-mock-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return json.loads(json.dumps(self._stats))
+
+    # Random draws and bookkeeping (handler threads share these)
+
+    def _draw(self, fn):
+        with self._rng_lock:
+            return fn()
+
+    def first_token_delay(self) -> float:
+        return self._draw(self._latency)
+
+    def fault(self) -> Optional[str]:
+        """"drop", "error" or None for this request"""
+        roll = self._draw(self._rng.random)
+        if roll < self.drop_rate:
+            return "drop"
+        if roll < self.drop_rate + self.error_rate:
+            return "error"
+        return None
+
+    def count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def enter(self, path: str):
+        with self._stats_lock:
+            self._stats["requests"][path] = self._stats["requests"].get(path, 0) + 1
+            self._stats["in_flight"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._stats["in_flight"])
+
+    def leave(self):
+        with self._stats_lock:
+            self._stats["in_flight"] -= 1
+
+    def capabilities(self) -> Dict:
+        return {
+            "version": "mock-1",
+            "optimizations": {"json": {"orjson_available": True}, "image": {}},
+            "endpoints": {"fast_vision": {"available": self.multipart}},
+            "recommendations": {
+                "vision_models": {"use_multipart": self.multipart},
+                "batch_size": {"optimal": self.batch_size},
+            },
+        }
+
+    def completion_words(self, max_tokens: int):
+        words = self.reply.split()
+        count = max(1, min(int(max_tokens or self.completion_tokens), self.completion_tokens))
+        return [words[i % len(words)] for i in range(count)]
+
+
+def _make_handler(server: MockServer):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Headers and body are separate writes; don't add 40ms delayed-ACK stalls
+
+        def log_message(self, fmt, *args):
+            if server.verbose:
+                super().log_message(fmt, *args)
+
+        # Plumbing
+
+        def _read_body(self) -> bytes:
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                parts = []
+                while True:
+                    size = int(self.rfile.readline().split(b";")[0].strip() or b"0", 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        break
+                    parts.append(self.rfile.read(size))
+                    self.rfile.readline()
+                body = b"".join(parts)
+            else:
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            server.count("bytes_received", len(body))
+            return body
+
+        def _send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, str(value))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _inject_fault(self) -> bool:
+            fault = server.fault()
+            if fault == "drop":
+                server.count("dropped")
+                self.close_connection = True
+                try:
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                return True
+            if fault == "error":
+                server.count("errors_injected")
+                headers = {"Retry-After": server.retry_after} if server.retry_after is not None else None
+                self._send_json(server.error_status, {"error": {"message": "Injected failure", "type": "mock_error"}}, headers)
+                return True
+            return False
+
+        def _dispatch(self, routes: Dict):
+            path = self.path.split("?", 1)[0].rstrip("/")
+            handler = routes.get(path)
+            server.enter(path)
+            try:
+                if handler is None:
+                    self._send_json(404, {"error": {"message": f"Unknown endpoint {path}"}})
+                else:
+                    handler()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client went away (e.g. stopped a stream early)
+            finally:
+                server.leave()
+
+        def do_GET(self):
+            self._dispatch({"/v1/models": self._models, "/v1/capabilities": self._capabilities})
+
+        def do_POST(self):
+            self._dispatch({
+                "/v1/chat/completions": self._chat,
+                "/v1/chat/completions/multipart": self._chat_multipart,
+                "/v1/embeddings": self._embeddings,
+                "/v1/audio/transcriptions": self._transcription,
+            })
+
+        # Endpoints
+
+        def _models(self):
+            self._send_json(200, {"object": "list", "data": [{"id": server.model, "object": "model"}]})
+
+        def _capabilities(self):
+            payload = server.capabilities()
+            etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._send_json(200, payload, {"ETag": etag})
+
+        def _chat(self):
+            body = self._read_body()
+            if self._inject_fault():
+                return
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+                return
+            self._generate(request, prompt_tokens=max(1, len(body) // 4))
+
+        def _chat_multipart(self):
+            if not server.multipart:
+                self._read_body()
+                self._send_json(404, {"error": {"message": "Multipart endpoint disabled"}})
+                return
+            body = self._read_body()
+            if self._inject_fault():
+                return
+            images = body.count(b'name="images"')
+            max_tokens = _form_field(body, b"max_tokens")
+            self._generate({"max_tokens": int(max_tokens) if max_tokens else None},
+                           prompt_tokens=max(1, len(body) // 4), extra={"images_received": images})
+
+        def _generate(self, request: Dict, prompt_tokens: int, extra: Optional[Dict] = None):
+            words = server.completion_words(request.get("max_tokens"))
+            first_token = server.first_token_delay()
+            per_token = 1.0 / server.tokens_per_second if server.tokens_per_second > 0 else 0.0
+            completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                     "total_tokens": prompt_tokens + len(words)}
+
+            if not request.get("stream"):
+                time.sleep(first_token + per_token * (len(words) - 1))
+                payload = {
+                    "id": completion_id, "object": "chat.completion", "created": int(time.time()),
+                    "model": request.get("model") or server.model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                                 "finish_reason": "length" if len(words) == request.get("max_tokens") else "stop"}],
+                    "usage": usage,
+                }
+                payload.update(extra or {})
+                self._send_json(200, payload)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(first_token)
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(per_token)
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "model": server.model,
+                         "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word},
+                                      "finish_reason": None}]}
+                self._write_event(json.dumps(chunk))
+            final = {"id": completion_id, "object": "chat.completion.chunk", "model": server.model,
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+            self._write_event(json.dumps(final))
+            self._write_event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _write_event(self, data: str):
+            event = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+            self.wfile.flush()
+
+        def _embeddings(self):
+            body = self._read_body()
+            if self._inject_fault():
+                return
+            request = json.loads(body or b"{}")
+            inputs = request.get("input", "")
+            inputs = inputs if isinstance(inputs, list) else [inputs]
+            time.sleep(server.first_token_delay())
+            data = [{"object": "embedding", "index": i, "embedding": _embedding(str(text), server.embedding_dim)}
+                    for i, text in enumerate(inputs)]
+            tokens = sum(len(str(text).split()) for text in inputs)
+            self._send_json(200, {"object": "list", "data": data, "model": request.get("model") or server.model,
+                                  "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+        def _transcription(self):
+            body = self._read_body()
+            if self._inject_fault():
+                return
+            time.sleep(server.first_token_delay())
+            self._send_json(200, {"text": f"Mock transcription of {len(body)} bytes of audio."})
+
+    return Handler
+
+
+def _form_field(body: bytes, name: bytes) -> Optional[str]:
+    """Value of a small text field in a multipart body (good enough for a mock)"""
+    marker = b'name="' + name + b'"\r\n\r\n'
+    start = body.find(marker)
+    if start < 0:
+        return None
+    start += len(marker)
+    end = body.find(b"\r\n", start)
+    return body[start:end].decode("utf-8", "replace")
+
+
+def _embedding(text: str, dim: int):
+    """Deterministic unit vector for a text"""
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible server for shrug-prompter benchmarks and tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default="mock-vlm")
+    parser.add_argument("--latency", default="fixed:0.05", help="Time to first token: fixed:S, uniform:LO,HI, normal:MEAN,STD, lognormal:MEDIAN,SIGMA, exp:MEAN")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation speed after the first token (0 = instant)")
+    parser.add_argument("--completion-tokens", type=int, default=32, help="Tokens per completion (capped by max_tokens)")
+    parser.add_argument("--reply", default=None, help="Text to generate (repeated as needed)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After seconds sent with injected errors")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of requests whose connection is dropped")
+    parser.add_argument("--no-multipart", action="store_true", help="Advertise and serve no multipart endpoint")
+    parser.add_argument("--batch-size", type=int, default=4, help="Recommended batch size in /v1/capabilities")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = MockServer(host=args.host, port=args.port, model=args.model, latency=args.latency,
+                        tokens_per_second=args.tokens_per_second, completion_tokens=args.completion_tokens,
+                        reply=args.reply, error_rate=args.error_rate, error_status=args.error_status,
+                        retry_after=args.retry_after, drop_rate=args.drop_rate, multipart=not args.no_multipart,
+                        batch_size=args.batch_size, seed=args.seed, verbose=args.verbose)
+    print(f"[Shrug-Prompter] Mock server listening on {server.base_url} (model {args.model})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[Shrug-Prompter] Mock server stats: {json.dumps(server.stats())}")
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
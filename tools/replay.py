@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Replay recorded requests through shrug_router.send_request and report latency.
+
+Record with SHRUG_RECORD_REQUESTS=/path/recorded.jsonl (see api/request_recorder.py),
+then replay against any server:
+
+    # Closed loop: 8 clients, each sends its next request when the last one returns
+    python tools/replay.py recorded.jsonl --base-url http://localhost:8080 --concurrency 8
+
+    # Open loop: Poisson arrivals at 20 req/s for 60 s, whatever the server keeps up with
+    python tools/replay.py recorded.jsonl --mode open --rate 20 --duration 60 --loop
+
+Open-loop latency is measured from each request's scheduled arrival, so time spent
+queued behind --concurrency counts (no coordinated omission).
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from shrug_router import send_request, retry_stats, coalescing_stats
+from api.request_recorder import RequestRecorder, read_records, to_kwargs
+from instrumentation import Histogram
+
+
+class Replay:
+    """Sends recorded requests and collects their latencies and errors"""
+
+    def __init__(self, records: List[Dict], base_url: Optional[str] = None, model: Optional[str] = None,
+                 api_key: str = "not-required-for-local", timeout: Optional[float] = None,
+                 retry: bool = True, coalesce: bool = False):
+        if not records:
+            raise ValueError("No request records to replay")
+        self.records = records
+        self.overrides = {k: v for k, v in (("base_url", base_url), ("llm_model", model), ("timeout", timeout))
+                          if v is not None}
+        self.api_key = api_key
+        self.retry = retry
+        self.coalesce = coalesce
+        self.latency = Histogram(window=1_000_000)
+        self.ok_latency = Histogram(window=1_000_000)
+        self.errors = Counter()
+        self.sent = 0
+        self._lock = threading.Lock()
+        self._kwargs_cache: Dict[int, Dict] = {}
+
+    def kwargs_for(self, index: int) -> Dict:
+        # Synthetic images are built once per record, outside the timed section
+        kwargs = self._kwargs_cache.get(index)
+        if kwargs is None:
+            kwargs = dict(to_kwargs(self.records[index]), **self.overrides)
+            kwargs.update(api_key=self.api_key, retry=self.retry, coalesce=self.coalesce)
+            self._kwargs_cache[index] = kwargs
+        return kwargs
+
+    def send(self, index: int, started: float):
+        """Send one record; latency is measured from `started` (perf_counter)"""
+        record = self.records[index]
+        response = send_request(record.get("provider") or "openai", **self.kwargs_for(index))
+        seconds = time.perf_counter() - started
+        error = response.get("error") if isinstance(response, dict) else {"message": "no response"}
+        with self._lock:
+            self.sent += 1
+            self.latency.observe(seconds)
+            if error:
+                self.errors[_error_label(error)] += 1
+            else:
+                self.ok_latency.observe(seconds)
+
+    def run_closed(self, order: Iterator[int], concurrency: int, deadline: Optional[float]):
+        lock = threading.Lock()
+
+        def worker():
+            while deadline is None or time.perf_counter() < deadline:
+                with lock:
+                    index = next(order, None)
+                if index is None:
+                    return
+                self.send(index, time.perf_counter())
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, concurrency))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open(self, order: Iterator[int], rate: float, concurrency: int, deadline: Optional[float], seed=None):
+        rng = random.Random(seed)
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="shrug-replay") as pool:
+            arrival = time.perf_counter()
+            for index in order:
+                arrival += rng.expovariate(rate)
+                if deadline is not None and arrival >= deadline:
+                    break
+                delay = arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.send, index, arrival)
+
+    def report(self, wall_time: float) -> Dict:
+        with self._lock:
+            ok = self.ok_latency.count
+            return {
+                "sent": self.sent,
+                "ok": ok,
+                "errors": dict(self.errors.most_common()),
+                "error_rate": round(1 - ok / self.sent, 4) if self.sent else 0.0,
+                "wall_time": round(wall_time, 3),
+                "throughput": round(ok / wall_time, 3) if wall_time > 0 else 0.0,
+                "latency": self.latency.summary(),
+                "ok_latency": self.ok_latency.summary(),
+                "retries": retry_stats(),
+                "coalescing": coalescing_stats(),
+            }
+
+
+def _error_label(error: Dict) -> str:
+    if error.get("status_code"):
+        return f"http_{error['status_code']}"
+    return error.get("reason") or error.get("type") or "error"
+
+
+def _order(count: int, total: Optional[int], loop: bool, shuffle: bool, rng: random.Random) -> Iterator[int]:
+    indices = list(range(count))
+    if shuffle:
+        rng.shuffle(indices)
+    order = itertools.cycle(indices) if loop else iter(indices)
+    return itertools.islice(order, total) if total is not None else order
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded shrug-prompter requests as a load test")
+    parser.add_argument("recording", help="JSONL written with SHRUG_RECORD_REQUESTS")
+    parser.add_argument("--base-url", default=None, help="Send to this server instead of the recorded one")
+    parser.add_argument("--model", default=None, help="Override the recorded model")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", "not-required-for-local"))
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed",
+                        help="closed: --concurrency clients back to back; open: Poisson arrivals at --rate")
+    parser.add_argument("--concurrency", type=int, default=4, help="Clients (closed) or max requests in flight (open)")
+    parser.add_argument("--rate", type=float, default=1.0, help="Mean arrivals per second in open mode")
+    parser.add_argument("--requests", type=int, default=None, help="Stop after this many requests")
+    parser.add_argument("--duration", type=float, default=None, help="Stop sending after this many seconds")
+    parser.add_argument("--loop", action="store_true", help="Cycle through the recording until --requests/--duration")
+    parser.add_argument("--shuffle", action="store_true", help="Replay records in random order")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for --shuffle and open-loop arrivals")
+    parser.add_argument("--timeout", type=float, default=None, help="Per-request timeout override (seconds)")
+    parser.add_argument("--no-retry", action="store_true", help="Report first-attempt failures instead of retrying")
+    parser.add_argument("--coalesce", action="store_true", help="Let identical concurrent requests share one call")
+    parser.add_argument("--output", default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    if args.mode == "open" and args.rate <= 0:
+        parser.error("--rate must be positive in open mode")
+    if args.loop and args.requests is None and args.duration is None:
+        parser.error("--loop needs --requests or --duration")
+
+    # Don't append the replay to a recording
+    RequestRecorder.path = None
+
+    records = list(read_records(args.recording))
+    replay = Replay(records, base_url=args.base_url, model=args.model, api_key=args.api_key,
+                    timeout=args.timeout, retry=not args.no_retry, coalesce=args.coalesce)
+    rng = random.Random(args.seed)
+    order = _order(len(records), args.requests, args.loop, args.shuffle, rng)
+
+    # Build synthetic images before the clock starts
+    for index in range(len(records)):
+        replay.kwargs_for(index)
+
+    target = args.base_url or records[0].get("base_url")
+    print(f"[Shrug-Prompter] Replaying {len(records)} recorded request(s) against {target} "
+          f"({args.mode} loop, " + (f"{args.rate:g} req/s, " if args.mode == "open" else "")
+          + f"concurrency {args.concurrency})")
+    start = time.perf_counter()
+    deadline = start + args.duration if args.duration else None
+    try:
+        if args.mode == "closed":
+            replay.run_closed(order, args.concurrency, deadline)
+        else:
+            replay.run_open(order, args.rate, args.concurrency, deadline, seed=args.seed)
+    except KeyboardInterrupt:
+        print("[Shrug-Prompter] Interrupted, reporting what finished")
+    report = dict(replay.report(time.perf_counter() - start), mode=args.mode, concurrency=args.concurrency,
+                  rate=args.rate if args.mode == "open" else None, target=target)
+
+    latency = report["latency"]
+    print(f"Sent {report['sent']}, ok {report['ok']}, error rate {report['error_rate']:.2%}, "
+          f"throughput {report['throughput']:.2f} req/s over {report['wall_time']:.1f}s")
+    if latency["count"]:
+        print(f"Latency p50 {latency['p50'] * 1000:.1f} ms, p95 {latency['p95'] * 1000:.1f} ms, "
+              f"p99 {latency['p99'] * 1000:.1f} ms, max {latency['max'] * 1000:.1f} ms")
+    if report["errors"]:
+        print("Errors: " + ", ".join(f"{label} x{count}" for label, count in report["errors"].items()))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
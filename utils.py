@@ -2,12 +2,29 @@
 import os
 import requests
 import base64
+import hashlib
 import io
 import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import torch
+import torch.nn.functional as F
 from PIL import Image
 
+try:
+    from api.session_pool import SessionPool
+    from instrumentation import span, run_in_context
+except ImportError:
+    from .api.session_pool import SessionPool
+    from .instrumentation import span, run_in_context
+
+try:
+    import xxhash  # Optional, noticeably faster than blake2 on large frames
+except ImportError:
+    xxhash = None
+
 def get_models(provider, api_key, base_url):
     """Fetches the list of available models for a given provider via its API."""
     provider_lower = provider.lower()
@@ -24,7 +41,7 @@ def get_models(provider, api_key, base_url):
             headers["Authorization"] = f"Bearer {api_key}"
 
         try:
-            response = requests.get(endpoint, headers=headers, timeout=15)
+            response = SessionPool.get_session(base_url).get(endpoint, headers=headers, timeout=15)
             response.raise_for_status()
             data = response.json()
 
@@ -64,107 +81,293 @@ def get_models(provider, api_key, base_url):
     else:
         return [f"Model fetching not implemented for '{provider}'."]
 
-def tensors_to_base64_list(tensor_batch, max_size=1024, quality=85):
+# Worker threads for image encoding. PIL releases the GIL while encoding, so
+# JPEG/PNG compression of a batch scales across cores.
+ENCODE_WORKERS = int(os.environ.get("SHRUG_ENCODE_WORKERS", "0")) or min(8, os.cpu_count() or 1)
+
+_encode_pool = None
+_encode_pool_lock = threading.Lock()
+
+def _get_encode_pool():
+    """Shared thread pool for image encoding, created on first use"""
+    global _encode_pool
+    with _encode_pool_lock:
+        if _encode_pool is None:
+            _encode_pool = ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix="shrug-encode")
+        return _encode_pool
+
+def _client_resize_target(height, width, resize_mode, resize_value, resize_width, resize_height):
+    """(new_height, new_width) for a resize_mode, or None when the frame is already small enough"""
+    if resize_mode == "max":
+        scale = resize_value / max(height, width)
+    elif resize_mode == "width":
+        scale = resize_value / width
+    elif resize_mode == "height":
+        scale = resize_value / height
+    elif resize_mode == "exact":
+        # Only worth doing locally if it reduces the pixels we upload
+        if resize_width * resize_height >= width * height:
+            return None
+        return resize_height, resize_width
+    else:
+        return None
+
+    # Never upscale client-side; the server still applies its own resize afterwards
+    if scale >= 1.0:
+        return None
+    return max(1, round(height * scale)), max(1, round(width * scale))
+
+def resize_tensor_batch(tensor_batch, resize_mode="max", resize_value=512, resize_width=512, resize_height=512):
     """
-    Converts a ComfyUI IMAGE or MASK tensor batch to a list of Base64 strings.
+    Downscale a whole IMAGE/MASK batch with one antialiased interpolate call.
+
+    Runs on whatever device the batch lives on. Uses the same resize_mode values
+    as the server-side resize parameters, so encoding and upload scale with the
+    target size instead of the source size.
 
     Args:
-        tensor_batch: The tensor batch to convert
-        max_size: Maximum dimension for resizing (to reduce VRAM usage)
-        quality: JPEG quality for compression (when applicable)
+        tensor_batch: [B,H,W,C] image or [B,H,W] mask tensor (or a list of frame tensors)
+        resize_mode: "max", "width", "height", "exact" or "none"
+        resize_value: Target size for max/width/height
+        resize_width, resize_height: Target size for exact
+
+    Returns:
+        Resized tensor in the same layout and dtype (the input itself if no resize is needed)
+    """
+    if tensor_batch is None or resize_mode == "none":
+        return tensor_batch
+    if isinstance(tensor_batch, (list, tuple)):
+        tensor_batch = torch.stack(list(tensor_batch))
+
+    height, width = tensor_batch.shape[1], tensor_batch.shape[2]
+    target = _client_resize_target(height, width, resize_mode, resize_value, resize_width, resize_height)
+    if target is None:
+        return tensor_batch
+
+    with torch.no_grad():
+        is_mask = tensor_batch.dim() == 3
+        x = tensor_batch.unsqueeze(1) if is_mask else tensor_batch.permute(0, 3, 1, 2)
+        if not x.is_floating_point():
+            x = x.float()
+        x = F.interpolate(x, size=target, mode="bilinear", antialias=True, align_corners=False)
+        x = x.squeeze(1) if is_mask else x.permute(0, 2, 3, 1)
+        return x.to(tensor_batch.dtype).contiguous()
+
+def tensor_batch_to_uint8(tensor_batch):
+    """
+    Convert a whole IMAGE/MASK batch to one contiguous uint8 numpy array.
+
+    GPU batches are scaled on the GPU in a single op, so only the uint8 result
+    crosses to the CPU (a quarter of the float32 size). CPU batches deliberately
+    stay a per-frame loop into one preallocated uint8 buffer: a single batched
+    mul/clamp/cast allocates a float copy of the whole batch and streams it through
+    memory twice, which measured ~3x slower with ~4x the peak memory on a
+    32-frame 720p batch, while the frame-sized scratch buffer stays in cache.
+    The per-frame Python overhead is negligible next to the pixel work.
+    Channels-first batches are permuted to ComfyUI's [B,H,W,C].
+
+    Args:
+        tensor_batch: [B,H,W,C] image or [B,H,W] mask tensor (or a list of frame tensors)
+
+    Returns:
+        uint8 numpy array with the same layout
+    """
+    if isinstance(tensor_batch, (list, tuple)):
+        tensor_batch = torch.stack(list(tensor_batch))
+
+    with span("tensor_to_uint8"), torch.no_grad():
+        t = tensor_batch.detach()
+
+        # If channels are first (BCHW), move them last
+        if t.dim() == 4 and t.shape[1] in [1, 3, 4] and t.shape[1] < min(t.shape[2:]):
+            t = t.permute(0, 2, 3, 1)
+
+        if t.dtype == torch.uint8:
+            return t.contiguous().cpu().numpy()
+
+        # Batches with values above 1.0 are already in 0-255 range
+        scale = 255.0 if t.numel() == 0 or float(t.max()) <= 1.0 else 1.0
+
+        if t.device.type != 'cpu':
+            return t.mul(scale).clamp_(0, 255).to(torch.uint8).contiguous().cpu().numpy()
+
+        if t.dtype not in (torch.float32, torch.float64, torch.float16):
+            t = t.float()
+        src = t.numpy()
+        out = np.empty(src.shape, dtype=np.uint8)
+        scratch = np.empty(src.shape[1:], dtype=np.float32)
+        for i in range(src.shape[0]):
+            np.multiply(src[i], scale, out=scratch)
+            np.clip(scratch, 0, 255, out=scratch)
+            out[i] = scratch
+        return out
+
+def _frame_to_pil(image_np):
+    """Convert one uint8 frame (HW, HWC) to a PIL image. Returns (pil_image, mode)."""
+    # Remove extra dimensions
+    image_np = image_np.squeeze()
+
+    # Determine PIL mode
+    if image_np.ndim == 2:
+        mode = 'L'  # Grayscale
+    elif image_np.ndim == 3:
+        if image_np.shape[2] == 1:
+            image_np = image_np.squeeze(axis=2)
+            mode = 'L'
+        elif image_np.shape[2] == 3:
+            mode = 'RGB'
+        elif image_np.shape[2] == 4:
+            mode = 'RGBA'
+        else:
+            # Fallback: take first 3 channels
+            image_np = image_np[:, :, :3]
+            mode = 'RGB'
+    else:
+        raise ValueError(f"Unsupported image shape: {image_np.shape}")
+
+    return Image.fromarray(image_np, mode=mode), mode
+
+def _encode_frame(image_np, max_size=None, quality=85, optimize=True, preserve_alpha=False):
+    """Encode one uint8 frame to (image_bytes, mime_type): JPEG for RGB/L, PNG otherwise (keeps alpha)."""
+    with span("encode"):
+        pil_image, mode = _frame_to_pil(image_np)
+
+        # Resize if too large to reduce memory usage
+        if max_size is not None and max(pil_image.size) > max_size:
+            # Calculate new size maintaining aspect ratio
+            original_size = pil_image.size
+            ratio = max_size / max(pil_image.size)
+            new_size = tuple(int(dim * ratio) for dim in pil_image.size)
+            pil_image = pil_image.resize(new_size, Image.Resampling.LANCZOS)
+            print(f"Resized image from {original_size} to {new_size} to reduce memory usage")
+
+        buffer = io.BytesIO()
+        if preserve_alpha and mode == 'RGBA':
+            pil_image.save(buffer, format="PNG", optimize=optimize)
+            mime_type = "image/png"
+        elif mode in ['RGB', 'L']:
+            pil_image.save(buffer, format="JPEG", quality=quality, optimize=optimize)
+            mime_type = "image/jpeg"
+        else:
+            pil_image.save(buffer, format="PNG", optimize=optimize)
+            mime_type = "image/png"
+        img_bytes = buffer.getvalue()
+        buffer.close()
+        return img_bytes, mime_type
+
+def encode_tensor_batch(tensor_batch, max_size=None, quality=85, workers=None, optimize=True, preserve_alpha=False):
+    """
+    Encode every frame of a tensor batch to image bytes on a thread pool.
+
+    Args:
+        tensor_batch: IMAGE/MASK tensor batch (or a list of frame tensors)
+        max_size: Maximum dimension for resizing (None keeps original size)
+        quality: JPEG quality for compression
+        workers: Number of encoder threads (default ENCODE_WORKERS, 1 = encode inline)
+        optimize: Pass PIL's optimize flag (smaller files, slower encode)
+        preserve_alpha: Write RGBA frames as PNG with their alpha channel
+
+    Returns:
+        List of (image_bytes, mime_type) tuples in input order
     """
     if tensor_batch is None:
         return []
 
-    b64_list = []
+    # One vectorized conversion for the whole batch; frames are views into it
+    batch_np = tensor_batch_to_uint8(tensor_batch)
+    frames = [batch_np[i] for i in range(batch_np.shape[0])]
+    workers = ENCODE_WORKERS if workers is None else workers
+
+    if workers <= 1 or len(frames) <= 1:
+        return [_encode_frame(frame, max_size, quality, optimize, preserve_alpha) for frame in frames]
+
+    # Results are collected in input order; at most `workers` frames are in flight on the shared pool
+    pool = _get_encode_pool() if workers == ENCODE_WORKERS else ThreadPoolExecutor(max_workers=workers)
     try:
-        for i in range(tensor_batch.shape[0]):
-            tensor = tensor_batch[i]
-
-            # Move to CPU and convert to numpy early to free GPU memory
-            image_np = tensor.cpu().numpy()
-
-            # Clear the original tensor from memory if it was on GPU
-            if tensor.device.type == 'cuda':
-                del tensor
-                torch.cuda.empty_cache()
-
-            # Handle different tensor formats (ComfyUI uses HWC format)
-            if image_np.ndim == 3:
-                # If channels are first (CHW), transpose to HWC
-                if image_np.shape[0] in [1, 3, 4] and image_np.shape[0] < min(image_np.shape[1:]):
-                    image_np = np.transpose(image_np, (1, 2, 0))
-
-            # Ensure values are in 0-255 range
-            if image_np.max() <= 1.0:
-                image_np = (image_np * 255).astype(np.uint8)
-            else:
-                image_np = np.clip(image_np, 0, 255).astype(np.uint8)
-
-            # Remove extra dimensions
-            image_np = image_np.squeeze()
-
-            # Determine PIL mode
-            if image_np.ndim == 2:
-                mode = 'L'  # Grayscale
-            elif image_np.ndim == 3:
-                if image_np.shape[2] == 1:
-                    image_np = image_np.squeeze(axis=2)
-                    mode = 'L'
-                elif image_np.shape[2] == 3:
-                    mode = 'RGB'
-                elif image_np.shape[2] == 4:
-                    mode = 'RGBA'
-                else:
-                    # Fallback: take first 3 channels
-                    image_np = image_np[:, :, :3]
-                    mode = 'RGB'
-            else:
-                raise ValueError(f"Unsupported image shape: {image_np.shape}")
+        futures = [pool.submit(run_in_context(_encode_frame), frame, max_size, quality, optimize, preserve_alpha)
+                   for frame in frames]
+        return [future.result() for future in futures]
+    finally:
+        if pool is not _encode_pool:
+            pool.shutdown(wait=False)
 
-            # Create PIL image
-            pil_image = Image.fromarray(image_np, mode=mode)
+def iter_encoded_images(tensor_batch, max_size=None, quality=85, as_base64=False, prefetch=None, optimize=True,
+                        preserve_alpha=False):
+    """
+    Lazily encode a tensor batch, yielding one frame at a time in input order.
+
+    Encoding runs ahead of the consumer on the shared encode pool by at most
+    `prefetch` frames, so frame i+1 is being compressed while request i is in
+    flight and only that small window of payloads is held in memory. Frames are
+    converted to uint8 in chunks of the same size rather than all at once.
+
+    Args:
+        tensor_batch: IMAGE/MASK tensor batch (or a list of frame tensors)
+        max_size: Maximum dimension for resizing (None keeps original size)
+        quality: JPEG quality for compression
+        as_base64: Yield base64 strings instead of (image_bytes, mime_type) tuples
+        prefetch: Frames encoded ahead of the consumer (default ENCODE_WORKERS)
+        optimize: Pass PIL's optimize flag (smaller files, slower encode)
+        preserve_alpha: Write RGBA frames as PNG with their alpha channel
+    """
+    if tensor_batch is None:
+        return
 
-            # Resize if too large to reduce memory usage
-            if max_size is not None and max(pil_image.size) > max_size:
-                # Calculate new size maintaining aspect ratio
-                ratio = max_size / max(pil_image.size)
-                new_size = tuple(int(dim * ratio) for dim in pil_image.size)
-                pil_image = pil_image.resize(new_size, Image.Resampling.LANCZOS)
-                print(f"Resized image from {image_np.shape} to {new_size} to reduce memory usage")
+    total = len(tensor_batch)
+    window = max(1, prefetch if prefetch is not None else ENCODE_WORKERS)
+    pool = _get_encode_pool()
 
-            # Convert to base64 with compression
-            buffer = io.BytesIO()
+    def encode(frame):
+        img_bytes, mime_type = _encode_frame(frame, max_size, quality, optimize, preserve_alpha)
+        return base64.b64encode(img_bytes).decode('utf-8') if as_base64 else (img_bytes, mime_type)
 
-            # Use JPEG for RGB images to reduce size, PNG for others
-            if mode in ['RGB', 'L']:
-                pil_image.save(buffer, format="JPEG", quality=quality, optimize=True)
-            else:
-                pil_image.save(buffer, format="PNG", optimize=True)
+    pending = deque()
+    chunk, chunk_start, next_index = None, 0, 0
+    try:
+        while next_index < total or pending:
+            # Top up the window; a chunk is dropped once all its frames are encoded
+            while next_index < total and len(pending) < window:
+                if chunk is None or next_index >= chunk_start + len(chunk):
+                    chunk_start = next_index
+                    chunk = tensor_batch_to_uint8(tensor_batch[next_index:next_index + window])
+                pending.append(pool.submit(run_in_context(encode), chunk[next_index - chunk_start]))
+                next_index += 1
+            yield pending.popleft().result()
+    finally:
+        # Consumer stopped early (error or close()): don't leave work queued on the shared pool
+        for future in pending:
+            future.cancel()
 
-            b64_encoded = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            b64_list.append(b64_encoded)
+def tensors_to_base64_list(tensor_batch, max_size=1024, quality=85, workers=None, preserve_alpha=False):
+    """
+    Converts a ComfyUI IMAGE or MASK tensor batch to a list of Base64 strings.
 
-            # Clean up
-            buffer.close()
-            del pil_image, image_np
+    Args:
+        tensor_batch: The tensor batch to convert
+        max_size: Maximum dimension for resizing (to reduce VRAM usage)
+        quality: JPEG quality for compression (when applicable)
+        workers: Number of encoder threads (default ENCODE_WORKERS)
+        preserve_alpha: Write RGBA frames as PNG with their alpha channel
+    """
+    if tensor_batch is None:
+        return []
 
+    try:
+        encoded = encode_tensor_batch(tensor_batch, max_size=max_size, quality=quality, workers=workers,
+                                      preserve_alpha=preserve_alpha)
+        return [base64.b64encode(img_bytes).decode('utf-8') for img_bytes, _ in encoded]
     except Exception as e:
         print(f"ERROR: Failed to convert tensor to base64: {e}")
-        print(f"Tensor shape: {tensor_batch.shape if tensor_batch is not None else 'None'}")
+        print(f"Tensor shape: {tensor_batch.shape if hasattr(tensor_batch, 'shape') else len(tensor_batch)}")
         # Clean up on error
-        if 'tensor' in locals():
-            del tensor
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
         return []
 
-    return b64_list
+# ComfyUI nodes are synchronous. For fan-out, shrug_router.send_requests runs
+# send_request_async on a private event loop thread instead of ComfyUI's loop
 
-# Removed run_async - ComfyUI nodes should be synchronous
-# The send_request function in shrug_router.py is now synchronous
-
-def tensors_to_raw_bytes_list(tensor_batch, quality=85, preserve_alpha=False):
+def tensors_to_raw_bytes_list(tensor_batch, quality=85, preserve_alpha=False, workers=None):
     """
     Converts a ComfyUI IMAGE tensor batch to a list of raw image bytes.
     Used for multipart requests to avoid base64 encoding overhead.
@@ -173,6 +376,8 @@ def tensors_to_raw_bytes_list(tensor_batch, quality=85, preserve_alpha=False):
         tensor_batch: The tensor batch to convert
         quality: JPEG quality for compression
         preserve_alpha: If True, saves as PNG to preserve alpha channel
+            (RGBA frames are always written as PNG)
+        workers: Number of encoder threads (default ENCODE_WORKERS)
     
     Returns:
         List of tuples: (image_bytes, mime_type)
@@ -180,82 +385,60 @@ def tensors_to_raw_bytes_list(tensor_batch, quality=85, preserve_alpha=False):
     if tensor_batch is None:
         return []
     
-    bytes_list = []
     try:
-        for i in range(tensor_batch.shape[0]):
-            tensor = tensor_batch[i]
-            
-            # Move to CPU and convert to numpy
-            image_np = tensor.cpu().numpy()
-            
-            # Clear GPU memory if needed
-            if tensor.device.type == 'cuda':
-                del tensor
-                torch.cuda.empty_cache()
-            
-            # Handle tensor format (ComfyUI uses HWC)
-            if image_np.ndim == 3:
-                if image_np.shape[0] in [1, 3, 4] and image_np.shape[0] < min(image_np.shape[1:]):
-                    image_np = np.transpose(image_np, (1, 2, 0))
-            
-            # Ensure values are in 0-255 range
-            if image_np.max() <= 1.0:
-                image_np = (image_np * 255).astype(np.uint8)
-            else:
-                image_np = np.clip(image_np, 0, 255).astype(np.uint8)
-            
-            # Remove extra dimensions
-            image_np = image_np.squeeze()
-            
-            # Determine PIL mode
-            if image_np.ndim == 2:
-                mode = 'L'  # Grayscale
-            elif image_np.ndim == 3:
-                if image_np.shape[2] == 1:
-                    image_np = image_np.squeeze(axis=2)
-                    mode = 'L'
-                elif image_np.shape[2] == 3:
-                    mode = 'RGB'
-                elif image_np.shape[2] == 4:
-                    mode = 'RGBA'
-                else:
-                    image_np = image_np[:, :, :3]
-                    mode = 'RGB'
-            else:
-                raise ValueError(f"Unsupported image shape: {image_np.shape}")
-            
-            # Create PIL image
-            pil_image = Image.fromarray(image_np, mode=mode)
-            
-            # Convert to bytes
-            buffer = io.BytesIO()
-            
-            # Choose format based on mode and preserve_alpha
-            if preserve_alpha and mode == 'RGBA':
-                pil_image.save(buffer, format="PNG", optimize=True)
-                mime_type = "image/png"
-            elif mode in ['RGB', 'L']:
-                pil_image.save(buffer, format="JPEG", quality=quality, optimize=True)
-                mime_type = "image/jpeg"
-            else:
-                pil_image.save(buffer, format="PNG", optimize=True)
-                mime_type = "image/png"
-            
-            img_bytes = buffer.getvalue()
-            buffer.close()
-            
-            bytes_list.append((img_bytes, mime_type))
-            
-            # Clean up
-            del pil_image, image_np
-    
+        return encode_tensor_batch(tensor_batch, quality=quality, workers=workers, preserve_alpha=preserve_alpha)
     except Exception as e:
         print(f"ERROR: Failed to convert tensor to bytes: {e}")
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
         return []
-    
-    return bytes_list
+
+def tensor_fingerprint(tensor, sample_size=256):
+    """
+    Fast content fingerprint of an IMAGE or MASK tensor, for use in cache keys.
+
+    Hashes a strided uint8 sample (about sample_size x sample_size pixels per frame)
+    taken from a view of the tensor, plus the sum of every row so changes between
+    sample points still alter the key. The full tensor is never copied: float32/64
+    batches are summed in their own dtype, other dtypes one frame at a time.
+
+    Args:
+        tensor: [B,H,W,C] image, [B,H,W] mask or [H,W] tensor (None allowed)
+        sample_size: Approximate number of sampled rows/columns per frame
+
+    Returns:
+        Hex digest string ("None" for a missing tensor)
+    """
+    if tensor is None:
+        return "None"
+
+    hasher = xxhash.xxh3_128() if xxhash else hashlib.blake2b(digest_size=16)
+    hasher.update(f"{tuple(tensor.shape)}|{tensor.dtype}".encode())
+
+    with torch.no_grad():
+        t = tensor.detach()
+        # Spatial dims are the two after the batch dim (or the only two for 2D)
+        h_dim = 0 if t.dim() == 2 else 1
+        index = [slice(None)] * t.dim()
+        for dim in (h_dim, h_dim + 1):
+            if dim < t.dim():
+                index[dim] = slice(None, None, max(1, t.shape[dim] // sample_size))
+        sample = t[tuple(index)]
+        if sample.is_floating_point():
+            sample = sample.clamp(0, 1).mul(255).to(torch.uint8)
+        hasher.update(memoryview(sample.cpu().contiguous().numpy()).cast("B"))
+
+        if t.dim() >= 3 and t.numel() > 0:
+            # Per-row sums: short enough that float32 still sees a one-level pixel change
+            dims = tuple(range(2, t.dim()))
+            if t.dtype in (torch.float32, torch.float64):
+                row_sums = t.sum(dim=dims)  # Reduced in the tensor's own dtype, no batch-sized copy
+            else:
+                # Half and integer sums would overflow or be promoted batch-wide, so one frame at a time
+                row_sums = torch.stack([frame.sum(dim=tuple(d - 1 for d in dims), dtype=torch.float64) for frame in t])
+            hasher.update(row_sums.cpu().contiguous().numpy().tobytes())
+
+    return hasher.hexdigest()
 
 def cleanup_gpu_memory():
     """Helper function to clean up GPU memory."""